@@ -8,8 +8,9 @@ sys.path.insert(0, str(BASE_DIR))
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'creyp.settings')
 
-# Import Django WSGI application
-from django.core.wsgi import get_wsgi_application
+# Boot Django with the URL resolver and hot templates already compiled (see creyp.boot)
+from creyp import boot
 
 # Get the Django WSGI application
-application = get_wsgi_application()
+application, boot_phases = boot.application()
+app = application
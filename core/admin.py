@@ -108,7 +108,9 @@ class UserInvestmentSubscriptionAdmin(admin.ModelAdmin):
         'subscription_start_date',
     )
     list_filter = ('status', 'plan__category', 'plan__risk_level', 'subscription_start_date')
+    list_select_related = ('user_profile__user', 'plan')
     search_fields = ('user_profile__user__username', 'plan__name')
+    raw_id_fields = ('user_profile',)
     readonly_fields = ('subscription_start_date', 'roi_percentage')
     
     fieldsets = (
@@ -175,9 +177,9 @@ class UserInvestmentSubscriptionAdmin(admin.ModelAdmin):
         roi = obj.calculate_roi()
         color = '#28a745' if roi >= 0 else '#dc3545'
         return format_html(
-            '<span style="color: {}; font-weight: bold;">{:.2f}%</span>',
+            '<span style="color: {}; font-weight: bold;">{}%</span>',
             color,
-            roi
+            f'{roi:.2f}'
         )
     roi_display.short_description = 'ROI'
 
@@ -186,6 +188,7 @@ class UserInvestmentSubscriptionAdmin(admin.ModelAdmin):
 class PlanPortfolioAssetAdmin(admin.ModelAdmin):
     list_display = ('symbol', 'name', 'asset_type', 'plan', 'allocation_percentage', 'current_price', 'is_active')
     list_filter = ('asset_type', 'plan', 'is_active')
+    list_select_related = ('plan',)
     search_fields = ('symbol', 'name', 'plan__name')
     
     fieldsets = (
@@ -207,7 +210,9 @@ class PlanPortfolioAssetAdmin(admin.ModelAdmin):
 class MonthlyCotributionScheduleAdmin(admin.ModelAdmin):
     list_display = ('subscription', 'contribution_amount', 'scheduled_date', 'status', 'actual_contribution_date')
     list_filter = ('status', 'scheduled_date')
+    list_select_related = ('subscription__user_profile__user', 'subscription__plan')
     search_fields = ('subscription__user_profile__user__username', 'subscription__plan__name')
+    raw_id_fields = ('subscription',)
     
     fieldsets = (
         ('Subscription', {
@@ -238,6 +243,7 @@ class InvestmentPlanPromotionGrantAdmin(admin.ModelAdmin):
         'is_active',
     )
     list_filter = ('grant_type', 'plan', 'is_active', 'valid_from')
+    list_select_related = ('plan',)
     search_fields = ('name', 'description', 'plan__name')
     
     fieldsets = (
@@ -0,0 +1,175 @@
+"""
+Latency benchmark for the busiest pages.
+
+`manage.py bench` creates a throwaway test database on whatever DATABASES
+points at (SQLite or Postgres), fills it to the requested size with
+core.seeding and requests every page in VIEWS through the test client,
+signed in as a member or as staff. Each page gets p50/p95/p99 latency and its query count. Boot time is
+measured in fresh interpreters through creyp.boot, URL resolution in-process.
+The report is plain JSON, so two commits can be compared with --baseline.
+"""
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+
+from core.seeding import generate
+
+# (report name, url name, signed in as)
+VIEWS = (
+    ('dashboard_home', 'dashboard-home', 'member'),
+    ('dashboard_transactions', 'dashboard-transactions', 'member'),
+    ('investment_dashboard', 'investment_dashboard', 'member'),
+    ('investment_plans_browse', 'investment_plans_browse', 'member'),
+    ('admin_deposit_queue', 'admin-transaction-deposit', 'staff'),
+    ('admin_withdraw_queue', 'admin-transaction-withdraw', 'staff'),
+)
+BOOT = 'import json, creyp.boot; print(json.dumps(creyp.boot.application()[1]))'
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def summarize(samples):
+    return {
+        'p50_ms': round(percentile(samples, 50) * 1000, 3),
+        'p95_ms': round(percentile(samples, 95) * 1000, 3),
+        'p99_ms': round(percentile(samples, 99) * 1000, 3),
+        'mean_ms': round(sum(samples) / len(samples) * 1000, 3),
+    }
+
+
+def seed(users, transactions, subscriptions, queue, seed_value=0):
+    """
+    Load the data with core.seeding plus one staff user. Returns (member,
+    staff): the member the pages are requested as is the busiest depositor.
+    """
+    from users.models import Transaction
+
+    generate(
+        users=users, transactions=transactions, admin_transactions=queue, subscriptions=subscriptions,
+        kyc_documents=users // 4, prefix='bench', seed=seed_value, log=lambda line: None,
+    )
+    busiest = (
+        Transaction.objects.filter(wallet__user__deposit_before=True)
+        .values('wallet__user__user')
+        .annotate(rows=Count('pk'))
+        .order_by('-rows')
+        .first()
+    )
+    member = User.objects.get(pk=busiest['wallet__user__user'])
+    staff = User.objects.create(username='bench-staff', is_staff=True, password=make_password(None))
+    return member, staff
+
+
+def time_boot(runs):
+    """Phase timings of `runs` cold boots, each in a fresh interpreter."""
+    env = dict(os.environ, SERVERLESS_BOOT_REPORT='False')
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'creyp.settings')
+    samples = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, '-c', BOOT], cwd=settings.BASE_DIR, env=env,
+            capture_output=True, text=True, check=True,
+        )
+        samples.append(json.loads(result.stdout.strip().splitlines()[-1]))
+    return {phase: summarize([sample[phase] for sample in samples]) for phase in samples[0]}
+
+
+def time_resolve(paths, repeat):
+    report = {}
+    for name, path in paths.items():
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            resolve(path)
+            samples.append(time.perf_counter() - started)
+        report[name] = summarize(samples)
+    return report
+
+
+def time_views(clients, requests, warmup=2):
+    """Latency and query counts of every page in VIEWS; warm-up requests are not counted."""
+    report = {}
+    for name, url_name, role in VIEWS:
+        client, path = clients[role], reverse(url_name)
+        samples, queries = [], []
+        for i in range(warmup + requests):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = client.get(path, secure=True)
+                elapsed = time.perf_counter() - started
+            if response.status_code != 200:
+                raise RuntimeError(f'{path} answered {response.status_code}')
+            if i >= warmup:
+                samples.append(elapsed)
+                queries.append(len(captured))
+        report[name] = {**summarize(samples), 'queries': max(queries), 'path': path}
+    return report
+
+
+def run(users=200, transactions=5000, subscriptions=1000, queue=500, requests=50, boot_runs=3, seed_value=0):
+    """Seed a fresh test database, measure everything and return the report dict."""
+    started = time.perf_counter()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        member, staff = seed(users, transactions, subscriptions, queue, seed_value)
+        seeded = time.perf_counter() - started
+        clients = {'member': Client(), 'staff': Client()}
+        clients['member'].force_login(member)
+        clients['staff'].force_login(staff)
+        views = time_views(clients, requests)
+        urls = time_resolve({name: report['path'] for name, report in views.items()}, repeat=1000)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+    return {
+        'commit': git_commit(),
+        'database': connection.vendor,
+        'size': {
+            'users': users, 'transactions': transactions, 'subscriptions': subscriptions,
+            'admin_queue': queue, 'requests_per_view': requests,
+        },
+        'seed_seconds': round(seeded, 2),
+        'boot': time_boot(boot_runs) if boot_runs else {},
+        'url_resolution': urls,
+        'views': views,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, baseline):
+    """Lines of 'view: p95 old -> new (ratio), queries old -> new' for views in both reports."""
+    lines = []
+    for name, now in report['views'].items():
+        before = baseline.get('views', {}).get(name)
+        if before:
+            ratio = now['p95_ms'] / before['p95_ms'] if before['p95_ms'] else float('inf')
+            lines.append(
+                f"{name}: p95 {before['p95_ms']:.1f}ms -> {now['p95_ms']:.1f}ms ({ratio:.2f}x), "
+                f"queries {before['queries']} -> {now['queries']}"
+            )
+    return lines
@@ -0,0 +1,11 @@
+from django.conf import settings
+
+from core.fragments import FragmentVersions
+
+
+def fragments(request):
+    """Version tokens and lifetime for the {% cache %} blocks (see core.fragments)."""
+    return {
+        "fragment_versions": FragmentVersions(request),
+        "fragment_cache_seconds": settings.FRAGMENT_CACHE_SECONDS,
+    }
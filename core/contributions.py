@@ -0,0 +1,142 @@
+"""
+Execute the monthly contribution schedule.
+
+Several `manage.py process_contributions` workers can run at once: each batch
+claims its due rows with claim_batch() inside one transaction (SELECT ... FOR
+UPDATE SKIP LOCKED, or conditional per-row UPDATEs on SQLite), applies them to
+the subscriptions with a single set-based UPDATE and inserts the following
+month's rows. The (subscription, scheduled_date) unique constraint makes the
+inserts idempotent, and a crashed batch rolls back to 'scheduled'.
+"""
+from collections import defaultdict
+from datetime import datetime, time
+from decimal import Decimal
+
+from dateutil.relativedelta import relativedelta
+from django.db import transaction
+from django.db.models import Case, DecimalField, DateTimeField, Exists, F, OuterRef, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from core.models import InvestmentPlan, MonthlyCotributionSchedule, UserInvestmentSubscription
+from core.portfolio import bump_for_subscriptions
+from creyp.utils import claim_batch
+
+
+def _as_datetime(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def schedule_upcoming(until=None):
+    """
+    Create the scheduled row for every active subscription whose
+    next_contribution_date falls on or before `until` (default today) and
+    that has no row for that date yet. Returns the rows created.
+    """
+    until = until or timezone.localdate()
+    # ignore_conflicts only covers a concurrent run; bulk_create() cannot report what it skipped
+    scheduled = MonthlyCotributionSchedule.objects.filter(
+        subscription=OuterRef('pk'), scheduled_date=OuterRef('next_day')
+    )
+    subscriptions = (
+        UserInvestmentSubscription.objects.filter(
+            status='active',
+            monthly_contribution__gt=0,
+            next_contribution_date__date__lte=until,
+        )
+        .annotate(next_day=TruncDate('next_contribution_date'))
+        .exclude(Exists(scheduled))
+        .values_list('pk', 'monthly_contribution', 'next_contribution_date')
+    )
+    rows = [
+        MonthlyCotributionSchedule(
+            subscription_id=pk,
+            contribution_amount=amount,
+            scheduled_date=timezone.localdate(next_date),
+        )
+        for pk, amount, next_date in subscriptions.iterator()
+    ]
+    MonthlyCotributionSchedule.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+    if rows:
+        bump_for_subscriptions({row.subscription_id for row in rows})
+    return len(rows)
+
+
+def skip_inactive(today=None):
+    """Due rows of paused, completed or cancelled subscriptions are skipped, not paid late."""
+    today = today or timezone.localdate()
+    due = MonthlyCotributionSchedule.objects.filter(
+        status='scheduled', scheduled_date__lte=today
+    ).exclude(subscription__status='active')
+    subscription_ids = list(due.values_list('subscription_id', flat=True).distinct())
+    skipped = due.update(status='skipped', notes='Subscription was not active on the scheduled date')
+    if skipped:
+        bump_for_subscriptions(subscription_ids)
+    return skipped
+
+
+def process_batch(today=None, batch_size=500):
+    """
+    Claim and apply up to `batch_size` due contributions.
+    Returns the number of schedule rows completed; 0 means nothing is due.
+    """
+    today = today or timezone.localdate()
+    due = MonthlyCotributionSchedule.objects.filter(
+        status='scheduled',
+        scheduled_date__lte=today,
+        subscription__status='active',
+    ).order_by('scheduled_date', 'pk')
+
+    with transaction.atomic():
+        claimed = claim_batch(
+            due,
+            batch_size,
+            status='completed',
+            actual_contribution_date=today,
+            actual_amount=F('contribution_amount'),
+        )
+        if not claimed:
+            return 0
+
+        amounts = defaultdict(Decimal)
+        plan_aum = defaultdict(Decimal)
+        last_date = {}
+        for subscription_id, plan_id, amount, scheduled_date in (
+            MonthlyCotributionSchedule.objects.filter(pk__in=claimed)
+            .values_list('subscription_id', 'subscription__plan_id', 'contribution_amount', 'scheduled_date')
+        ):
+            amounts[subscription_id] += amount
+            plan_aum[plan_id] += amount
+            last_date[subscription_id] = max(scheduled_date, last_date.get(subscription_id, scheduled_date))
+        next_date = {pk: day + relativedelta(months=1) for pk, day in last_date.items()}
+
+        money = DecimalField(max_digits=15, decimal_places=2)
+        total = Case(*[When(pk=pk, then=Value(amount)) for pk, amount in amounts.items()], output_field=money)
+        UserInvestmentSubscription.objects.filter(pk__in=list(amounts)).update(
+            total_contributed=F('total_contributed') + total,
+            current_value=F('current_value') + total,
+            next_contribution_date=Case(
+                *[When(pk=pk, then=Value(_as_datetime(day))) for pk, day in next_date.items()],
+                output_field=DateTimeField(),
+            ),
+        )
+
+        InvestmentPlan.apply_rollups({pk: (aum, 0) for pk, aum in plan_aum.items()})
+        bump_for_subscriptions(list(amounts))
+
+        following = UserInvestmentSubscription.objects.filter(
+            pk__in=list(amounts), monthly_contribution__gt=0
+        ).values_list('pk', 'monthly_contribution', 'planned_end_date')
+        MonthlyCotributionSchedule.objects.bulk_create(
+            [
+                MonthlyCotributionSchedule(
+                    subscription_id=pk,
+                    contribution_amount=amount,
+                    scheduled_date=next_date[pk],
+                )
+                for pk, amount, end in following
+                if _as_datetime(next_date[pk]) <= end
+            ],
+            ignore_conflicts=True,
+        )
+    return len(claimed)
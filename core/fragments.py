@@ -0,0 +1,64 @@
+"""
+Versioned template fragment caching.
+
+The shared parts of the marketing and investment pages are wrapped in
+{% cache %} blocks that vary on version tokens, read in templates as
+fragment_versions.<scope> (see core.context_processors). Each scope is a
+core.versions counter which the core.models signals (and price ingestion)
+bump when rows of that scope change. The counters live in the database, so a
+change made by any worker or by the prices process shows on the next request
+everywhere, while the fragments themselves stay in each process's cache. A
+token is the release plus the counter, so a deploy never serves fragments
+rendered by the previous templates.
+
+fragment_versions.user is the per-user segment: the user id and the profile's
+portfolio_version, which every subscription and contribution write bumps.
+"""
+from django.conf import settings
+
+from core import versions as counters
+
+SCOPES = ("site", "plans", "assets", "grants")
+
+
+def _scope(scope):
+    return f"fragments:{scope}"
+
+
+def versions(scopes=SCOPES):
+    """{scope: token} for `scopes`, in one query."""
+    release = getattr(settings, "FRAGMENT_CACHE_RELEASE", "")
+    current = counters.current(*map(_scope, scopes))
+    return {scope: f"{release}.{current[_scope(scope)]}" for scope in scopes}
+
+
+def bump(*scopes):
+    """Retire every cached fragment that varies on one of `scopes`."""
+    counters.bump(*map(_scope, scopes))
+
+
+def user_segment(request):
+    from users.middleware import get_profile
+
+    profile = get_profile(request)
+    if profile is None:
+        return "anonymous"
+    return f"{profile.pk}.{profile.portfolio_version}"
+
+
+class FragmentVersions:
+    """
+    Template-side view of the tokens. Nothing is read until a template asks
+    for a scope, then all of them are fetched together.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self._versions = None
+
+    def __getitem__(self, scope):
+        if scope == "user":
+            return user_segment(self.request)
+        if self._versions is None:
+            self._versions = versions()
+        return self._versions[scope]
@@ -0,0 +1,114 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import F
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from core.models import OutboundEmail
+from creyp.utils import claim_batch
+
+
+def request_context(request):
+    """The bits of `request` the email templates use, in a JSON-serialisable form."""
+    if request is None:
+        return {}
+    return {"request": {"scheme": request.scheme, "get_host": request.get_host()}}
+
+
+def build_email(subject, to_email, template, context=None, text_body="", request=None):
+    """An unsaved outbox row; pass a list of these to enqueue_many()."""
+    context = dict(context or {})
+    context.update(request_context(request))
+    return OutboundEmail(
+        subject=subject,
+        to_email=to_email,
+        from_email=settings.DEFAULT_FROM_EMAIL or "",
+        text_body=text_body or "",
+        template=template,
+        context=context,
+    )
+
+
+def enqueue_mail(subject, to_email, template, context=None, text_body="", request=None):
+    """Queue one email for the mail worker. This is the only work done on the request path."""
+    email = build_email(subject, to_email, template, context, text_body, request)
+    email.save()
+    return email
+
+
+def enqueue_many(emails):
+    return OutboundEmail.objects.bulk_create(emails, batch_size=500)
+
+
+def render_message(email, connection=None):
+    message = EmailMultiAlternatives(
+        email.subject,
+        email.text_body,
+        email.from_email or settings.DEFAULT_FROM_EMAIL,
+        [email.to_email],
+        connection=connection,
+    )
+    message.attach_alternative(render_to_string(email.template, email.context), "text/html")
+    return message
+
+
+def retry_delay(attempts):
+    """Exponential backoff: base, 2x base, 4x base ... capped at one day."""
+    base = getattr(settings, "MAIL_WORKER_BACKOFF_SECONDS", 60)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), 24 * 60 * 60))
+
+
+def send_pending(batch_size=None, max_attempts=None):
+    """
+    Claim one batch of due emails and send them over a single connection.
+    Returns (sent, failed) counts for the batch; (0, 0) means the outbox is drained.
+    """
+    batch_size = batch_size or getattr(settings, "MAIL_WORKER_BATCH_SIZE", 50)
+    max_attempts = max_attempts or getattr(settings, "MAIL_WORKER_MAX_ATTEMPTS", 5)
+    now = timezone.now()
+    due = OutboundEmail.objects.filter(status="pending", next_attempt_at__lte=now).order_by("next_attempt_at")
+    # next_attempt_at doubles as the claim time while a row is 'sending'
+    pks = claim_batch(due, batch_size, status="sending", next_attempt_at=now)
+    if not pks:
+        return 0, 0
+
+    sent, failures = [], []
+    emails = list(OutboundEmail.objects.filter(pk__in=pks))
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as exc:
+        failures = [(email, exc) for email in emails]
+        emails = []
+    try:
+        for email in emails:
+            try:
+                render_message(email, connection).send()
+                sent.append(email.pk)
+            except Exception as exc:
+                failures.append((email, exc))
+    finally:
+        connection.close()
+
+    OutboundEmail.objects.filter(pk__in=sent).update(
+        status="sent", sent_at=timezone.now(), attempts=F("attempts") + 1, last_error=""
+    )
+    for email, exc in failures:
+        attempts = email.attempts + 1
+        gave_up = attempts >= max_attempts
+        OutboundEmail.objects.filter(pk=email.pk).update(
+            status="failed" if gave_up else "pending",
+            attempts=attempts,
+            last_error=f"{type(exc).__name__}: {exc}"[:2000],
+            next_attempt_at=now if gave_up else now + retry_delay(attempts),
+        )
+    return len(sent), len(failures)
+
+
+def release_stale(older_than=timedelta(minutes=15)):
+    """Put emails left in 'sending' by a crashed worker back in the queue."""
+    return OutboundEmail.objects.filter(
+        status="sending", next_attempt_at__lte=timezone.now() - older_than
+    ).update(status="pending")
@@ -0,0 +1,63 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from core.bench import compare, run
+
+
+class Command(BaseCommand):
+    help = 'Seed a throwaway database and report boot time and per-page latency and query counts as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200, help='Members to create')
+        parser.add_argument('--transactions', type=int, default=5000, help='Wallet transactions to create')
+        parser.add_argument('--subscriptions', type=int, default=1000, help='Investment subscriptions to create')
+        parser.add_argument('--queue', type=int, default=500,
+                            help='Pending admin deposits and withdrawals to create')
+        parser.add_argument('--requests', type=int, default=50, help='Timed requests per page')
+        parser.add_argument('--boot-runs', type=int, default=3,
+                            help='Cold boots to time in fresh interpreters (0 to skip)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the generated data')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+        parser.add_argument('--baseline', help='Earlier JSON report to compare against')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests must be at least 1')
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as handle:
+                baseline = json.load(handle)
+
+        # locmem mail and the testserver host, as under `manage.py test`
+        setup_test_environment()
+        try:
+            report = run(
+                users=options['users'],
+                transactions=options['transactions'],
+                subscriptions=options['subscriptions'],
+                queue=options['queue'],
+                requests=options['requests'],
+                boot_runs=options['boot_runs'],
+                seed_value=options['seed'],
+            )
+        finally:
+            teardown_test_environment()
+
+        document = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(document + '\n')
+            messages = self.stdout
+        else:
+            # stdout carries only the report, so `bench > report.json` can be fed back as --baseline
+            self.stdout.write(document)
+            messages = self.stderr
+        for line in compare(report, baseline) if baseline else ():
+            messages.write(line)
+        slowest = max(report['views'].items(), key=lambda item: item[1]['p95_ms'])
+        messages.write(self.style.SUCCESS(
+            f"✓ Benchmarked {len(report['views'])} pages on {report['database']}; "
+            f"slowest p95 {slowest[0]} at {slowest[1]['p95_ms']:.1f}ms"
+        ))
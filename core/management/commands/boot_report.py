@@ -0,0 +1,47 @@
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+BOOT = 'import creyp.boot; creyp.boot.application()'
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+class Command(BaseCommand):
+    help = 'Boot the serverless entry point in a fresh interpreter and break its cold start down'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=15,
+                            help='Packages to list, slowest first')
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'creyp.settings'))
+        env['SERVERLESS_BOOT_REPORT'] = 'True'
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', BOOT],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if result.returncode:
+            raise CommandError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'Boot failed')
+
+        # self time per top-level package; -X importtime reports microseconds
+        packages = defaultdict(int)
+        boot_line = ''
+        for line in result.stderr.splitlines():
+            match = IMPORT_LINE.match(line)
+            if match:
+                packages[match[4].split('.')[0]] += int(match[1])
+            elif line.startswith('boot: '):
+                boot_line = line
+        imported = sum(packages.values())
+
+        self.stdout.write(f'{"package":<32}{"ms":>9}{"share":>8}')
+        for package, micros in sorted(packages.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f'{package:<32}{micros / 1000:>9.1f}{micros / imported:>8.1%}')
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {len(packages)} packages imported in {imported / 1000:.0f}ms; {boot_line or "boot: no report"}'
+        ))
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.prices import PriceSourceError, get_source, ingest, prune_history
+
+
+class Command(BaseCommand):
+    help = 'Fetch the latest asset prices into the cache, the price history and the plan portfolios'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--symbol', action='append', dest='symbols',
+                            help='Only fetch these symbols (repeatable); defaults to BTC plus every plan asset')
+        parser.add_argument('--currency', default='USD')
+        parser.add_argument('--source', default=None,
+                            help='Dotted path of the price source class, overriding PRICE_SOURCE')
+        parser.add_argument('--interval', type=float, default=None,
+                            help='Keep running and fetch again every N seconds')
+        parser.add_argument('--prune-days', type=int, default=None,
+                            help='Also delete price history older than N days')
+
+    def handle(self, *args, **options):
+        source = get_source(options['source'])
+        try:
+            while True:
+                try:
+                    quotes = ingest(options['symbols'], options['currency'], source)
+                    self.stdout.write(self.style.SUCCESS(
+                        f'✓ Ingested {len(quotes)} {options["currency"]} prices from {source.name}'
+                    ))
+                except PriceSourceError as exc:
+                    if options['interval'] is None:
+                        raise CommandError(str(exc))
+                    self.stderr.write(self.style.ERROR(str(exc)))
+                if options['prune_days'] is not None:
+                    pruned = prune_history(options['prune_days'])
+                    self.stdout.write(f'  pruned {pruned} old quotes')
+                if options['interval'] is None:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
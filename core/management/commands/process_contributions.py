@@ -0,0 +1,45 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+
+from core.contributions import process_batch, schedule_upcoming, skip_inactive
+
+
+def retry_locked(function, *args, attempts=10):
+    """SQLite has a single writer; back off while another worker commits its batch."""
+    for attempt in range(1, attempts + 1):
+        try:
+            return function(*args)
+        except OperationalError:
+            if connection.vendor != 'sqlite' or attempt == attempts:
+                raise
+            time.sleep(min(attempt, 5))
+
+
+class Command(BaseCommand):
+    help = 'Apply due monthly contributions; safe to run in several processes at once'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Schedule rows claimed and applied per transaction')
+        parser.add_argument('--date', type=date.fromisoformat, default=None,
+                            help='Process as of this day (YYYY-MM-DD) instead of today')
+
+    def handle(self, *args, **options):
+        today = options['date']
+        scheduled = retry_locked(schedule_upcoming, today)
+        skipped = retry_locked(skip_inactive, today)
+        if scheduled or skipped:
+            self.stdout.write(f'  scheduled {scheduled}, skipped {skipped}')
+
+        processed = 0
+        while True:
+            count = retry_locked(process_batch, today, options['batch_size'])
+            if not count:
+                break
+            processed += count
+            self.stdout.write(f'  {processed} contributions applied')
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Applied {processed} contributions'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.search import index_available, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Re-index every investment plan for full-text search'
+
+    def handle(self, *args, **options):
+        if not index_available():
+            raise CommandError('No search index on this database; run migrate first (SQLite with FTS5 or Postgres)')
+        indexed = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'✓ Indexed {indexed} investment plans'))
@@ -0,0 +1,47 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from core.models import InvestmentPlan, UserInvestmentSubscription
+
+
+class Command(BaseCommand):
+    help = 'Recompute every plan\'s current_aum and number_of_investors and report drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report drift, do not correct it')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            # lock the plans before summing: a contribution or revaluation committed while we
+            # waited is then in the sums, and none can move current_aum until we are done
+            plans = list(
+                InvestmentPlan.objects.select_for_update().order_by('pk')
+                .only('id', 'name', 'current_aum', 'number_of_investors')
+            )
+            actual = {
+                row['plan_id']: (row['aum'] or Decimal('0'), row['investors'])
+                for row in UserInvestmentSubscription.objects
+                .filter(status__in=UserInvestmentSubscription.ROLLUP_STATUSES)
+                .values('plan_id')
+                .annotate(aum=Sum('current_value'), investors=Count('id'))
+                .order_by()
+            }
+            drifted = []
+            for plan in plans:
+                aum, investors = actual.get(plan.pk, (Decimal('0'), 0))
+                if plan.current_aum != aum or plan.number_of_investors != investors:
+                    self.stdout.write(
+                        f'  {plan.name}: aum {plan.current_aum} -> {aum} '
+                        f'({aum - plan.current_aum:+}), investors {plan.number_of_investors} -> {investors}'
+                    )
+                    plan.current_aum, plan.number_of_investors = aum, investors
+                    drifted.append(plan)
+            if drifted and not options['dry_run']:
+                InvestmentPlan.objects.bulk_update(drifted, ['current_aum', 'number_of_investors'])
+
+        verb = 'Found' if options['dry_run'] else 'Corrected'
+        self.stdout.write(self.style.SUCCESS(f'✓ {verb} drift on {len(drifted)} of {len(plans)} plans'))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.revaluation import RevaluationInProgress, revalue
+
+
+class Command(BaseCommand):
+    help = 'Mark active and paused investment subscriptions to the current asset prices'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--plan', type=int, action='append', dest='plans',
+                            help='Only revalue subscriptions to these plan ids (repeatable)')
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help='Subscriptions loaded and written per chunk')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Compute the new values without writing them')
+
+    def handle(self, *args, **options):
+        try:
+            report = revalue(
+                plan_ids=options['plans'],
+                chunk_size=options['chunk_size'],
+                dry_run=options['dry_run'],
+            )
+        except RevaluationInProgress as exc:
+            raise CommandError(str(exc))
+        verb = 'Would update' if options['dry_run'] else 'Updated'
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {verb} {report.updated} of {report.rows} subscriptions in {report.seconds:.2f}s '
+            f'({report.rows_per_second:,.0f} rows/s)'
+        ))
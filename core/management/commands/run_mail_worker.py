@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.mailer import send_pending, release_stale
+
+
+class Command(BaseCommand):
+    help = 'Send queued emails from the outbox in batches over one SMTP connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Drain the outbox once and exit instead of polling')
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Emails claimed and sent per connection')
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help='Seconds to sleep when the outbox is empty')
+
+    def handle(self, *args, **options):
+        released = release_stale()
+        if released:
+            self.stdout.write(self.style.WARNING(f'Re-queued {released} emails left in sending state'))
+
+        total_sent = total_failed = 0
+        try:
+            while True:
+                sent, failed = send_pending(batch_size=options['batch_size'])
+                total_sent += sent
+                total_failed += failed
+                if sent or failed:
+                    self.stdout.write(f'  sent {sent}, failed {failed}')
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Sent {total_sent} emails ({total_failed} failed attempts)'))
@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+
+from core.seeding import generate
+
+
+class Command(BaseCommand):
+    help = 'Bulk-load synthetic members, transactions and investments for load and performance testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000, help='Members, each with a profile and wallet')
+        parser.add_argument('--transactions', type=int, default=500000, help='Wallet transactions')
+        parser.add_argument('--admin-transactions', type=int, default=20000,
+                            help='Deposit and withdrawal requests in the staff queues')
+        parser.add_argument('--subscriptions', type=int, default=20000, help='Investment subscriptions')
+        parser.add_argument('--kyc-documents', type=int, default=5000, help='KYC documents')
+        parser.add_argument('--days', type=int, default=365, help='History spread over this many days')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Rows per bulk insert')
+        parser.add_argument('--prefix', default='load', help='Username prefix of the generated members')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1:
+            raise CommandError('--users must be at least 1')
+        if User.objects.filter(username__startswith=options['prefix']).exists():
+            raise CommandError(f"Members named {options['prefix']}* already exist; pick another --prefix")
+
+        started = time.perf_counter()
+        counts = generate(
+            users=options['users'],
+            transactions=options['transactions'],
+            admin_transactions=options['admin_transactions'],
+            subscriptions=options['subscriptions'],
+            kyc_documents=options['kyc_documents'],
+            days=options['days'],
+            chunk_size=options['chunk_size'],
+            prefix=options['prefix'],
+            seed=options['seed'],
+            log=self.stdout.write,
+        )
+        seconds = time.perf_counter() - started
+        rows = sum(counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Loaded {rows:,} rows in {seconds:.1f}s ({rows / seconds:,.0f} rows/s)'
+        ))
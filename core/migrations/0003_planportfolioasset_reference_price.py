@@ -0,0 +1,18 @@
+# Generated by Django 4.0.4 on 2026-10-18 10:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_outboundemail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='planportfolioasset',
+            name='reference_price',
+            field=models.DecimalField(blank=True, decimal_places=8, max_digits=15, null=True),
+        ),
+    ]
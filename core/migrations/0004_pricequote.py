@@ -0,0 +1,32 @@
+# Generated by Django 4.0.4 on 2026-10-18 10:35
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_planportfolioasset_reference_price'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceQuote',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol', models.CharField(max_length=20)),
+                ('currency', models.CharField(default='USD', max_length=10)),
+                ('price', models.DecimalField(decimal_places=8, max_digits=20)),
+                ('source', models.CharField(max_length=50)),
+                ('fetched_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['-fetched_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='pricequote',
+            index=models.Index(fields=['symbol', 'currency', '-fetched_at'], name='core_priceq_symbol_f27b20_idx'),
+        ),
+    ]
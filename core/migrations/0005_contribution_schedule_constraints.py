@@ -0,0 +1,54 @@
+# Generated by Django 4.0.4 on 2026-10-18 10:36
+
+from django.db import migrations, models
+from django.db.models import Count
+
+# which duplicate survives: the row that records money moving wins
+STATUS_RANK = {'completed': 0, 'failed': 1, 'skipped': 2, 'scheduled': 3}
+
+
+def merge_duplicate_schedules(apps, schema_editor):
+    """
+    Keep one row per (subscription, scheduled_date) so the constraint can be
+    added. Rows created twice by concurrent runs are merged into the most
+    advanced one, and its notes record the ids removed.
+    """
+    Schedule = apps.get_model('core', 'MonthlyCotributionSchedule')
+    duplicated = (
+        Schedule.objects.values('subscription_id', 'scheduled_date')
+        .annotate(rows=Count('pk'))
+        .filter(rows__gt=1)
+    )
+    for group in duplicated.iterator():
+        rows = sorted(
+            Schedule.objects.filter(
+                subscription_id=group['subscription_id'], scheduled_date=group['scheduled_date']
+            ),
+            key=lambda row: (STATUS_RANK.get(row.status, len(STATUS_RANK)), row.pk),
+        )
+        keep, removed = rows[0], rows[1:]
+        note = 'Merged duplicate schedule rows ' + ', '.join(
+            f'#{row.pk} ({row.status} {row.actual_amount or row.contribution_amount})' for row in removed
+        )
+        keep.notes = f'{keep.notes}\n{note}' if keep.notes else note
+        keep.save(update_fields=['notes'])
+        Schedule.objects.filter(pk__in=[row.pk for row in removed]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_pricequote'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='monthlycotributionschedule',
+            index=models.Index(fields=['status', 'scheduled_date'], name='core_monthl_status_d3f149_idx'),
+        ),
+        migrations.RunPython(merge_duplicate_schedules, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='monthlycotributionschedule',
+            constraint=models.UniqueConstraint(fields=('subscription', 'scheduled_date'), name='unique_contribution_per_date'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations
+
+from core import search
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if not search.create_index(connection):
+        return
+    InvestmentPlan = apps.get_model("core", "InvestmentPlan")
+    search.index_plans(InvestmentPlan.objects.values_list("id", "name", "description"), connection)
+
+
+def drop_search_index(apps, schema_editor):
+    search.drop_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_contribution_schedule_constraints'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
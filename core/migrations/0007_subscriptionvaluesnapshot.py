@@ -0,0 +1,31 @@
+# Generated by Django 4.0.4 on 2026-10-18 10:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_plan_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubscriptionValueSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('current_value', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('total_contributed', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('subscription', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='value_snapshots', to='core.userinvestmentsubscription')),
+            ],
+            options={
+                'ordering': ['subscription', 'date'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='subscriptionvaluesnapshot',
+            constraint=models.UniqueConstraint(fields=('subscription', 'date'), name='unique_snapshot_per_day'),
+        ),
+    ]
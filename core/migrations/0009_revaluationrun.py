@@ -0,0 +1,27 @@
+# Generated by Django 4.0.4 on 2026-10-18 11:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_cacheversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevaluationRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('plan_ids', models.JSONField(blank=True, help_text='Plans in scope; empty for all plans', null=True)),
+                ('prices', models.JSONField(default=dict, help_text='{asset id: current_price} at the start of the run')),
+                ('last_subscription_id', models.BigIntegerField(default=0)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-started_at'],
+            },
+        ),
+    ]
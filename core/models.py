@@ -1,7 +1,13 @@
-from django.db import models
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.db.models import F
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.utils import timezone
 from users.models import Profile
+from core import fragments, promotions, search
 
 
 class InvestmentPlan(models.Model):
@@ -144,6 +150,30 @@ class InvestmentPlan(models.Model):
             self.cash_allocation
         )
         return total == 100
+    
+    @classmethod
+    def apply_rollups(cls, changes):
+        """
+        Move current_aum / number_of_investors by {plan_id: (aum_delta, investors_delta)}
+        in one UPDATE, so concurrent writers never overwrite each other's totals.
+        """
+        changes = {pk: delta for pk, delta in changes.items() if delta[0] or delta[1]}
+        if not changes:
+            return
+        aum = models.Case(
+            *[models.When(pk=pk, then=models.Value(Decimal(delta[0]))) for pk, delta in changes.items()],
+            default=models.Value(Decimal('0')),
+            output_field=models.DecimalField(max_digits=15, decimal_places=2),
+        )
+        investors = models.Case(
+            *[models.When(pk=pk, then=models.Value(delta[1])) for pk, delta in changes.items()],
+            default=models.Value(0),
+            output_field=models.IntegerField(),
+        )
+        cls.objects.filter(pk__in=list(changes)).update(
+            current_aum=models.F('current_aum') + aum,
+            number_of_investors=models.F('number_of_investors') + investors,
+        )
 
 
 class UserInvestmentSubscription(models.Model):
@@ -157,6 +187,8 @@ class UserInvestmentSubscription(models.Model):
         ('completed', 'Completed'),
         ('cancelled', 'Cancelled'),
     )
+    # subscriptions counted in their plan's current_aum and number_of_investors
+    ROLLUP_STATUSES = ('active', 'paused')
     
     user_profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='investment_subscriptions')
     plan = models.ForeignKey(InvestmentPlan, on_delete=models.PROTECT, related_name='subscriptions')
@@ -194,6 +226,24 @@ class UserInvestmentSubscription(models.Model):
     def __str__(self):
         return f"{self.user_profile.user.username} - {self.plan.name}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remember what this row added to its plan's rollups so saves can apply a delta
+        loaded = dict(zip(field_names, values))
+        if {'plan_id', 'status', 'current_value'} <= loaded.keys():
+            instance._loaded_rollup = instance.rollup_contribution(
+                loaded['plan_id'], loaded['status'], loaded['current_value']
+            )
+        return instance
+    
+    @classmethod
+    def rollup_contribution(cls, plan_id, status, current_value):
+        """(plan_id, aum, investors) this subscription adds to its plan."""
+        if status in cls.ROLLUP_STATUSES:
+            return plan_id, current_value or Decimal('0'), 1
+        return plan_id, Decimal('0'), 0
+    
     def calculate_roi(self):
         """Calculate return on investment percentage."""
         if self.initial_investment > 0:
@@ -239,6 +289,8 @@ class PlanPortfolioAsset(models.Model):
     
     current_price = models.DecimalField(max_digits=15, decimal_places=8)
     price_updated_at = models.DateTimeField(auto_now=True)
+    # price the subscriptions were last marked to (see core.revaluation)
+    reference_price = models.DecimalField(max_digits=15, decimal_places=8, null=True, blank=True)
     
     is_active = models.BooleanField(default=True)
     added_date = models.DateTimeField(auto_now_add=True)
@@ -279,6 +331,15 @@ class MonthlyCotributionSchedule(models.Model):
     
     class Meta:
         ordering = ['scheduled_date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['subscription', 'scheduled_date'],
+                name='unique_contribution_per_date',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'scheduled_date']),
+        ]
     
     def __str__(self):
         return f"{self.subscription} - {self.scheduled_date}"
@@ -338,14 +399,14 @@ class InvestmentPlanPromotionGrant(models.Model):
     def __str__(self):
         return f"{self.plan.name} - {self.name}"
     
-    def is_valid_now(self):
-        """Check if grant is currently active."""
-        now = timezone.now()
+    def is_valid_now(self, now=None):
+        """Check if grant is active at `now` (default: the current time)."""
+        now = now or timezone.now()
         return self.is_active and self.valid_from <= now <= self.valid_until
     
-    def calculate_grant_amount(self, investment_amount):
+    def calculate_grant_amount(self, investment_amount, now=None):
         """Calculate the grant amount for a given investment."""
-        if not self.is_valid_now():
+        if not self.is_valid_now(now):
             return 0
         
         if self.grant_amount:
@@ -359,3 +420,197 @@ class InvestmentPlanPromotionGrant(models.Model):
             grant = min(grant, self.maximum_grant_per_user)
         
         return grant
+
+
+class OutboundEmail(models.Model):
+    """
+    Outbox for notification emails.
+    Views only insert a row; `manage.py run_mail_worker` renders and sends them
+    in batches over one SMTP connection, retrying failures with backoff.
+    """
+    
+    STATUS = (
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    )
+    
+    subject = models.CharField(max_length=255)
+    to_email = models.CharField(max_length=254)
+    from_email = models.CharField(max_length=254, blank=True)
+    text_body = models.TextField(blank=True)
+    template = models.CharField(max_length=200, help_text="HTML template rendered by the worker")
+    context = models.JSONField(default=dict, blank=True)
+    
+    status = models.CharField(max_length=10, choices=STATUS, default='pending')
+    attempts = models.IntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.subject} -> {self.to_email} ({self.status})"
+
+
+class PriceQuote(models.Model):
+    """
+    Price history written by `manage.py ingest_prices`.
+    A row is only added when the price moves, so the table stays compact;
+    the latest quote per symbol is also kept in the cache (see core.prices).
+    """
+    
+    symbol = models.CharField(max_length=20)
+    currency = models.CharField(max_length=10, default='USD')
+    price = models.DecimalField(max_digits=20, decimal_places=8)
+    source = models.CharField(max_length=50)
+    fetched_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        ordering = ['-fetched_at']
+        indexes = [
+            models.Index(fields=['symbol', 'currency', '-fetched_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.symbol}/{self.currency} {self.price} @ {self.fetched_at:%Y-%m-%d %H:%M}"
+
+
+class SubscriptionValueSnapshot(models.Model):
+    """
+    End-of-day value of a subscription, written in bulk by
+    `manage.py snapshot_subscriptions`. Read as downsampled series through
+    core.snapshots.
+    """
+    
+    subscription = models.ForeignKey(
+        UserInvestmentSubscription,
+        on_delete=models.CASCADE,
+        related_name='value_snapshots'
+    )
+    date = models.DateField()
+    current_value = models.DecimalField(max_digits=15, decimal_places=2)
+    total_contributed = models.DecimalField(max_digits=15, decimal_places=2)
+    
+    class Meta:
+        ordering = ['subscription', 'date']
+        constraints = [
+            # also the index every series read scans
+            models.UniqueConstraint(
+                fields=['subscription', 'date'],
+                name='unique_snapshot_per_day',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.subscription_id} {self.date}: {self.current_value}"
+
+
+class CacheVersion(models.Model):
+    """
+    Invalidation counter for one scope of cached or per-process data.
+    Kept in the database so every web worker and the background processes
+    see the same value; read and bumped through core.versions.
+    """
+    
+    scope = models.CharField(max_length=50, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.scope} v{self.version}"
+
+
+class RevaluationRun(models.Model):
+    """
+    Checkpoint of `manage.py revalue_subscriptions`. The asset prices are
+    frozen when the run starts and the cursor advances with every committed
+    chunk, so a failed run is resumed at the same prices instead of moving
+    the already written subscriptions a second time.
+    """
+
+    plan_ids = models.JSONField(null=True, blank=True, help_text="Plans in scope; empty for all plans")
+    prices = models.JSONField(default=dict, help_text="{asset id: current_price} at the start of the run")
+    last_subscription_id = models.BigIntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-started_at']
+
+    def __str__(self):
+        state = f"finished {self.finished_at:%Y-%m-%d %H:%M}" if self.finished_at else f"at #{self.last_subscription_id}"
+        return f"Revaluation {self.started_at:%Y-%m-%d %H:%M} ({state})"
+
+
+@receiver(post_save, sender=InvestmentPlan)
+def index_plan_signal(sender, instance, **kwargs):
+    search.index_plans([(instance.pk, instance.name, instance.description)])
+    transaction.on_commit(search.invalidate)
+
+
+@receiver(post_delete, sender=InvestmentPlan)
+def unindex_plan_signal(sender, instance, **kwargs):
+    search.unindex_plans([instance.pk])
+    transaction.on_commit(search.invalidate)
+
+
+@receiver(post_save, sender=UserInvestmentSubscription)
+def update_plan_rollups_signal(sender, instance, created, **kwargs):
+    changes = {}
+    previous = getattr(instance, '_loaded_rollup', None)
+    if previous and not created:
+        changes[previous[0]] = (-previous[1], -previous[2])
+    plan_id, aum, investors = instance.rollup_contribution(instance.plan_id, instance.status, instance.current_value)
+    old_aum, old_investors = changes.get(plan_id, (Decimal('0'), 0))
+    changes[plan_id] = (old_aum + aum, old_investors + investors)
+    InvestmentPlan.apply_rollups(changes)
+    instance._loaded_rollup = (plan_id, aum, investors)
+
+
+@receiver(post_delete, sender=UserInvestmentSubscription)
+def delete_plan_rollups_signal(sender, instance, **kwargs):
+    plan_id, aum, investors = getattr(instance, '_loaded_rollup', None) or instance.rollup_contribution(
+        instance.plan_id, instance.status, instance.current_value
+    )
+    InvestmentPlan.apply_rollups({plan_id: (-aum, -investors)})
+
+
+@receiver(post_save, sender=InvestmentPlanPromotionGrant)
+@receiver(post_delete, sender=InvestmentPlanPromotionGrant)
+def invalidate_promotions_signal(sender, instance, **kwargs):
+    # after commit, so no process rebuilds its index from the uncommitted rows
+    transaction.on_commit(promotions.invalidate)
+    transaction.on_commit(lambda: fragments.bump('grants'))
+
+
+@receiver(post_save, sender=InvestmentPlan)
+@receiver(post_delete, sender=InvestmentPlan)
+def plan_fragments_signal(sender, instance, **kwargs):
+    transaction.on_commit(lambda: fragments.bump('plans'))
+
+
+@receiver(post_save, sender=PlanPortfolioAsset)
+@receiver(post_delete, sender=PlanPortfolioAsset)
+def asset_fragments_signal(sender, instance, **kwargs):
+    transaction.on_commit(lambda: fragments.bump('assets'))
+
+
+@receiver(post_save, sender=UserInvestmentSubscription)
+@receiver(post_delete, sender=UserInvestmentSubscription)
+def subscription_portfolio_version_signal(sender, instance, **kwargs):
+    Profile.objects.filter(pk=instance.user_profile_id).update(portfolio_version=F('portfolio_version') + 1)
+
+
+@receiver(post_save, sender=MonthlyCotributionSchedule)
+@receiver(post_delete, sender=MonthlyCotributionSchedule)
+def contribution_portfolio_version_signal(sender, instance, **kwargs):
+    Profile.objects.filter(investment_subscriptions=instance.subscription_id).update(
+        portfolio_version=F('portfolio_version') + 1
+    )
@@ -0,0 +1,71 @@
+"""
+Cached per-user portfolio summary for the investment dashboard.
+
+The summary (totals, the open subscriptions and the latest contributions) is
+cached under the profile's portfolio_version. Every write to a subscription or
+contribution row bumps that counter with an F() update, so a stale summary is
+never read again and simply expires. The profile, and with it the version,
+is already loaded once per request, so a warm dashboard costs one cache get.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, Sum
+
+from core.models import MonthlyCotributionSchedule, UserInvestmentSubscription
+from users.models import Profile
+
+OPEN_STATUSES = ('active', 'paused')
+RECENT_CONTRIBUTIONS = 10
+
+
+def cache_key(profile):
+    return f'portfolio:{profile.pk}:{profile.portfolio_version}'
+
+
+def bump_versions(profile_ids):
+    """Invalidate the cached summaries of `profile_ids` (ids or a values() queryset)."""
+    return Profile.objects.filter(pk__in=profile_ids).update(portfolio_version=F('portfolio_version') + 1)
+
+
+def bump_for_subscriptions(subscription_ids):
+    return bump_versions(
+        UserInvestmentSubscription.objects.filter(pk__in=subscription_ids).values('user_profile_id')
+    )
+
+
+def build_summary(profile):
+    subscriptions = UserInvestmentSubscription.objects.filter(user_profile=profile, status__in=OPEN_STATUSES)
+    totals = subscriptions.aggregate(
+        total_invested=Sum('total_contributed'),
+        current_value=Sum('current_value'),
+        monthly_contributions=Sum('monthly_contribution'),
+        subscription_count=Count('id'),
+    )
+    total_invested = totals['total_invested'] or Decimal(0)
+    current_value = totals['current_value'] or Decimal(0)
+    total_gain = current_value - total_invested
+    return {
+        'subscriptions': list(subscriptions.select_related('plan')),
+        'total_invested': total_invested,
+        'current_value': current_value,
+        'total_gain': total_gain,
+        'overall_roi': (total_gain / total_invested) * 100 if total_invested > 0 else Decimal(0),
+        'subscription_count': totals['subscription_count'],
+        'monthly_contributions': totals['monthly_contributions'] or Decimal(0),
+        'recent_contributions': list(
+            MonthlyCotributionSchedule.objects.filter(subscription__user_profile=profile)
+            .select_related('subscription__plan')
+            .order_by('-scheduled_date')[:RECENT_CONTRIBUTIONS]
+        ),
+    }
+
+
+def get_summary(profile):
+    key = cache_key(profile)
+    summary = cache.get(key)
+    if summary is None:
+        summary = build_summary(profile)
+        cache.set(key, summary, getattr(settings, 'PORTFOLIO_CACHE_SECONDS', 3600))
+    return summary
@@ -0,0 +1,168 @@
+"""
+Server-side price feed.
+
+`manage.py ingest_prices` asks the configured PRICE_SOURCE for the latest
+quotes, stores them in the cache and the PriceQuote history and marks the
+matching PlanPortfolioAssets. Pages and the deposit flow read prices through
+get_price() / the price_feed endpoint instead of calling out from the browser.
+"""
+import json
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from core import fragments
+from core.models import PlanPortfolioAsset, PriceQuote
+
+
+class PriceSourceError(Exception):
+    pass
+
+
+class CryptoCompareSource:
+    """Latest prices from the cryptocompare pricemulti API."""
+
+    name = "cryptocompare"
+    url = "https://min-api.cryptocompare.com/data/pricemulti"
+
+    def __init__(self, timeout=10):
+        self.timeout = timeout
+
+    def fetch(self, symbols, currency="USD"):
+        # only the ingest command calls out, so requests stays off the web boot path
+        import requests
+
+        try:
+            response = requests.get(
+                self.url,
+                params={"fsyms": ",".join(symbols), "tsyms": currency},
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+            data = response.json()
+        except (requests.RequestException, ValueError) as exc:
+            raise PriceSourceError(f"cryptocompare request failed: {exc}") from exc
+        if data.get("Response") == "Error":
+            raise PriceSourceError(data.get("Message", "cryptocompare returned an error"))
+        return {
+            symbol: Decimal(str(prices[currency]))
+            for symbol, prices in data.items()
+            if isinstance(prices, dict) and currency in prices
+        }
+
+
+class FilePriceSource:
+    """
+    Prices read from a JSON file such as {"USD": {"BTC": "45000.00"}}.
+    Used in tests and local development so nothing calls out.
+    """
+
+    name = "file"
+
+    def __init__(self, path=None):
+        self.path = path or getattr(settings, "PRICE_SOURCE_FILE", None)
+
+    def fetch(self, symbols, currency="USD"):
+        try:
+            with open(self.path) as handle:
+                prices = json.load(handle).get(currency, {})
+        except (OSError, ValueError) as exc:
+            raise PriceSourceError(f"cannot read prices from {self.path}: {exc}") from exc
+        quotes = {}
+        for symbol in symbols:
+            try:
+                quotes[symbol] = Decimal(str(prices[symbol]))
+            except (KeyError, InvalidOperation):
+                continue
+        return quotes
+
+
+def get_source(path=None):
+    return import_string(path or getattr(settings, "PRICE_SOURCE", "core.prices.CryptoCompareSource"))()
+
+
+def cache_key(symbol, currency="USD"):
+    return f"price:{symbol.upper()}:{currency.upper()}"
+
+
+def _cache_quote(symbol, currency, price, fetched_at):
+    quote = {"symbol": symbol, "currency": currency, "price": str(price), "as_of": fetched_at.isoformat()}
+    cache.set(cache_key(symbol, currency), quote, getattr(settings, "PRICE_CACHE_SECONDS", 60))
+    return quote
+
+
+def tracked_symbols():
+    """BTC (deposits and withdrawals) plus every symbol held by an active plan asset."""
+    symbols = set(PlanPortfolioAsset.objects.filter(is_active=True).values_list("symbol", flat=True))
+    symbols.add("BTC")
+    return sorted(s.upper() for s in symbols)
+
+
+def ingest(symbols=None, currency="USD", source=None):
+    """
+    Fetch the latest quotes, cache them, record the ones that moved in the
+    PriceQuote history and update PlanPortfolioAsset.current_price.
+    Returns {symbol: price} for the quotes the source returned.
+    """
+    source = source or get_source()
+    symbols = [s.upper() for s in (symbols or tracked_symbols())]
+    quotes = source.fetch(symbols, currency)
+    now = timezone.now()
+
+    previous = {symbol: get_price(symbol, currency) for symbol in quotes}
+    PriceQuote.objects.bulk_create([
+        PriceQuote(symbol=symbol, currency=currency, price=price, source=source.name, fetched_at=now)
+        for symbol, price in quotes.items()
+        if previous[symbol] is None or Decimal(previous[symbol]["price"]) != price
+    ])
+
+    repriced = 0
+    for symbol, price in quotes.items():
+        _cache_quote(symbol, currency, price, now)
+        if currency == "USD":
+            repriced += PlanPortfolioAsset.objects.filter(symbol=symbol).exclude(current_price=price).update(
+                current_price=price, price_updated_at=now
+            )
+    if repriced:
+        # update() sends no signals; the holdings tables show current_price
+        fragments.bump("assets")
+    return quotes
+
+
+def get_price(symbol, currency="USD"):
+    """
+    The latest quote for `symbol` as {"symbol", "currency", "price", "as_of"},
+    from the cache or, on a miss, the newest PriceQuote row. None if never ingested.
+    """
+    symbol, currency = symbol.upper(), currency.upper()
+    quote = cache.get(cache_key(symbol, currency))
+    if quote is None:
+        row = (
+            PriceQuote.objects.filter(symbol=symbol, currency=currency)
+            .order_by("-fetched_at")
+            .values_list("price", "fetched_at")
+            .first()
+        )
+        if row is None:
+            return None
+        quote = _cache_quote(symbol, currency, *row)
+    return quote
+
+
+def prune_history(older_than_days):
+    """Drop history rows older than `older_than_days`, keeping each symbol's latest quote."""
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    keep = set()
+    for symbol, currency in PriceQuote.objects.values_list("symbol", "currency").distinct():
+        pk = (
+            PriceQuote.objects.filter(symbol=symbol, currency=currency)
+            .order_by("-fetched_at")
+            .values_list("pk", flat=True)
+            .first()
+        )
+        keep.add(pk)
+    return PriceQuote.objects.filter(fetched_at__lt=cutoff).exclude(pk__in=keep).delete()[0]
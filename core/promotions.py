@@ -0,0 +1,120 @@
+"""
+Per-process index of active promotion grants.
+
+Grants change rarely but are read on every plan page and subscription, so
+each process keeps every active grant in memory, grouped by plan and sorted by
+valid_from. "Which grants apply to plan X at amount Y now" is then a bisect
+over that plan's intervals instead of a query. Saving or deleting a grant
+bumps the "promotions" counter in core.versions. The process that made the
+change drops its index at once; every other process reads the counter at most
+once per PROMOTION_VERSION_CHECK_SECONDS, so a warm lookup runs no query and
+another worker stops offering a disabled grant within that many seconds.
+"""
+import bisect
+import threading
+import time
+from collections import defaultdict, namedtuple
+from decimal import Decimal
+
+from django.conf import settings
+from django.utils import timezone
+
+from core import versions
+
+VERSION_SCOPE = "promotions"
+
+GrantIndex = namedtuple("GrantIndex", "version starts grants")
+
+_lock = threading.Lock()
+_index = None
+_checked_at = float("-inf")
+
+
+def invalidate():
+    """Make every process rebuild its index on the next lookup."""
+    global _index
+    versions.bump(VERSION_SCOPE)
+    _index = None
+
+
+def _version():
+    return versions.current(VERSION_SCOPE)[VERSION_SCOPE]
+
+
+def _build(version):
+    from core.models import InvestmentPlanPromotionGrant
+
+    grants = defaultdict(list)
+    for grant in InvestmentPlanPromotionGrant.objects.filter(is_active=True).order_by("valid_from", "pk"):
+        grants[grant.plan_id].append(grant)
+    return GrantIndex(
+        version=version,
+        starts={plan_id: [grant.valid_from for grant in rows] for plan_id, rows in grants.items()},
+        grants=dict(grants),
+    )
+
+
+def get_index():
+    global _index, _checked_at
+    now = time.monotonic()
+    index = _index
+    if index is not None and now - _checked_at < getattr(settings, "PROMOTION_VERSION_CHECK_SECONDS", 5):
+        return index
+    version = _version()
+    if index is None or index.version != version:
+        with _lock:
+            if _index is None or _index.version != version:
+                _index = _build(version)
+            index = _index
+    _checked_at = now
+    return index
+
+
+def active_grants(plan_id, now=None, amount=None):
+    """
+    Grants of `plan_id` valid at `now` (default: the current time), oldest
+    first; with `amount`, only those whose minimum investment it meets.
+    """
+    now = now or timezone.now()
+    index = get_index()
+    starts = index.starts.get(plan_id)
+    if not starts:
+        return []
+    # grants are sorted by valid_from, so only the prefix starting by `now` can apply
+    started = index.grants[plan_id][:bisect.bisect_right(starts, now)]
+    return [
+        grant for grant in started
+        if now <= grant.valid_until and (amount is None or grant.minimum_investment_required <= amount)
+    ]
+
+
+def total_grant(plan_id, amount, now=None):
+    """Sum of every grant `amount` earns on `plan_id` at `now`."""
+    now = now or timezone.now()
+    return sum(
+        (Decimal(grant.calculate_grant_amount(amount, now=now)) for grant in active_grants(plan_id, now, amount)),
+        Decimal("0.00"),
+    )
+
+
+def preview_grants(plan_id, amounts, now=None):
+    """
+    Total grant for each of `amounts` at once, as a float array rounded to
+    cents. Mirrors calculate_grant_amount for every grant active at `now`.
+    """
+    # core.models imports this module, so NumPy stays off the web boot path
+    import numpy as np
+
+    amounts = np.asarray([float(amount) for amount in amounts], dtype=float)
+    total = np.zeros_like(amounts)
+    for grant in active_grants(plan_id, now):
+        if grant.grant_amount:
+            bonus = np.minimum(float(grant.grant_amount), amounts)
+        elif grant.grant_percentage:
+            bonus = amounts * float(grant.grant_percentage) / 100
+        else:
+            continue
+        if grant.maximum_grant_per_user:
+            bonus = np.minimum(bonus, float(grant.maximum_grant_per_user))
+        total += np.where(amounts >= float(grant.minimum_investment_required), bonus, 0.0)
+    return np.round(total, 2)
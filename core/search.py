@@ -0,0 +1,199 @@
+"""
+Full-text search over investment plans.
+
+SQLite keeps an FTS5 table (core_investmentplan_fts) and Postgres a side table
+with a GIN-indexed tsvector column (core_investmentplan_search); both are
+created by migration 0006 and kept in sync by the InvestmentPlan signals.
+Query terms that are not in the catalog vocabulary are widened with their
+closest known spellings, and every term is matched as a prefix, so "retirment
+gro" still finds "Retirement Growth Plan". Results are ordered by relevance,
+with name matches weighted above description matches. Databases without an
+index, and queries without a single word character ("%%", "--"), fall back
+to icontains filtering.
+
+The vocabulary is cached under the "search" counter of core.versions, so a
+plan change made by any process retires it everywhere.
+"""
+import bisect
+import difflib
+import re
+
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.db.models import Case, IntegerField, Q, Value, When
+
+from core import versions
+
+FTS_TABLE = "core_investmentplan_fts"
+PG_TABLE = "core_investmentplan_search"
+VOCABULARY_CACHE_KEY = "search:plan-vocabulary"
+VERSION_SCOPE = "search"
+MAX_RESULTS = 200
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_available = {}
+
+
+def backend(conn=None):
+    vendor = (conn or connection).vendor
+    return vendor if vendor in ("sqlite", "postgresql") else None
+
+
+def create_index(conn):
+    """Create the search table for `conn`'s database; returns False where unsupported."""
+    _available.clear()
+    with conn.cursor() as cursor:
+        if backend(conn) == "sqlite":
+            try:
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+                    "USING fts5(name, description, tokenize='porter unicode61')"
+                )
+            except DatabaseError:
+                return False  # SQLite built without FTS5
+            return True
+        if backend(conn) == "postgresql":
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {PG_TABLE} ("
+                "plan_id bigint PRIMARY KEY REFERENCES core_investmentplan (id) "
+                "ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+                "document tsvector NOT NULL)"
+            )
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {PG_TABLE}_document_gin ON {PG_TABLE} USING GIN (document)"
+            )
+            return True
+    return False
+
+
+def drop_index(conn):
+    _available.clear()
+    table = {"sqlite": FTS_TABLE, "postgresql": PG_TABLE}.get(backend(conn))
+    if table:
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+def index_available(conn=None):
+    conn = conn or connection
+    key = (conn.alias, conn.settings_dict["NAME"])
+    if key not in _available:
+        table = {"sqlite": FTS_TABLE, "postgresql": PG_TABLE}.get(backend(conn))
+        _available[key] = bool(table) and table in conn.introspection.table_names()
+    return _available[key]
+
+
+def index_plans(rows, conn=None):
+    """(id, name, description) rows to (re)index; replaces any existing entries."""
+    conn = conn or connection
+    rows = list(rows)
+    if not rows or not index_available(conn):
+        return 0
+    ids = [(pk,) for pk, _, _ in rows]
+    with conn.cursor() as cursor:
+        if backend(conn) == "sqlite":
+            cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", ids)
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, name, description) VALUES (%s, %s, %s)", rows
+            )
+        else:
+            cursor.executemany(
+                f"INSERT INTO {PG_TABLE} (plan_id, document) VALUES (%s, "
+                "setweight(to_tsvector('english', %s), 'A') || setweight(to_tsvector('english', %s), 'B')) "
+                "ON CONFLICT (plan_id) DO UPDATE SET document = EXCLUDED.document",
+                rows,
+            )
+    return len(rows)
+
+
+def unindex_plans(ids, conn=None):
+    conn = conn or connection
+    if not ids or not index_available(conn):
+        return
+    table, column = (FTS_TABLE, "rowid") if backend(conn) == "sqlite" else (PG_TABLE, "plan_id")
+    with conn.cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {table} WHERE {column} = %s", [(pk,) for pk in ids])
+
+
+def invalidate():
+    """Retire the cached vocabulary in every process."""
+    versions.bump(VERSION_SCOPE)
+
+
+def rebuild_index(conn=None):
+    from core.models import InvestmentPlan
+
+    conn = conn or connection
+    if not index_available(conn):
+        return 0
+    with conn.cursor() as cursor:
+        table = FTS_TABLE if backend(conn) == "sqlite" else PG_TABLE
+        cursor.execute(f"DELETE FROM {table}")
+    indexed = index_plans(InvestmentPlan.objects.values_list("id", "name", "description").iterator(), conn)
+    invalidate()
+    return indexed
+
+
+def vocabulary():
+    """Every lower-cased word in the plan catalog, cached until a plan changes."""
+    key = f"{VOCABULARY_CACHE_KEY}:{versions.current(VERSION_SCOPE)[VERSION_SCOPE]}"
+    words = cache.get(key)
+    if words is None:
+        from core.models import InvestmentPlan
+
+        words = set()
+        for name, description in InvestmentPlan.objects.values_list("name", "description").iterator():
+            words.update(w.lower() for w in _WORD.findall(f"{name} {description}"))
+        words = sorted(words)
+        cache.set(key, words, None)
+    return words
+
+
+def expand_terms(query):
+    """Each query word plus its closest catalog spellings when it has no exact or prefix match."""
+    words = vocabulary()
+    expanded = []
+    for term in (w.lower() for w in _WORD.findall(query)[:8]):
+        variants = [term]
+        # words is sorted, so the first word >= term is the only prefix candidate to check
+        position = bisect.bisect_left(words, term)
+        if position == len(words) or not words[position].startswith(term):
+            variants += difflib.get_close_matches(term, words, n=3, cutoff=0.75)
+        expanded.append(variants)
+    return expanded
+
+
+def _ranked_ids(terms):
+    if backend() == "sqlite":
+        match = " AND ".join(
+            "(" + " OR ".join(f'"{variant}"*' for variant in variants) + ")" for variants in terms
+        )
+        sql = (
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+            f"ORDER BY bm25({FTS_TABLE}, 10.0, 1.0) LIMIT {MAX_RESULTS}"
+        )
+    else:
+        match = " & ".join(
+            "(" + " | ".join(f"{variant}:*" for variant in variants) + ")" for variants in terms
+        )
+        sql = (
+            f"SELECT plan_id FROM {PG_TABLE}, to_tsquery('english', %s) query "
+            f"WHERE document @@ query ORDER BY ts_rank_cd(document, query) DESC LIMIT {MAX_RESULTS}"
+        )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [match])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def search_plans(queryset, query):
+    """`queryset` narrowed to plans matching `query`, best match first."""
+    query = query.strip()
+    if not query:
+        return queryset.none()
+    terms = expand_terms(query)
+    if not terms or not index_available():
+        return queryset.filter(Q(name__icontains=query) | Q(description__icontains=query))
+    ids = _ranked_ids(terms)
+    return queryset.filter(pk__in=ids).order_by(
+        Case(*[When(pk=pk, then=Value(rank)) for rank, pk in enumerate(ids)], output_field=IntegerField())
+    )
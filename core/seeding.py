@@ -0,0 +1,294 @@
+"""
+Synthetic data at load-test scale.
+
+`manage.py seed_load_data` fills an existing database with members and their
+money and investment history. Every table is written with chunked
+bulk_create(), so no per-row post_save receiver runs. The rows those
+receivers would have maintained are written directly: each wallet's opening
+LedgerEntry matches its balance, WalletTotals are summed while the
+transactions are generated, and plan AUM/investor counts are reconciled at
+the end.
+
+Activity is heavy-tailed: each member gets a log-normal weight that decides
+how many transactions, admin requests and subscriptions they own, so a few
+members hold long histories and most hold a handful of rows. Amounts are
+log-normal around a few hundred dollars and timestamps are spread over the
+last `days` days.
+"""
+import math
+import random
+import time
+from bisect import bisect
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from dateutil.relativedelta import relativedelta
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import InvestmentPlan, MonthlyCotributionSchedule, UserInvestmentSubscription
+from creyp.utils import allocate_ids
+from users.models import (
+    AdminTransaction, KycDocument, LedgerEntry, Profile, Transaction, Wallet, WalletTotals,
+)
+
+TRANSACTION_STATUSES = (
+    ('credit', 60), ('pending', 10), ('failed', 9), ('hidden', 7),
+    ('confirming', 6), ('processing', 5), ('error', 3),
+)
+SUBSCRIPTION_STATUSES = (('active', 70), ('completed', 12), ('paused', 10), ('cancelled', 8))
+KYC_STATUSES = (('approved', 70), ('pending', 20), ('rejected', 10))
+KYC_TYPES = (('id', 55), ('financial', 25), ('loan', 10), ('other', 10))
+DEPOSIT_PACKS = (('starter', 70), ('exchange-traded-funds', 30))
+COUNTRIES = (('US', 30), ('GB', 15), ('NG', 12), ('DE', 8), ('CA', 8), ('IN', 8), ('AU', 5), ('', 14))
+
+
+@contextmanager
+def explicit_timestamps(*fields):
+    """Let bulk_create() keep the (model, field) auto_now_add values it is given."""
+    fields = [model._meta.get_field(name) for model, name in fields]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Generator:
+    def __init__(self, rng, days, chunk_size, log):
+        self.rng = rng
+        self.now = timezone.now()
+        self.days = days
+        self.chunk_size = chunk_size
+        self.log = log
+        self.counts = {}
+
+    def picker(self, weighted):
+        """choices() over a fixed distribution, with the cumulative weights computed once."""
+        values, weights = zip(*weighted)
+        total, cumulative = 0, []
+        for weight in weights:
+            total += weight
+            cumulative.append(total)
+        return lambda: values[bisect(cumulative, self.rng.random() * total)]
+
+    def amount(self, median=400, spread=1.1):
+        return Decimal(f'{math.exp(self.rng.gauss(math.log(median), spread)):.2f}')
+
+    def moment(self, after=None):
+        """A time in the last `days` days, or between `after` and now."""
+        start = after or self.now - timedelta(days=self.days)
+        return start + (self.now - start) * self.rng.random()
+
+    def write(self, model, rows):
+        """bulk_create() `rows` (an iterable) in chunks; returns the number written."""
+        started, written, chunk = time.perf_counter(), 0, []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= self.chunk_size:
+                written += self._flush(model, chunk)
+                chunk = []
+        written += self._flush(model, chunk)
+        label = model.__name__
+        self.counts[label] = self.counts.get(label, 0) + written
+        self.log(f'  {written:>9,} {label} in {time.perf_counter() - started:.1f}s')
+        return written
+
+    def _flush(self, model, chunk):
+        if chunk:
+            with transaction.atomic():
+                model.objects.bulk_create(chunk)
+        return len(chunk)
+
+
+def generate(users, transactions, admin_transactions, subscriptions, kyc_documents,
+             days=365, chunk_size=5000, prefix='load', seed=0, log=print):
+    """Write the requested rows and return {table: rows written}."""
+    gen = Generator(random.Random(seed), days, chunk_size, log)
+    rng = gen.rng
+    if not InvestmentPlan.objects.exists():
+        call_command('seed_investment_plans', stdout=StringIO())
+
+    # members: the weight is how active a member is in every table below
+    joined = [gen.moment() for _ in range(users)]
+    password = make_password(None)
+    gen.write(User, (
+        User(
+            username=f'{prefix}{i:07d}', email=f'{prefix}{i:07d}@example.com', password=password,
+            first_name=f'Member{i}', date_joined=joined[i], last_login=gen.moment(joined[i]),
+        )
+        for i in range(users)
+    ))
+    user_ids = dict(
+        User.objects.filter(username__startswith=prefix).values_list('username', 'pk')
+    )
+    user_ids = [user_ids[f'{prefix}{i:07d}'] for i in range(users)]
+    country = gen.picker(COUNTRIES)
+    depositor = [rng.random() < 0.7 for _ in range(users)]
+    gen.write(Profile, (
+        Profile(
+            user_id=user_id, signup_confirmation=rng.random() < 0.9, deposit_before=depositor[i],
+            country=country(), gender=rng.choice(('', 'female', 'male')),
+        )
+        for i, user_id in enumerate(user_ids)
+    ))
+    profile_by_user = dict(Profile.objects.filter(user_id__in=user_ids).values_list('user_id', 'pk'))
+    profile_ids = [profile_by_user[user_id] for user_id in user_ids]
+
+    balances = [gen.amount(1500, 1.3) if depositor[i] else Decimal('0.00') for i in range(users)]
+    gen.write(Wallet, (
+        Wallet(user_id=profile_id, balance=balances[i], timestamp=joined[i])
+        for i, profile_id in enumerate(profile_ids)
+    ))
+    wallet_by_profile = dict(Wallet.objects.filter(user_id__in=profile_ids).values_list('user_id', 'pk'))
+    wallet_ids = [wallet_by_profile[profile_id] for profile_id in profile_ids]
+    gen.write(LedgerEntry, (
+        LedgerEntry(wallet_id=wallet_ids[i], amount=balance, kind='opening', memo='Seeded opening balance',
+                    created_at=joined[i])
+        for i, balance in enumerate(balances)
+        if balance
+    ))
+
+    activity, total = [], 0.0
+    for _ in range(users):
+        total += math.exp(rng.gauss(0, 1.2))
+        activity.append(total)
+
+    def member():
+        return bisect(activity, rng.random() * total)
+
+    status = gen.picker(TRANSACTION_STATUSES)
+    totals = defaultdict(lambda: defaultdict(Decimal))
+
+    def wallet_transactions():
+        remaining = transactions
+        while remaining:
+            chunk = []
+            for _ in range(min(remaining, chunk_size)):
+                i = member()
+                row = Transaction(
+                    wallet_id=wallet_ids[i], amount=str(gen.amount()), status=status(),
+                    timestamp=gen.moment(joined[i]),
+                )
+                totals[row.wallet_id][row.status] += Decimal(row.amount)
+                chunk.append(row)
+            remaining -= len(chunk)
+            yield from Transaction.assign_ids(chunk)
+
+    with explicit_timestamps((Transaction, 'timestamp')):
+        gen.write(Transaction, wallet_transactions())
+    gen.write(WalletTotals, (
+        WalletTotals(wallet_id=wallet_id, **{field: totals[wallet_id][field] for field in WalletTotals.STATUS_FIELDS})
+        for wallet_id in wallet_ids
+    ))
+
+    pack = gen.picker(DEPOSIT_PACKS)
+
+    def admin_requests():
+        ids = iter(allocate_ids(admin_transactions))
+        for _ in range(admin_transactions):
+            i = member()
+            withdraw = depositor[i] and rng.random() < 0.35
+            yield AdminTransaction(
+                wallet_id=wallet_ids[i], plan='withdraw' if withdraw else pack(),
+                amount=str(gen.amount(300)), btc_address=f'bc1q{rng.getrandbits(160):040x}',
+                transactionId=next(ids), timestamp=gen.moment(gen.now - timedelta(days=min(days, 14))),
+            )
+
+    gen.write(AdminTransaction, admin_requests())
+
+    subscribed = write_subscriptions(gen, subscriptions, member, profile_ids, joined)
+    write_contributions(gen, subscribed)
+    call_command('reconcile_plan_rollups', stdout=StringIO())
+
+    doc_type, doc_status = gen.picker(KYC_TYPES), gen.picker(KYC_STATUSES)
+    with explicit_timestamps((KycDocument, 'uploaded_at')):
+        gen.write(KycDocument, (
+            KycDocument(
+                profile_id=profile_ids[i], document_type=doc_type(), status=doc_status(),
+                file=f'kyc/seed/{prefix}-{n}.pdf', uploaded_at=gen.moment(joined[i]),
+            )
+            for n, i in enumerate(member() for _ in range(kyc_documents))
+        ))
+    return gen.counts
+
+
+def write_subscriptions(gen, count, member, profile_ids, joined):
+    """Returns [(subscription id, start, monthly contribution, status)] for the contribution history."""
+    rng = gen.rng
+    plans = list(InvestmentPlan.objects.values_list('pk', 'minimum_investment', 'recommended_duration_months'))
+    # (profile, plan) is unique, so draw distinct pairs, busy members first
+    pairs = {}
+    limit = min(count, len(profile_ids) * len(plans))
+    while len(pairs) < limit:
+        i = member()
+        plan = rng.choice(plans)
+        pairs.setdefault((profile_ids[i], plan[0]), (i, plan))
+
+    status = gen.picker(SUBSCRIPTION_STATUSES)
+    rows = []
+    for (profile_id, plan_id), (i, (_, minimum, months)) in pairs.items():
+        start = gen.moment(joined[i])
+        initial = (minimum * Decimal(rng.randint(1, 10))).quantize(Decimal('0.01'))
+        monthly = gen.amount(150, 0.6) if rng.random() < 0.6 else Decimal('0.00')
+        age = relativedelta(gen.now, start)
+        paid_months = age.years * 12 + age.months
+        contributed = initial + monthly * paid_months
+        value = (contributed * Decimal(f'{math.exp(rng.gauss(0.05, 0.15)):.4f}')).quantize(Decimal('0.01'))
+        roi = min(max((value - initial) / initial * 100, Decimal('-999.99')), Decimal('999.99'))
+        state = status()
+        rows.append(UserInvestmentSubscription(
+            user_profile_id=profile_id, plan_id=plan_id, initial_investment=initial,
+            current_value=value, total_contributed=contributed, total_returns=value - contributed,
+            roi_percentage=roi.quantize(Decimal('0.01')), status=state, subscription_start_date=start,
+            planned_end_date=start + relativedelta(months=months or 12),
+            actual_end_date=gen.moment(start) if state in ('completed', 'cancelled') else None,
+            monthly_contribution=monthly,
+            next_contribution_date=start + relativedelta(months=paid_months + 1) if monthly else None,
+        ))
+    with explicit_timestamps((UserInvestmentSubscription, 'subscription_start_date')):
+        gen.write(UserInvestmentSubscription, rows)
+
+    ids = {
+        (profile_id, plan_id): pk
+        for profile_id, plan_id, pk in UserInvestmentSubscription.objects.filter(
+            user_profile_id__in={profile_id for profile_id, _ in pairs}
+        ).values_list('user_profile_id', 'plan_id', 'pk').iterator()
+    }
+    return [
+        (ids[(row.user_profile_id, row.plan_id)], row.subscription_start_date, row.monthly_contribution, row.status)
+        for row in rows
+        if row.monthly_contribution
+    ]
+
+
+def write_contributions(gen, subscribed):
+    """Monthly rows from each start to today, plus the next scheduled one for active plans."""
+    today = gen.now.date()
+
+    def schedule():
+        for subscription_id, start, amount, state in subscribed:
+            day = start.date() + relativedelta(months=1)
+            while day <= today:
+                skipped = state == 'paused' and gen.rng.random() < 0.3
+                yield MonthlyCotributionSchedule(
+                    subscription_id=subscription_id, contribution_amount=amount, scheduled_date=day,
+                    status='skipped' if skipped else 'completed',
+                    actual_contribution_date=None if skipped else day,
+                    actual_amount=None if skipped else amount,
+                )
+                day += relativedelta(months=1)
+            if state == 'active':
+                yield MonthlyCotributionSchedule(
+                    subscription_id=subscription_id, contribution_amount=amount, scheduled_date=day,
+                )
+
+    gen.write(MonthlyCotributionSchedule, schedule())
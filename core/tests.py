@@ -1,3 +1,722 @@
-from django.test import TestCase
+"""
+Tests for the core app.
 
-# Create your tests here.
+QueryBudgetTests enforces query-count budgets for every page in creyp.urls.
+Each URL is requested once at a small data size and once after every table
+it could list (the member's transactions, ledger, subscriptions and their
+contributions, the staff queues, plans, assets, grants, KYC documents,
+referrals, price history) has grown. A page whose query count moves between the two sizes
+has an N+1 somewhere; the failure names every statement that ran more often
+and the project frames it was issued from. Each page must also stay under
+its budget.
+
+Templates are rendered with the cache disabled, so a cached fragment cannot
+hide the queries behind it.
+"""
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from datetime import date, timedelta
+from collections import Counter
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+import requests
+from allauth.account.models import EmailAddress
+from allauth.socialaccount.models import SocialAccount, SocialApp, SocialToken
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models.query import QuerySet
+from django.test import Client, TestCase, override_settings
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from django.utils import timezone
+
+from core import (
+    contributions, fragments, mailer, portfolio, prices, promotions, revaluation, search, snapshots, versions,
+)
+from core.models import (
+    InvestmentPlan, InvestmentPlanPromotionGrant, MonthlyCotributionSchedule, OutboundEmail, PlanPortfolioAsset,
+    PriceQuote, RevaluationRun, SubscriptionValueSnapshot, UserInvestmentSubscription,
+)
+from core.seeding import generate
+from creyp.utils import allocate_ids, claim_batch
+from users import ledger
+from users.models import AdminTransaction, AdminWallet, KycDocument, Profile, Transaction
+
+DEFAULT_BUDGET = 10
+# pages that legitimately need more than DEFAULT_BUDGET queries
+BUDGETS = {
+    'admin:core_monthlycotributionschedule_change': 13,
+    'admin:core_userinvestmentsubscription_change': 11,
+    'admin:users_wallet_delete': 11,
+}
+# url name -> why it is not requested
+SKIPPED = {
+    'admin-transaction-delete': 'settles the request on GET',
+    'admin-transaction-accept': 'settles the request on GET',
+    'admin-transaction-withdraw-delete': 'settles the request on GET',
+    'admin-transaction-withdraw-accept': 'settles the request on GET',
+    'admin:logout': 'ends the session the other pages are requested with',
+    'admin:view_on_site': 'redirects to the object on the public site',
+    'apple_callback': "allauth's handler for the provider's POST, it crashes on a bare GET",
+    'apple_finish_callback': "allauth's handler for the provider's POST, it crashes on a bare GET",
+}
+# url name -> why its query count grows with the data it shows
+LINEAR = {
+    'admin:auth_user_delete': 'the confirmation lists every object the delete cascades to',
+    'admin:users_profile_delete': 'the confirmation lists every object the delete cascades to',
+    'admin:core_investmentplan_delete': 'the confirmation lists every object the delete cascades to',
+}
+# pages requested signed out, as their visitors see them
+ANONYMOUS = {
+    'refer', 'account_signup', 'account_login', 'account_reset_password', 'account_reset_password_done',
+    'account_reset_password_from_key', 'account_reset_password_from_key_done', 'account_inactive',
+    'account_email_verification_sent', 'account_confirm_email',
+}
+# IN lists and savepoint names vary with the data, not with the code that ran
+PLACEHOLDERS = re.compile(r'(%s, )+%s')
+SAVEPOINT = re.compile(r'"s\d+_x\d+"')
+
+
+def routes(patterns=None, namespace=None):
+    """(url name, pattern) for every named route, namespaced like reverse() expects."""
+    for pattern in get_resolver().url_patterns if patterns is None else patterns:
+        if isinstance(pattern, URLResolver):
+            inner = ':'.join(filter(None, (namespace, pattern.namespace))) or None
+            yield from routes(pattern.url_patterns, inner)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            yield ':'.join(filter(None, (namespace, pattern.name))), pattern
+
+
+class QueryLog:
+    """Every statement run inside the block, with the project frames that issued it."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        stack = [
+            frame for frame in traceback.extract_stack()[:-1]
+            if frame.filename.startswith(str(settings.BASE_DIR)) and 'site-packages' not in frame.filename
+            and not frame.filename.endswith(('manage.py', 'core/tests.py'))
+        ]
+        statement = SAVEPOINT.sub('"savepoint"', PLACEHOLDERS.sub('%s...', sql))
+        self.queries.append((statement, ''.join(traceback.format_list(stack[-6:]))))
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self.wrapper = connection.execute_wrapper(self)
+        self.wrapper.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.wrapper.__exit__(*exc_info)
+
+    def counts(self):
+        return Counter(sql for sql, _ in self.queries)
+
+    def stack(self, sql):
+        return next(stack for statement, stack in self.queries if statement == sql)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+class QueryBudgetTests(TestCase):
+    SMALL, LARGE = 2, 6
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_investment_plans', stdout=StringIO())
+        cls.member = User.objects.create_user('budget', 'budget@example.com', 'budget-password',
+                                              is_staff=True, is_superuser=True)
+        profile = cls.member.profile
+        profile.signup_confirmation = profile.deposit_before = True
+        profile.save()
+        ledger.credit(profile.wallet, Decimal('50000'), kind='adjustment')
+        # one row for every admin model the data below does not fill, so each change page renders
+        Group.objects.create(name='Budget staff')
+        AdminWallet.objects.create(user=profile, btc_address='bc1qbudgetadmin')
+        EmailAddress.objects.create(user=cls.member, email=cls.member.email, verified=True, primary=True)
+        app = SocialApp.objects.create(provider='google', name='Google', client_id='budget', secret='budget')
+        account = SocialAccount.objects.create(user=cls.member, provider='google', uid='budget')
+        SocialToken.objects.create(app=app, account=account, token='budget')
+        cls.grow(cls.SMALL)
+
+    @classmethod
+    def grow(cls, rows):
+        """
+        Add background data through core.seeding, plus rows the signed-in
+        member sees directly, until they own `rows` of each.
+        """
+        generate(users=rows * 5, transactions=rows * 20, admin_transactions=rows * 5, subscriptions=rows * 5,
+                 kyc_documents=rows * 2, days=60, chunk_size=500, prefix=f'budget{rows}-', seed=rows,
+                 log=lambda line: None)
+        profile = Profile.objects.get(user=cls.member)
+        wallet = profile.wallet
+        now = timezone.now()
+
+        plans = list(InvestmentPlan.objects.filter(name__startswith='Budget plan').order_by('pk'))
+        template = InvestmentPlan.objects.order_by('pk').first()
+        for n in range(len(plans), rows):
+            template.pk, template.name, template.is_active = None, f'Budget plan {n}', True
+            template.save()
+            plans.append(InvestmentPlan.objects.get(pk=template.pk))
+        for plan in plans:
+            for n in range(plan.portfolio_assets.count(), rows):
+                PlanPortfolioAsset.objects.create(
+                    plan=plan, asset_type='stock', symbol=f'B{n}', name=f'Budget asset {n}',
+                    allocation_percentage=Decimal('1.00'), current_price=Decimal('10'),
+                )
+            for n in range(plan.grants.count(), rows):
+                InvestmentPlanPromotionGrant.objects.create(
+                    plan=plan, grant_type='welcome_bonus', name=f'Budget grant {n}', description='',
+                    grant_amount=Decimal('25'), minimum_investment_required=Decimal('100'),
+                    valid_from=now - timedelta(days=1), valid_until=now + timedelta(days=30),
+                )
+
+        subscribed = {sub.plan_id: sub for sub in profile.investment_subscriptions.all()}
+        for plan in plans:
+            subscription = subscribed.get(plan.pk) or UserInvestmentSubscription.objects.create(
+                user_profile=profile, plan=plan, initial_investment=Decimal('1000'),
+                current_value=Decimal('1100'), total_contributed=Decimal('1000'), monthly_contribution=Decimal('50'),
+                planned_end_date=now + timedelta(days=365),
+            )
+            for n in range(subscription.contribution_schedules.count(), rows):
+                MonthlyCotributionSchedule.objects.create(
+                    subscription=subscription, contribution_amount=Decimal('50'),
+                    scheduled_date=(now - timedelta(days=30 * (n + 1))).date(), status='completed',
+                )
+
+        for n in range(Transaction.objects.filter(wallet=wallet).count(), rows):
+            Transaction.objects.create(wallet=wallet, amount='250', status=('credit', 'pending')[n % 2])
+            ledger.credit(wallet, Decimal('250'), kind='deposit')
+        queued = AdminTransaction.objects.filter(wallet=wallet).count()
+        for n, transaction_id in enumerate(allocate_ids(rows - queued) if rows > queued else ()):
+            AdminTransaction.objects.create(
+                wallet=wallet, plan=('starter', 'withdraw')[n % 2], amount='300', btc_address='bc1qbudget',
+                transactionId=transaction_id,
+            )
+        for n in range(PriceQuote.objects.filter(symbol='BTC').count(), rows):
+            PriceQuote.objects.create(symbol='BTC', price=Decimal('60000') + n, source='budget',
+                                      fetched_at=now - timedelta(hours=n))
+        for n in range(KycDocument.objects.filter(profile=profile).count(), rows):
+            KycDocument.objects.create(profile=profile, document_type='id', file=f'kyc/budget-{n}.pdf')
+        referred = Profile.objects.exclude(pk=profile.pk).exclude(referred_by=profile).order_by('pk')
+        for other in referred[:max(rows - profile.profile_set.count(), 0)]:
+            other.referred_by = profile
+            other.save(update_fields=['referred_by'])
+            profile.refers.add(other.user)
+
+    def url_kwargs(self):
+        profile = self.member.profile
+        subscription = profile.investment_subscriptions.order_by('pk').first()
+        return {
+            'username': User.objects.exclude(pk=self.member.pk).order_by('pk').first().username,
+            'pack': 'starter', 'plan': 'starter', 'plan_id': subscription.plan_id,
+            'subscription_id': subscription.pk, 'key': 'budget', 'uidb36': '0', 'app_label': 'users',
+        }
+
+    def admin_object(self, name):
+        """The first row of the model behind an admin:<app>_<model>_<view> route."""
+        for model in admin.site._registry:
+            if name.startswith(f'admin:{model._meta.app_label}_{model._meta.model_name}_'):
+                return model._default_manager.order_by('pk').first()
+
+    def paths(self):
+        """url name -> path for every route that can be requested, at the current data."""
+        kwargs = self.url_kwargs()
+        paths = {}
+        for name, pattern in routes():
+            params = set(pattern.pattern.regex.groupindex)
+            if name in SKIPPED or params - kwargs.keys() - {'object_id', 'id'}:
+                continue
+            values = {key: kwargs[key] for key in params & kwargs.keys()}
+            for key in params & {'object_id', 'id'}:
+                values[key] = self.admin_object(name).pk
+            paths[name] = reverse(name, kwargs=values)
+        return paths
+
+    def measure(self, paths):
+        """url name -> QueryLog of a second, warm request to each path."""
+        signed_in, anonymous = Client(), Client()
+        signed_in.force_login(self.member)
+        logs = {}
+        for name, path in paths.items():
+            client = anonymous if name in ANONYMOUS else signed_in
+            client.get(path, secure=True)
+            with QueryLog() as log:
+                response = client.get(path, secure=True)
+            self.assertLess(response.status_code, 500, f'{name} ({path}) answered {response.status_code}')
+            logs[name] = log
+        return logs
+
+    def test_every_page_has_constant_query_count(self):
+        small = self.measure(self.paths())
+        self.grow(self.LARGE)
+        large = self.measure(self.paths())
+        for name, log in sorted(large.items()):
+            with self.subTest(name):
+                if name in LINEAR:
+                    continue
+                before, after = small[name].counts(), log.counts()
+                if sum(after.values()) > sum(before.values()):
+                    grown = [sql for sql in after if after[sql] > before[sql]]
+                    self.fail(
+                        f'{name} ran {sum(before.values())} queries with {self.SMALL} rows and '
+                        f'{sum(after.values())} with {self.LARGE}:\n'
+                        + '\n'.join(f'  {before[sql]} -> {after[sql]}x {sql}\n{log.stack(sql)}' for sql in grown)
+                    )
+                budget = BUDGETS.get(name, DEFAULT_BUDGET)
+                self.assertLessEqual(
+                    len(log.queries), budget, f'{name} ran {len(log.queries)} queries, over its budget of {budget}'
+                )
+
+    def test_every_route_is_requested_or_skipped_on_purpose(self):
+        names = {name for name, _ in routes()}
+        self.assertFalse(set(SKIPPED) - names, 'SKIPPED lists routes that no longer exist')
+        self.assertFalse(names - set(self.paths()) - set(SKIPPED), 'routes with no sample URL arguments')
+
+
+class PromotionIndexTests(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        call_command('seed_investment_plans', stdout=StringIO())
+        self.plan = InvestmentPlan.objects.order_by('pk').first()
+        self.plan.grants.all().delete()
+        # the counters roll back with each test, so no index may outlive one
+        promotions._index = None
+        self.grant = InvestmentPlanPromotionGrant.objects.create(
+            plan=self.plan, grant_type='welcome_bonus', name='Welcome', description='',
+            grant_amount=Decimal('25'), minimum_investment_required=Decimal('100'),
+            valid_from=now - timedelta(days=1), valid_until=now + timedelta(days=30),
+        )
+
+    def test_warm_lookup_runs_no_query(self):
+        promotions.total_grant(self.plan.pk, Decimal('500'))
+        with self.assertNumQueries(0):
+            self.assertEqual(promotions.total_grant(self.plan.pk, Decimal('500')), Decimal('25'))
+
+    def test_change_in_another_process_reaches_this_index(self):
+        started = time.monotonic()
+        self.assertEqual(promotions.total_grant(self.plan.pk, Decimal('500')), Decimal('25'))
+        # another worker disables the grant: only the shared counter moves, not this process's index
+        InvestmentPlanPromotionGrant.objects.filter(pk=self.grant.pk).update(is_active=False)
+        versions.bump(promotions.VERSION_SCOPE)
+        self.assertEqual(promotions.total_grant(self.plan.pk, Decimal('500')), Decimal('25'))
+        later = started + settings.PROMOTION_VERSION_CHECK_SECONDS + 1
+        with mock.patch('core.promotions.time.monotonic', return_value=later):
+            self.assertEqual(promotions.total_grant(self.plan.pk, Decimal('500')), Decimal('0.00'))
+
+    def test_saving_a_grant_invalidates_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.grant.grant_amount = Decimal('40')
+            self.grant.save()
+        self.assertEqual(promotions.total_grant(self.plan.pk, Decimal('500')), Decimal('40'))
+
+
+class FragmentCacheTests(TestCase):
+    def setUp(self):
+        # the counters roll back with each test, so no fragment may outlive one
+        cache.clear()
+        call_command('seed_investment_plans', stdout=StringIO())
+        self.plan = InvestmentPlan.objects.order_by('pk').first()
+        self.asset = PlanPortfolioAsset.objects.create(
+            plan=self.plan, asset_type='crypto', symbol='FRAG', name='Fragment coin',
+            allocation_percentage=Decimal('1.00'), current_price=Decimal('111.11'),
+        )
+        self.path = reverse('plan_detail', args=[self.plan.pk])
+
+    def test_bump_from_another_process_retires_cached_fragment(self):
+        self.assertContains(self.client.get(self.path, secure=True), '$111.11')
+        # what ingest_prices does from the prices process: update() without signals, then bump
+        PlanPortfolioAsset.objects.filter(pk=self.asset.pk).update(current_price=Decimal('222.22'))
+        self.assertContains(self.client.get(self.path, secure=True), '$111.11')
+        fragments.bump('assets')
+        self.assertContains(self.client.get(self.path, secure=True), '$222.22')
+
+
+class RevaluationTests(TestCase):
+    def setUp(self):
+        call_command('seed_investment_plans', stdout=StringIO())
+        self.plan = InvestmentPlan.objects.order_by('pk').first()
+        self.plan.portfolio_assets.all().delete()
+        self.asset = PlanPortfolioAsset.objects.create(
+            plan=self.plan, asset_type='crypto', symbol='RVL', name='Revaluation coin',
+            allocation_percentage=Decimal('100.00'), current_price=Decimal('110'), reference_price=Decimal('100'),
+        )
+        self.subscriptions = [
+            UserInvestmentSubscription.objects.create(
+                user_profile=User.objects.create_user(f'revalue{n}').profile, plan=self.plan,
+                initial_investment=Decimal('1000'), current_value=Decimal('1000'),
+                total_contributed=Decimal('1000'), planned_end_date=timezone.now() + timedelta(days=365),
+            )
+            for n in range(3)
+        ]
+
+    def values(self):
+        return [s.current_value for s in UserInvestmentSubscription.objects.filter(
+            pk__in=[s.pk for s in self.subscriptions]).order_by('pk')]
+
+    def test_failed_run_resumes_at_the_frozen_prices(self):
+        write = revaluation._write_values
+        calls = []
+
+        def fail_second_chunk(params):
+            calls.append(1)
+            if len(calls) == 2:
+                raise RuntimeError('connection lost')
+            write(params)
+
+        with mock.patch('core.revaluation._write_values', side_effect=fail_second_chunk):
+            with self.assertRaises(RuntimeError):
+                revaluation.revalue(plan_ids=[self.plan.pk], chunk_size=1)
+        self.assertEqual(self.values(), [Decimal('1100.00'), Decimal('1000.00'), Decimal('1000.00')])
+        self.asset.refresh_from_db()
+        self.assertEqual(self.asset.reference_price, Decimal('100'))
+
+        # prices keep moving before the re-run; it must finish at the prices the run started with
+        PlanPortfolioAsset.objects.filter(pk=self.asset.pk).update(current_price=Decimal('150'))
+        with self.assertRaises(revaluation.RevaluationInProgress):
+            revaluation.revalue(chunk_size=1)
+        revaluation.revalue(plan_ids=[self.plan.pk], chunk_size=1)
+        self.assertEqual(self.values(), [Decimal('1100.00')] * 3)
+        self.asset.refresh_from_db()
+        self.assertEqual(self.asset.reference_price, Decimal('110'))
+        self.assertFalse(RevaluationRun.objects.filter(finished_at__isnull=True).exists())
+
+        # the next run picks up the move to 150 from the new reference
+        revaluation.revalue(plan_ids=[self.plan.pk])
+        self.assertEqual(self.values(), [Decimal('1500.00')] * 3)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        # the counters roll back with each test, so no vocabulary may outlive one
+        cache.clear()
+        call_command('seed_investment_plans', stdout=StringIO())
+        self.plans = InvestmentPlan.objects.filter(is_active=True)
+
+    def test_misspelled_prefix_finds_the_plan(self):
+        names = [plan.name for plan in search.search_plans(self.plans, 'retirment gro')]
+        self.assertTrue(names and 'Retirement' in names[0], names)
+
+    def test_query_without_words_does_not_list_every_plan(self):
+        for query in ('%%', '--', '   '):
+            with self.subTest(query):
+                self.assertFalse(search.search_plans(self.plans, query).exists())
+
+    def test_vocabulary_follows_a_change_from_another_process(self):
+        self.assertNotIn('zephyrine', search.vocabulary())
+        # another worker renames the plan: only the shared counter moves, not this process's cache
+        InvestmentPlan.objects.filter(pk=self.plans[0].pk).update(name='Zephyrine Plan')
+        search.invalidate()
+        self.assertIn('zephyrine', search.vocabulary())
+
+
+class ClaimBatchTests(TestCase):
+    def setUp(self):
+        self.emails = OutboundEmail.objects.bulk_create([
+            OutboundEmail(subject=f'Alert {n}', to_email=f'member{n}@example.com', template='x.html')
+            for n in range(5)
+        ])
+        self.pending = OutboundEmail.objects.filter(status='pending').order_by('pk')
+
+    def test_concurrent_claims_never_overlap(self):
+        for skip_locked in (True, False):
+            with self.subTest(skip_locked=skip_locked), mock.patch.object(
+                connection.features, 'has_select_for_update_skip_locked', skip_locked
+            ):
+                OutboundEmail.objects.update(status='pending')
+                first = claim_batch(self.pending, 3, status='sending')
+                second = claim_batch(self.pending, 3, status='sending')
+                self.assertEqual(len(first), 3)
+                self.assertEqual(len(second), 2)
+                self.assertFalse(set(first) & set(second))
+                self.assertEqual(claim_batch(self.pending, 3, status='sending'), [])
+
+    def test_fallback_skips_a_row_another_worker_claimed_first(self):
+        listed = QuerySet.values_list
+
+        def list_then_lose_a_row(queryset, *args, **kwargs):
+            rows = list(listed(queryset, *args, **kwargs))
+            # another worker claims the first candidate between our SELECT and UPDATE
+            OutboundEmail.objects.filter(pk=rows[0]).update(status='sending')
+            return rows
+
+        with mock.patch.object(connection.features, 'has_select_for_update_skip_locked', False), \
+                mock.patch.object(QuerySet, 'values_list', list_then_lose_a_row):
+            claimed = claim_batch(self.pending, 3, status='sending')
+        self.assertEqual(claimed, [email.pk for email in self.emails[1:3]])
+
+    def test_send_pending_sends_each_email_once(self):
+        with mock.patch('core.mailer.render_message') as render:
+            self.assertEqual(mailer.send_pending(batch_size=3), (3, 0))
+            self.assertEqual(mailer.send_pending(batch_size=3), (2, 0))
+            self.assertEqual(mailer.send_pending(batch_size=3), (0, 0))
+        self.assertEqual(render.call_count, 5)
+        self.assertEqual(OutboundEmail.objects.filter(status='sent').count(), 5)
+
+
+class ContributionTests(TestCase):
+    def setUp(self):
+        call_command('seed_investment_plans', stdout=StringIO())
+        self.plan = InvestmentPlan.objects.order_by('pk').first()
+        self.today = timezone.localdate()
+        self.subscriptions = [
+            UserInvestmentSubscription.objects.create(
+                user_profile=User.objects.create_user(f'saver{n}').profile, plan=self.plan,
+                initial_investment=Decimal('1000'), current_value=Decimal('1000'),
+                total_contributed=Decimal('1000'), monthly_contribution=Decimal('50'),
+                next_contribution_date=timezone.now(), planned_end_date=timezone.now() + timedelta(days=365),
+            )
+            for n in range(2)
+        ]
+
+    def test_due_contributions_are_paid_once(self):
+        self.assertEqual(contributions.schedule_upcoming(), 2)
+        self.assertEqual(contributions.schedule_upcoming(), 0)
+        aum = InvestmentPlan.objects.get(pk=self.plan.pk).current_aum
+
+        # two workers taking one row each, then nothing left
+        self.assertEqual(contributions.process_batch(batch_size=1), 1)
+        self.assertEqual(contributions.process_batch(batch_size=1), 1)
+        self.assertEqual(contributions.process_batch(batch_size=1), 0)
+
+        for subscription in self.subscriptions:
+            subscription.refresh_from_db()
+            self.assertEqual(subscription.total_contributed, Decimal('1050.00'))
+            self.assertEqual(
+                list(subscription.contribution_schedules.order_by('scheduled_date').values_list('status', flat=True)),
+                ['completed', 'scheduled'],
+            )
+        self.assertEqual(InvestmentPlan.objects.get(pk=self.plan.pk).current_aum, aum + Decimal('100'))
+
+    def test_rows_of_paused_subscriptions_are_skipped(self):
+        contributions.schedule_upcoming()
+        UserInvestmentSubscription.objects.filter(pk=self.subscriptions[0].pk).update(status='paused')
+        self.assertEqual(contributions.skip_inactive(), 1)
+        self.assertEqual(contributions.process_batch(), 1)
+        self.subscriptions[0].refresh_from_db()
+        self.assertEqual(self.subscriptions[0].total_contributed, Decimal('1000.00'))
+
+    def test_reconcile_corrects_drifted_rollups(self):
+        InvestmentPlan.objects.filter(pk=self.plan.pk).update(current_aum=Decimal('5'), number_of_investors=9)
+        out = StringIO()
+        call_command('reconcile_plan_rollups', stdout=out)
+        self.plan.refresh_from_db()
+        self.assertEqual((self.plan.current_aum, self.plan.number_of_investors), (Decimal('2000.00'), 2))
+        self.assertIn('✓ Corrected drift on 1 of', out.getvalue())
+
+
+class SnapshotSeriesTests(TestCase):
+    def setUp(self):
+        call_command('seed_investment_plans', stdout=StringIO())
+        self.subscription = UserInvestmentSubscription.objects.create(
+            user_profile=User.objects.create_user('charted').profile,
+            plan=InvestmentPlan.objects.order_by('pk').first(),
+            initial_investment=Decimal('1000'), current_value=Decimal('1000'), total_contributed=Decimal('1000'),
+            planned_end_date=timezone.now() + timedelta(days=365),
+        )
+        self.start = date(2025, 1, 1)
+        # one row a day for a year, the value rising a dollar a day
+        SubscriptionValueSnapshot.objects.bulk_create([
+            SubscriptionValueSnapshot(
+                subscription=self.subscription, date=self.start + timedelta(days=n),
+                current_value=Decimal(1000 + n), total_contributed=Decimal('1000'),
+            )
+            for n in range(365)
+        ])
+
+    def test_monthly_points_close_on_the_last_day(self):
+        bucket, points = snapshots.series(self.subscription.pk, bucket='month')
+        self.assertEqual(bucket, 'month')
+        self.assertEqual(len(points), 12)
+        self.assertEqual(points[0], {
+            'date': date(2025, 1, 1), 'value': Decimal('1030.00'), 'contributed': Decimal('1000.00'),
+            'low': Decimal('1000.00'), 'high': Decimal('1030.00'),
+        })
+        self.assertEqual(points[-1]['value'], Decimal('1364.00'))
+
+    def test_auto_bucket_follows_the_span(self):
+        self.assertEqual(snapshots.series(self.subscription.pk, start=date(2025, 3, 1), end=date(2025, 3, 31))[0], 'day')
+        self.assertEqual(snapshots.series(self.subscription.pk)[0], 'week')
+        self.assertEqual(snapshots.series(self.subscription.pk, bucket='auto', start=date(2020, 1, 1))[0], 'month')
+
+    def test_taking_a_snapshot_again_replaces_the_day(self):
+        day = self.start + timedelta(days=400)
+        self.assertEqual(snapshots.take_snapshots(day), 1)
+        UserInvestmentSubscription.objects.filter(pk=self.subscription.pk).update(current_value=Decimal('1500'))
+        self.assertEqual(snapshots.take_snapshots(day), 1)
+        self.assertEqual(
+            list(SubscriptionValueSnapshot.objects.filter(date=day).values_list('current_value', flat=True)),
+            [Decimal('1500.00')],
+        )
+
+
+class BenchCommandTests(TestCase):
+    report = {
+        'commit': 'abc1234', 'database': 'sqlite', 'boot': {},
+        'views': {'dashboard_home': {'p50_ms': 4.0, 'p95_ms': 6.5, 'p99_ms': 7.0, 'mean_ms': 4.5, 'queries': 5}},
+    }
+
+    def bench(self, **options):
+        stdout, stderr = StringIO(), StringIO()
+        # the test runner has already set up the test environment the command would set up
+        with mock.patch('core.management.commands.bench.run', return_value=self.report), \
+                mock.patch('core.management.commands.bench.setup_test_environment'), \
+                mock.patch('core.management.commands.bench.teardown_test_environment'):
+            call_command('bench', boot_runs=0, stdout=stdout, stderr=stderr, **options)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_stdout_is_a_report_that_can_be_the_next_baseline(self):
+        stdout, stderr = self.bench()
+        self.assertEqual(json.loads(stdout), self.report)
+        self.assertIn('✓ Benchmarked 1 pages', stderr)
+
+        with tempfile.NamedTemporaryFile('w', suffix='.json') as baseline:
+            baseline.write(stdout)
+            baseline.flush()
+            stdout, stderr = self.bench(baseline=baseline.name)
+        self.assertEqual(json.loads(stdout), self.report)
+        self.assertIn('dashboard_home: p95 6.5ms -> 6.5ms (1.00x), queries 5 -> 5', stderr)
+
+    def test_output_file_leaves_stdout_for_the_summary(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = f'{directory}/report.json'
+            stdout, stderr = self.bench(output=path)
+            with open(path) as handle:
+                self.assertEqual(json.load(handle), self.report)
+        self.assertIn('✓ Benchmarked', stdout)
+        self.assertEqual(stderr, '')
+
+
+class BootImportTests(TestCase):
+    # records every module that imports requests while the serverless entry point boots
+    script = '\n'.join((
+        'import builtins, json, creyp.boot',
+        'importers, original = set(), builtins.__import__',
+        'def record(name, globals=None, *args, **kwargs):',
+        '    if name.split(".")[0] == "requests":',
+        '        importers.add((globals or {}).get("__name__"))',
+        '    return original(name, globals, *args, **kwargs)',
+        'builtins.__import__ = record',
+        'creyp.boot.application()',
+        'print(json.dumps(sorted(filter(None, importers))))',
+    ))
+
+    def test_no_project_module_imports_requests_at_boot(self):
+        env = dict(os.environ, SERVERLESS_BOOT_REPORT='False', DJANGO_SETTINGS_MODULE='creyp.settings')
+        result = subprocess.run(
+            [sys.executable, '-c', self.script], cwd=settings.BASE_DIR, env=env,
+            capture_output=True, text=True, check=True,
+        )
+        importers = json.loads(result.stdout.strip().splitlines()[-1])
+        project = {path.parent.name for path in Path(settings.BASE_DIR).glob('*/__init__.py')}
+        # allauth's OAuth2 client still imports it; the price feed only does when it fetches
+        self.assertEqual([name for name in importers if name.split('.')[0] in project], [])
+
+
+@override_settings(PRICE_SOURCE='core.prices.CryptoCompareSource')
+class PriceFeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        call_command('seed_investment_plans', stdout=StringIO())
+        self.plan = InvestmentPlan.objects.order_by('pk').first()
+        PlanPortfolioAsset.objects.all().delete()
+        self.asset = PlanPortfolioAsset.objects.create(
+            plan=self.plan, asset_type='crypto', symbol='ETH', name='Ether',
+            allocation_percentage=Decimal('100.00'), current_price=Decimal('1'),
+        )
+
+    def upstream(self, **data):
+        """Patch the cryptocompare HTTP call to answer `data`."""
+        response = mock.Mock(**{'json.return_value': data})
+        return mock.patch('requests.get', return_value=response)
+
+    def test_ingest_command_caches_records_and_reprices(self):
+        with self.upstream(BTC={'USD': 45000.5}, ETH={'USD': 3000}) as get:
+            call_command('ingest_prices', stdout=StringIO())
+        self.assertEqual(get.call_args.kwargs['params'], {'fsyms': 'BTC,ETH', 'tsyms': 'USD'})
+        self.asset.refresh_from_db()
+        self.assertEqual(self.asset.current_price, Decimal('3000'))
+        with self.assertNumQueries(0):
+            self.assertEqual(prices.get_price('btc')['price'], '45000.5')
+
+        # an unchanged price is cached again but not added to the history
+        with self.upstream(BTC={'USD': 45000.5}, ETH={'USD': 3100}):
+            call_command('ingest_prices', stdout=StringIO())
+        self.assertEqual(PriceQuote.objects.filter(symbol='BTC').count(), 1)
+        self.assertEqual(PriceQuote.objects.filter(symbol='ETH').count(), 2)
+
+    def test_cache_miss_falls_back_to_the_newest_quote(self):
+        self.assertIsNone(prices.get_price('BTC'))
+        PriceQuote.objects.create(symbol='BTC', price=Decimal('100'), source='test',
+                                  fetched_at=timezone.now() - timedelta(hours=1))
+        PriceQuote.objects.create(symbol='BTC', price=Decimal('101'), source='test')
+        with self.assertNumQueries(1):
+            self.assertEqual(Decimal(prices.get_price('BTC')['price']), Decimal('101'))
+        with self.assertNumQueries(0):
+            prices.get_price('BTC')
+
+    def test_upstream_failure_is_a_command_error(self):
+        with self.upstream(Response='Error', Message='rate limit'):
+            with self.assertRaisesMessage(CommandError, 'rate limit'):
+                call_command('ingest_prices', stdout=StringIO())
+        with mock.patch('requests.get', side_effect=requests.ConnectionError('unreachable')):
+            with self.assertRaisesMessage(CommandError, 'cryptocompare request failed: unreachable'):
+                call_command('ingest_prices', stdout=StringIO())
+        self.assertFalse(PriceQuote.objects.exists())
+
+
+class PortfolioSummaryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        call_command('seed_investment_plans', stdout=StringIO())
+        self.plan = InvestmentPlan.objects.order_by('pk').first()
+        self.user = User.objects.create_user('portfolio')
+        self.subscription = UserInvestmentSubscription.objects.create(
+            user_profile=self.user.profile, plan=self.plan,
+            initial_investment=Decimal('1000'), current_value=Decimal('1100'),
+            total_contributed=Decimal('1000'), monthly_contribution=Decimal('50'),
+            next_contribution_date=timezone.now(), planned_end_date=timezone.now() + timedelta(days=365),
+        )
+
+    def summary(self):
+        # a fresh profile per request, as get_profile() loads it
+        return portfolio.get_summary(Profile.objects.get(user=self.user))
+
+    def test_warm_summary_costs_no_query(self):
+        self.assertEqual(self.summary()['current_value'], Decimal('1100'))
+        profile = Profile.objects.get(user=self.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(portfolio.get_summary(profile)['subscription_count'], 1)
+
+    def test_saving_a_subscription_moves_the_version(self):
+        self.summary()
+        version = Profile.objects.get(user=self.user).portfolio_version
+        self.subscription.current_value = Decimal('1250')
+        self.subscription.save()
+        self.assertEqual(Profile.objects.get(user=self.user).portfolio_version, version + 1)
+        self.assertEqual(self.summary()['current_value'], Decimal('1250'))
+
+        self.subscription.status = 'cancelled'
+        self.subscription.save()
+        self.assertEqual(self.summary()['subscription_count'], 0)
+
+    def test_bulk_contribution_writes_move_the_version(self):
+        self.assertEqual(self.summary()['recent_contributions'], [])
+        self.assertEqual(contributions.schedule_upcoming(), 1)
+        self.assertEqual(len(self.summary()['recent_contributions']), 1)
+        self.assertEqual(contributions.process_batch(), 1)
+        self.assertEqual(self.summary()['total_invested'], Decimal('1050.00'))
@@ -0,0 +1,27 @@
+"""
+Shared invalidation counters.
+
+Without REDIS_URL the Django cache is per process, so a token kept there only
+reaches the process that wrote it: the other gunicorn workers, and the web
+processes when the prices process makes the change, would keep serving the
+old data. Each scope is instead a CacheVersion row. bump() increments it in
+the database every process shares, and current() reads any number of scopes
+in one query; callers key their caches and in-memory indexes on the result.
+"""
+from django.db.models import F
+
+
+def current(*scopes):
+    """{scope: version} for `scopes`; 0 for a scope never bumped."""
+    from core.models import CacheVersion
+
+    found = dict(CacheVersion.objects.filter(scope__in=scopes).values_list("scope", "version"))
+    return {scope: found.get(scope, 0) for scope in scopes}
+
+
+def bump(*scopes):
+    """Move every scope in `scopes` to a new version."""
+    from core.models import CacheVersion
+
+    CacheVersion.objects.bulk_create([CacheVersion(scope=scope) for scope in scopes], ignore_conflicts=True)
+    CacheVersion.objects.filter(scope__in=scopes).update(version=F("version") + 1)
@@ -1,5 +1,9 @@
 from django.shortcuts import redirect, render, get_object_or_404
 from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.utils.dateparse import parse_date, parse_datetime
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import require_GET
 from django.db.models import Q, Sum, Avg, Count
 from django.utils import timezone
 from datetime import timedelta
@@ -8,6 +12,12 @@ from decimal import Decimal
 from creyp.utils import send_contact_us_email, set_cookie_function
 from users.models import Profile
 from users.decorators import update_user_ip
+from users.middleware import get_profile
+from core.portfolio import get_summary
+from core.prices import get_price
+from core.promotions import active_grants, total_grant
+from core.search import search_plans
+from core.snapshots import BUCKETS, series
 from core.models import (
     InvestmentPlan,
     UserInvestmentSubscription,
@@ -37,18 +47,15 @@ def investment_plans_browse_view(request):
     if risk_level:
         plans = plans.filter(risk_level=risk_level)
     if search:
-        plans = plans.filter(
-            Q(name__icontains=search) |
-            Q(description__icontains=search)
-        )
+        plans = search_plans(plans, search)
     
     # Add user's current subscriptions to context
     user_subscriptions = []
     if request.user.is_authenticated:
         user_subscriptions = UserInvestmentSubscription.objects.filter(
-            user_profile=request.user.profile,
+            user_profile=get_profile(request),
             status__in=['active', 'paused']
-        )
+        ).select_related('plan')
     
     context = {
         'title': 'Investment Plans',
@@ -65,17 +72,13 @@ def investment_plan_detail_view(request, plan_id):
     
     plan = get_object_or_404(InvestmentPlan, id=plan_id, is_active=True)
     assets = plan.portfolio_assets.filter(is_active=True)
-    promotions = plan.grants.filter(
-        is_active=True,
-        valid_from__lte=timezone.now(),
-        valid_until__gte=timezone.now()
-    )
+    promotions = active_grants(plan.pk)
     
     # Check if user already has this subscription
     has_subscription = False
     if request.user.is_authenticated:
         has_subscription = UserInvestmentSubscription.objects.filter(
-            user_profile=request.user.profile,
+            user_profile=get_profile(request),
             plan=plan,
             status__in=['active', 'paused']
         ).exists()
@@ -85,6 +88,8 @@ def investment_plan_detail_view(request, plan_id):
         'plan': plan,
         'assets': assets,
         'promotions': promotions,
+        # grants start and expire without a write, so the cached list varies on which are live
+        'promotion_ids': '.'.join(str(grant.pk) for grant in promotions),
         'has_subscription': has_subscription,
     }
     
@@ -100,7 +105,7 @@ def subscribe_to_plan_view(request, plan_id):
     
     # Check if user already has this subscription
     existing = UserInvestmentSubscription.objects.filter(
-        user_profile=request.user.profile,
+        user_profile=get_profile(request),
         plan=plan,
         status__in=['active', 'paused']
     ).first()
@@ -116,19 +121,20 @@ def subscribe_to_plan_view(request, plan_id):
             initial_investment = Decimal(initial_investment)
             
             # Validate investment amount
-            if initial_investment < plan.min_investment:
-                error = f'Minimum investment is ${plan.min_investment}'
+            if initial_investment < plan.minimum_investment:
+                error = f'Minimum investment is ${plan.minimum_investment}'
                 return render(request, 'investment/subscribe_plan.html', {
                     'plan': plan,
                     'form': {'initial_investment': {'errors': [error]}},
                 })
             
             # Create subscription
-            duration_days = plan.investment_duration * 30
-            planned_end_date = timezone.now() + timedelta(days=duration_days)
+            duration_days = plan.recommended_duration_months * 30
+            now = timezone.now()
+            planned_end_date = now + timedelta(days=duration_days)
             
             subscription = UserInvestmentSubscription.objects.create(
-                user_profile=request.user.profile,
+                user_profile=get_profile(request),
                 plan=plan,
                 initial_investment=initial_investment,
                 current_value=initial_investment,
@@ -139,27 +145,16 @@ def subscribe_to_plan_view(request, plan_id):
             # Add monthly contribution if provided
             if monthly_contribution:
                 subscription.monthly_contribution = Decimal(monthly_contribution)
-                subscription.next_contribution_date = timezone.now() + timedelta(days=30)
+                subscription.next_contribution_date = now + timedelta(days=30)
                 subscription.save()
             
             # Apply grants if available
-            applicable_grants = plan.grants.filter(
-                is_active=True,
-                valid_from__lte=timezone.now(),
-                valid_until__gte=timezone.now(),
-                minimum_investment_required__lte=initial_investment
-            )
-            
-            total_grant = Decimal(0)
-            for grant in applicable_grants:
-                grant_amount = grant.calculate_grant_amount(initial_investment)
-                if grant_amount > 0:
-                    total_grant += grant_amount
+            grant = total_grant(plan.pk, initial_investment, now=now)
             
             # Add grant to subscription
-            if total_grant > 0:
-                subscription.current_value += total_grant
-                subscription.total_contributed += total_grant
+            if grant > 0:
+                subscription.current_value += grant
+                subscription.total_contributed += grant
                 subscription.save()
             
             return redirect('investment_dashboard')
@@ -172,11 +167,7 @@ def subscribe_to_plan_view(request, plan_id):
             })
     
     # Get active promotions
-    promotions = plan.grants.filter(
-        is_active=True,
-        valid_from__lte=timezone.now(),
-        valid_until__gte=timezone.now()
-    )
+    promotions = active_grants(plan.pk)
     
     context = {
         'title': f'Subscribe to {plan.name}',
@@ -192,40 +183,9 @@ def subscribe_to_plan_view(request, plan_id):
 def investment_dashboard_view(request):
     """User's investment dashboard with all subscriptions."""
     
-    subscriptions = UserInvestmentSubscription.objects.filter(
-        user_profile=request.user.profile,
-        status__in=['active', 'paused']
-    )
-    
-    # Calculate totals
-    total_invested = subscriptions.aggregate(Sum('total_contributed'))['total_contributed__sum'] or Decimal(0)
-    current_value = subscriptions.aggregate(Sum('current_value'))['current_value__sum'] or Decimal(0)
-    total_gain = current_value - total_invested
-    
-    # Calculate overall ROI
-    overall_roi = Decimal(0)
-    if total_invested > 0:
-        overall_roi = (total_gain / total_invested) * 100
-    
-    # Get recent contributions
-    from core.models import MonthlyCotributionSchedule
-    recent_contributions = MonthlyCotributionSchedule.objects.filter(
-        subscription__user_profile=request.user.profile
-    ).order_by('-scheduled_date')[:10]
-    
-    # Get monthly contributions total
-    monthly_contributions = subscriptions.aggregate(Sum('monthly_contribution'))['monthly_contribution__sum'] or Decimal(0)
-    
     context = {
         'title': 'Investment Dashboard',
-        'subscriptions': subscriptions,
-        'total_invested': total_invested,
-        'current_value': current_value,
-        'total_gain': total_gain,
-        'overall_roi': overall_roi,
-        'subscription_count': subscriptions.count(),
-        'monthly_contributions': monthly_contributions,
-        'recent_contributions': recent_contributions,
+        **get_summary(get_profile(request)),
     }
     
     return render(request, 'investment/dashboard.html', context)
@@ -239,7 +199,7 @@ def subscription_detail_view(request, subscription_id):
     subscription = get_object_or_404(
         UserInvestmentSubscription,
         id=subscription_id,
-        user_profile=request.user.profile
+        user_profile=get_profile(request)
     )
     
     # Get contribution schedule
@@ -263,6 +223,45 @@ def subscription_detail_view(request, subscription_id):
     return render(request, 'investment/subscription_detail.html', context)
 
 
+@login_required
+@require_GET
+@cache_control(private=True, max_age=300)
+def subscription_history_view(request, subscription_id):
+    """
+    Value history of a subscription for charts, downsampled to ?bucket=
+    day|week|month (default: picked from the span), optionally limited to
+    ?start= and ?end= (YYYY-MM-DD).
+    """
+    subscription = get_object_or_404(
+        UserInvestmentSubscription.objects.only('id'),
+        id=subscription_id,
+        user_profile=get_profile(request)
+    )
+    bucket = request.GET.get('bucket', 'auto')
+    try:
+        start = parse_date(request.GET.get('start', ''))
+        end = parse_date(request.GET.get('end', ''))
+    except ValueError:
+        start = end = None
+    if bucket not in BUCKETS + ('auto',):
+        return JsonResponse({'error': f'bucket must be one of {", ".join(BUCKETS)}'}, status=400)
+    
+    bucket, points = series(subscription.pk, bucket, start, end)
+    return JsonResponse({
+        'bucket': bucket,
+        'points': [
+            {
+                'date': point['date'].isoformat(),
+                'value': float(point['value']),
+                'contributed': float(point['contributed']),
+                'low': float(point['low']),
+                'high': float(point['high']),
+            }
+            for point in points
+        ],
+    })
+
+
 @login_required
 @update_user_ip
 def add_contribution_view(request, subscription_id):
@@ -271,7 +270,7 @@ def add_contribution_view(request, subscription_id):
     subscription = get_object_or_404(
         UserInvestmentSubscription,
         id=subscription_id,
-        user_profile=request.user.profile,
+        user_profile=get_profile(request),
         status='active'
     )
     
@@ -315,7 +314,7 @@ def pause_subscription_view(request, subscription_id):
     subscription = get_object_or_404(
         UserInvestmentSubscription,
         id=subscription_id,
-        user_profile=request.user.profile,
+        user_profile=get_profile(request),
         status='active'
     )
     
@@ -339,7 +338,7 @@ def resume_subscription_view(request, subscription_id):
     subscription = get_object_or_404(
         UserInvestmentSubscription,
         id=subscription_id,
-        user_profile=request.user.profile,
+        user_profile=get_profile(request),
         status='paused'
     )
     
@@ -359,6 +358,30 @@ def resume_subscription_view(request, subscription_id):
 # Original Views
 # ============================================================================
 
+@require_GET
+@cache_control(public=True, max_age=30)
+def price_feed_view(request):
+    """
+    Latest ingested prices in the shape of cryptocompare's pricemultifull
+    response (RAW.<symbol>.<currency>.PRICE), so the site scripts can read
+    one local, cached price instead of every browser calling out.
+    """
+    symbols = [s for s in request.GET.get("fsyms", "BTC").upper().split(",") if s][:20]
+    currencies = [c for c in request.GET.get("tsyms", "USD").upper().split(",") if c][:5]
+    raw = {}
+    for symbol in symbols:
+        for currency in currencies:
+            quote = get_price(symbol, currency)
+            if quote is not None:
+                raw.setdefault(symbol, {})[currency] = {
+                    "PRICE": float(quote["price"]),
+                    "LASTUPDATE": int(parse_datetime(quote["as_of"]).timestamp()),
+                }
+    if not raw:
+        return JsonResponse({"Response": "Error", "Message": "No prices available yet"}, status=503)
+    return JsonResponse({"RAW": raw})
+
+
 def error_404_view(request, exception):
     return render(request, "pages/errors/404.html")
 
@@ -115,6 +115,8 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "users.middleware.ProfileWalletMiddleware",
+    "users.middleware.IpObservationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -135,6 +137,7 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "core.context_processors.fragments",
             ],
         },
     },
@@ -238,4 +241,64 @@ else:
     # EMAIL_PORT = 587
     # EMAIL_USE_TLS = True
 
+# Emails are queued in core.OutboundEmail and sent by `manage.py run_mail_worker`.
+# Point EMAIL_BACKEND at django.core.mail.backends.filebased.EmailBackend (or the
+# console backend) to run the worker locally without an SMTP server.
+EMAIL_BACKEND = os.getenv("EMAIL_BACKEND", EMAIL_BACKEND)
+EMAIL_FILE_PATH = os.getenv("EMAIL_FILE_PATH", str(BASE_DIR / "sent-emails"))
+MAIL_WORKER_BATCH_SIZE = int(os.getenv("MAIL_WORKER_BATCH_SIZE", "50"))
+MAIL_WORKER_MAX_ATTEMPTS = int(os.getenv("MAIL_WORKER_MAX_ATTEMPTS", "5"))
+MAIL_WORKER_BACKOFF_SECONDS = int(os.getenv("MAIL_WORKER_BACKOFF_SECONDS", "60"))
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+# Background work kept off the request path (see creyp.utils.run_in_background)
+BACKGROUND_TASKS_SYNC = "True" in os.getenv("BACKGROUND_TASKS_SYNC", "False")
+BACKGROUND_TASK_WORKERS = int(os.getenv("BACKGROUND_TASK_WORKERS", "2"))
+IP_OBSERVATION_BATCH_SIZE = int(os.getenv("IP_OBSERVATION_BATCH_SIZE", "200"))
+IP_OBSERVATION_FLUSH_SECONDS = int(os.getenv("IP_OBSERVATION_FLUSH_SECONDS", "5"))
+PROFILE_IMAGE_CHECK_SECONDS = int(os.getenv("PROFILE_IMAGE_CHECK_SECONDS", "3600"))
+PROFILE_IMAGE_SIZES = tuple(int(size) for size in os.getenv("PROFILE_IMAGE_SIZES", "512,128").split(","))
+
+# Shared cache; without REDIS_URL each process keeps its own in-memory cache
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+        }
+    }
+
+# Price feed (see core.prices and `manage.py ingest_prices`)
+PRICE_SOURCE = os.getenv("PRICE_SOURCE", "core.prices.CryptoCompareSource")
+PRICE_SOURCE_FILE = os.getenv("PRICE_SOURCE_FILE", str(BASE_DIR / "core" / "data" / "prices.json"))
+PRICE_INGEST_SECONDS = int(os.getenv("PRICE_INGEST_SECONDS", "60"))
+# a quote older than one ingest interval is re-read from the newest PriceQuote row
+PRICE_CACHE_SECONDS = int(os.getenv("PRICE_CACHE_SECONDS", str(PRICE_INGEST_SECONDS)))
+
+# Cached investment dashboard summaries (see core.portfolio)
+PORTFOLIO_CACHE_SECONDS = int(os.getenv("PORTFOLIO_CACHE_SECONDS", "3600"))
+
+# Cached template fragments (see core.fragments); a new release starts them afresh
+FRAGMENT_CACHE_SECONDS = int(os.getenv("FRAGMENT_CACHE_SECONDS", "3600"))
+FRAGMENT_CACHE_RELEASE = os.getenv("FRAGMENT_CACHE_RELEASE", os.getenv("VERCEL_GIT_COMMIT_SHA", ""))
+
+# How often each process checks whether promotion grants changed elsewhere (see core.promotions)
+PROMOTION_VERSION_CHECK_SECONDS = int(os.getenv("PROMOTION_VERSION_CHECK_SECONDS", "5"))
+
+# Serverless cold starts (see creyp.boot): templates compiled while the function boots
+SERVERLESS_WARM_TEMPLATES = tuple(
+    name.strip()
+    for name in os.getenv(
+        "SERVERLESS_WARM_TEMPLATES",
+        "pages/index.html,investment/plans_browse.html,investment/plan_detail.html,investment/dashboard.html",
+    ).split(",")
+    if name.strip()
+)
+SERVERLESS_BOOT_REPORT = "True" in os.getenv("SERVERLESS_BOOT_REPORT", "True")
+
+# Rows per page on the site_admin deposit/withdrawal queues
+ADMIN_QUEUE_PAGE_SIZE = int(os.getenv("ADMIN_QUEUE_PAGE_SIZE", "50"))
+
+# Activity entries per page on the dashboard home and payments pages
+DASHBOARD_TRANSACTIONS_PAGE_SIZE = int(os.getenv("DASHBOARD_TRANSACTIONS_PAGE_SIZE", "20"))
@@ -1,18 +1,22 @@
 import os
+import logging
 from django.conf import settings
 import string
 import random
 import datetime
-from django.core.mail import send_mail
+import time
+import base64
+import json
+from decimal import Decimal, InvalidOperation
 import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.db import close_old_connections, connections, transaction
 from django.http import HttpResponse
 from django.utils.html import strip_tags
-from django.template.loader import render_to_string
 from django.core.files.storage import default_storage
-from django.db.models import FileField
+from django.db.models import FileField, Q
 
 from pathlib import Path
-from PIL import Image
 from io import BytesIO
 from django.core.files import File
 from django.http import HttpResponse
@@ -23,6 +27,102 @@ currentDT = datetime.datetime.now()
 ADMIN_EMAIL = settings.EMAIL_HOST_USER
 
 
+logger = logging.getLogger(__name__)
+
+_background_executor = None
+_background_executor_lock = threading.Lock()
+
+
+def _run_background_task(function, args, kwargs):
+    try:
+        function(*args, **kwargs)
+    except Exception:
+        logger.exception("background task %s failed", getattr(function, "__name__", function))
+    finally:
+        close_old_connections()
+
+
+def run_in_background(function, *args, **kwargs):
+    """
+    Run `function` on a small shared thread pool so it stays off the request path.
+    With BACKGROUND_TASKS_SYNC (tests, management commands) it runs inline instead.
+    """
+    global _background_executor
+    if getattr(settings, "BACKGROUND_TASKS_SYNC", False):
+        return function(*args, **kwargs)
+    with _background_executor_lock:
+        if _background_executor is None:
+            _background_executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "BACKGROUND_TASK_WORKERS", 2),
+                thread_name_prefix="creyp-bg",
+            )
+    return _background_executor.submit(_run_background_task, function, args, kwargs)
+
+
+def claim_batch(queryset, limit, **updates):
+    """
+    Take up to `limit` rows matching `queryset` by applying `updates` to them, so
+    concurrent workers never claim the same row. Returns the claimed primary keys.
+
+    Uses SELECT ... FOR UPDATE SKIP LOCKED where the database supports it; on
+    SQLite it falls back to one conditional UPDATE per candidate row.
+    """
+    model = queryset.model
+    if connections[queryset.db].features.has_select_for_update_skip_locked:
+        with transaction.atomic(using=queryset.db):
+            pks = list(queryset.select_for_update(skip_locked=True).values_list("pk", flat=True)[:limit])
+            model._default_manager.using(queryset.db).filter(pk__in=pks).update(**updates)
+        return pks
+    claimed = []
+    for pk in list(queryset.values_list("pk", flat=True)[:limit]):
+        if queryset.filter(pk=pk).update(**updates):
+            claimed.append(pk)
+    return claimed
+
+
+def _encode_cursor(values):
+    raw = json.dumps([v.isoformat() if hasattr(v, "isoformat") else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(model, fields, cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        values = json.loads(raw)
+        if len(values) != len(fields):
+            return None
+        return [model._meta.get_field(f).to_python(v) for f, v in zip(fields, values)]
+    except Exception:
+        return None
+
+
+def keyset_page(queryset, fields, cursor=None, page_size=50, descending=False):
+    """
+    One page of `queryset` ordered by `fields` (e.g. ("timestamp", "id")), starting
+    right after the row encoded in `cursor`. Cost is the same for page 1 and page
+    1000 as long as an index covers `fields`. Returns (rows, next_cursor), where
+    next_cursor is None on the last page. An invalid cursor yields the first page.
+    """
+    lookup = "lt" if descending else "gt"
+    values = _decode_cursor(queryset.model, fields, cursor) if cursor else None
+    if values is not None:
+        # (a, b) > (x, y)  ==  a > x OR (a = x AND b > y)
+        after = Q()
+        for i, field in enumerate(fields):
+            step = Q(**{f"{field}__{lookup}": values[i]})
+            for prior, value in zip(fields[:i], values[:i]):
+                step &= Q(**{prior: value})
+            after |= step
+        queryset = queryset.filter(after)
+    ordering = [f"-{f}" if descending else f for f in fields]
+    rows = list(queryset.order_by(*ordering)[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = _encode_cursor([getattr(rows[-1], f) for f in fields])
+    return rows, next_cursor
+
+
 def set_cookie_function(key, value, max_age=None, response=None):
     if response == None:
         response = HttpResponse("sorry, you are not allowed here, please go back <a href='javascript:history.back()'>BACK!</a>")
@@ -73,6 +173,9 @@ image_types = {
 
 
 def image_resize(image, width, height):
+    # Pillow is only needed here; importing it lazily keeps it off cold starts
+    from PIL import Image
+
     # Open the image using Pillow
     img = Image.open(image)
     # check if either the width or height is greater than the max
@@ -103,10 +206,97 @@ def truncate_string(value, max_length=45, suffix="skt"):
     return suffix+string_truncated
 
 
+def to_decimal(value, default=Decimal("0.00")):
+    """Parse a user/legacy money string such as "$1,000.50" into a Decimal."""
+    if isinstance(value, Decimal):
+        return value
+    cleaned = str(value if value is not None else "").replace("$", "").replace(",", "").strip()
+    try:
+        amount = Decimal(cleaned)
+    except InvalidOperation:
+        return default
+    if not amount.is_finite():
+        return default
+    return amount.quantize(Decimal("0.01"))
+
+
 def random_string_generator(size=50, chars=string.ascii_lowercase + string.digits):
     return ''.join(random.choice(chars) for _ in range(size))
 
 
+CROCKFORD32 = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+
+class IdAllocator:
+    """
+    17-character, time-ordered IDs for transactions: 9 base32 digits of
+    milliseconds since the epoch, 3 of a random per-process node and 5 of a
+    counter that starts at a random point each millisecond. IDs sort by
+    creation time (so new rows append to the index), never repeat within a
+    process and only collide across processes if two share a node in the same
+    millisecond with overlapping counters. allocate(n) reserves a block at once
+    for bulk inserts.
+    """
+
+    NODE_BITS = 15
+    COUNTER_BITS = 25
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reseed()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reseed)
+
+    def _reseed(self):
+        self._node = random.SystemRandom().getrandbits(self.NODE_BITS)
+        self._last_ms = 0
+        self._counter = 0
+        self._prefix = None
+
+    @staticmethod
+    def _encode(value, digits):
+        chars = []
+        for _ in range(digits):
+            value, rest = divmod(value, 32)
+            chars.append(CROCKFORD32[rest])
+        return "".join(reversed(chars))
+
+    def allocate(self, count=1):
+        if count < 1:
+            return []
+        limit = 1 << self.COUNTER_BITS
+        with self._lock:
+            now_ms = time.time_ns() // 1_000_000
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                # start low in the range so a busy millisecond has room to count up
+                self._counter = random.getrandbits(self.COUNTER_BITS - 2)
+                self._prefix = None
+            if self._counter + count > limit:
+                # this millisecond is used up; borrow the next one
+                self._last_ms += 1
+                self._counter = 0
+                self._prefix = None
+            if self._prefix is None:
+                self._prefix = self._encode(self._last_ms, 9) + self._encode(self._node, 3)
+            start, self._counter = self._counter, self._counter + count
+            prefix = self._prefix
+        return [prefix + self._encode(start + i, 5) for i in range(count)]
+
+
+id_allocator = IdAllocator()
+
+
+def new_id():
+    """One time-ordered 17-character ID (see IdAllocator)."""
+    return id_allocator.allocate()[0]
+
+
+def allocate_ids(count):
+    """`count` consecutive IDs for a bulk insert."""
+    return id_allocator.allocate(count)
+
+
 # ROT13 ENCRYPTION
 rot13trans = str.maketrans('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz',
                            'NOPQRSTUVWXYZABCDEFGHIJKLMnopqrstuvwxyzabcdefghijklm')
@@ -118,59 +308,54 @@ def rot13_encrypt(text):
 # Account Section
 
 
-class EmailThread(threading.Thread):
-
-    def __init__(self, email):
-        self.email = email
-        threading.Thread.__init__(self)
-
-    def run(self):
-        self.email.send()
-
 milliseconds = str(currentDT.microsecond).strip()
 def send_contact_us_email(request, name=None, phone=None, user_email=None, subject=None, body=None, toAdmin=False):
+    # imported here: core.models imports users.models, which imports this module
+    from core.mailer import enqueue_mail
+
     email_subject = subject
-    email_body = render_to_string('account/email/contact_us_email_sent.html', {
+    context = {
         'email_subject': email_subject,
         'email': user_email,
         'name': name,
         'phone': phone,
         'body': body,
         'toAdmin': toAdmin
-    }, request)
+    }
     text_content = strip_tags(email_subject)
     user_email = user_email.replace("@", f"+{milliseconds}@")
-    if toAdmin == True:
-        email = send_mail(
-            email_subject, text_content, ADMIN_EMAIL, [ADMIN_EMAIL], html_message=email_body)
-    else:
-        email = send_mail(
-            email_subject, text_content, ADMIN_EMAIL, [user_email], html_message=email_body)
+    recipient = ADMIN_EMAIL if toAdmin == True else user_email
+    return enqueue_mail(email_subject, recipient, 'account/email/contact_us_email_sent.html',
+                        context, text_content, request=request)
 
-    if not settings.DEBUG:
-        EmailThread(email).start()
+def build_alert_mail(request, email_subject, user_email, email_message, email_image="alert.png", html_message=None, email_ip=None, email_user=None):
+    """The unsaved outbox row send_alert_mail() would queue, for bulk enqueueing."""
+    # imported here: core.models imports users.models, which imports this module
+    from core.mailer import build_email
 
-def send_alert_mail(request, email_subject, user_email, email_message, email_image="alert.png", html_message=None, email_ip=None, email_user=None):
     email_subject = email_subject
     try:
         if not email_user == None:
             user_email = email_user.email
     except:
         user_email = user_email
-    email_body = render_to_string('account/email/alert_email.html', {
+    context = {
         'email_subject': email_subject,
         'user_email': user_email,
         'email_message': email_message,
         'html_message': html_message,
         'email_image': email_image,
         'email_ip': email_ip
-    }, request)
+    }
     text_content = strip_tags(html_message)
     if email_message:
         text_content = strip_tags(email_message)
     user_email = user_email.replace("@", f"+{milliseconds}@")
-    email = send_mail(
-        email_subject, text_content, ADMIN_EMAIL, [user_email], html_message=email_body)
+    return build_email(email_subject, user_email, 'account/email/alert_email.html',
+                       context, text_content, request=request)
 
-    if not settings.DEBUG:
-        EmailThread(email).start()
\ No newline at end of file
+def send_alert_mail(request, email_subject, user_email, email_message, email_image="alert.png", html_message=None, email_ip=None, email_user=None):
+    email = build_alert_mail(request, email_subject, user_email, email_message, email_image,
+                             html_message, email_ip, email_user)
+    email.save()
+    return email
@@ -1,3 +1,56 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from creyp.utils import _encode_cursor
+from users.models import Transaction
+
+
+@override_settings(DASHBOARD_TRANSACTIONS_PAGE_SIZE=2)
+class TransactionPageTests(TestCase):
+    def setUp(self):
+        user = User.objects.create(username='active', email='active@example.com')
+        self.wallet = user.profile.wallet
+        self.client.force_login(user)
+        start = timezone.now() - timedelta(days=1)
+        # three rows share a timestamp, so only the id orders them
+        self.rows = {}
+        for name, seconds, status in (
+            ('t0', 0, 'credit'), ('t1', 60, 'pending'), ('t2', 60, 'credit'), ('hidden', 60, 'hidden'),
+            ('t3', 60, 'failed'), ('t4', 120, 'credit'),
+        ):
+            row = Transaction.objects.create(wallet=self.wallet, amount='10', status=status, msg=name)
+            Transaction.objects.filter(pk=row.pk).update(timestamp=start + timedelta(seconds=seconds))
+            self.rows[name] = Transaction.objects.get(pk=row.pk)
+
+    def page(self, cursor=None):
+        response = self.client.get(
+            reverse('dashboard-transactions'), {'after': cursor} if cursor else {}, secure=True,
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        return [row['msg'] for row in data['transactions']], data['next_cursor']
+
+    def test_pages_run_newest_first_and_break_timestamp_ties_by_id(self):
+        first, cursor = self.page()
+        self.assertEqual(first, ['t4', 't3'])
+        second, cursor = self.page(cursor)
+        self.assertEqual(second, ['t2', 't1'])
+        last, cursor = self.page(cursor)
+        self.assertEqual((last, cursor), (['t0'], None))
+
+    def test_cursor_past_the_oldest_row_is_an_empty_last_page(self):
+        oldest = self.rows['t0']
+        self.assertEqual(self.page(_encode_cursor([oldest.timestamp, oldest.pk])), ([], None))
+
+    def test_invalid_cursor_starts_over(self):
+        self.assertEqual(self.page('not-a-cursor'), self.page())
+
+    def test_json_endpoint_needs_a_signed_in_member(self):
+        self.client.logout()
+        response = self.client.get(reverse('dashboard-transactions'), secure=True)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json(), {'error': 'authentication required'})
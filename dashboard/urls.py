@@ -1,6 +1,7 @@
 from django.urls import path
 from dashboard.views import (dashboard_home_view, dashboard_profile_view,
-                             dashboard_referral_view, dashboard_payments_view, dashboard_profile_auth_view)
+                             dashboard_referral_view, dashboard_payments_view, dashboard_profile_auth_view,
+                             dashboard_transactions_view)
 
 urlpatterns = [
     path('', dashboard_home_view, name="dashboard-home"),
@@ -10,5 +11,6 @@ urlpatterns = [
          name="dashboard-password-update"),
 
     path('payments/', dashboard_payments_view, name="dashboard-payment"),
+    path('transactions/', dashboard_transactions_view, name="dashboard-transactions"),
     path('referral/', dashboard_referral_view, name="dashboard-referral"),
 ]
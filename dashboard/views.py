@@ -1,32 +1,39 @@
+from django.conf import settings
+from django.http import JsonResponse
 from django.shortcuts import render, redirect
-from django.contrib.auth.models import User
+from django.utils import dateformat, timezone
+from django.views.decorators.http import require_GET
 
 from django_countries import countries
-from users.models import Wallet, Profile, Transaction, AdminWallet
+from users.models import Transaction, AdminWallet, PaymentSession, WalletTotals
+from creyp.utils import keyset_page, to_decimal
 from users.decorators import update_user_ip, deposit_before
+from users.middleware import get_profile, get_wallet
+
+
+def transaction_page(request, wallet):
+    """Newest-first keyset page of the wallet's visible activity, after ?after=<cursor>."""
+    return keyset_page(
+        Transaction.objects.filter(wallet=wallet).exclude(status="hidden"),
+        ("timestamp", "id"),
+        cursor=request.GET.get("after"),
+        page_size=getattr(settings, "DASHBOARD_TRANSACTIONS_PAGE_SIZE", 20),
+        descending=True,
+    )
 
 
 @update_user_ip
 @deposit_before
 def dashboard_home_view(request):
     if request.user.is_authenticated:
-        if not Wallet.objects.filter(user=request.user.profile):
-            Wallet.objects.create(user=request.user.profile)
-        qs = Wallet.objects.filter(user=request.user.profile).first()
+        qs = get_wallet(request)
         bal = str(qs.balance).split(".")
         first_bal = bal[0]
         second_bal = bal[1] if len(bal) > 1 else "00"
-        transactions = Transaction.objects.filter(wallet=request.user.profile.wallet)
-        amount_invested = float(qs.amount_invested)
+        transactions, next_cursor = transaction_page(request, qs)
+        amount_invested = float(to_decimal(qs.amount_invested))
         if amount_invested == 0:
-            for transaction in (
-                transactions.exclude(status="pending")
-                .exclude(status="processing")
-                .exclude(status="confirming")
-                .exclude(status="error")
-                .exclude(status="failed")
-            ):
-                amount_invested += float(transaction.amount)
+            amount_invested = float(WalletTotals.for_wallet(qs).invested)
 
         context = {
             "title": "Dashboard",
@@ -36,7 +43,8 @@ def dashboard_home_view(request):
             "amount_invested": amount_invested,
             "second_bal": second_bal,
             "crumbs_count": 1,
-            "transactions": transactions.exclude(status="hidden"),
+            "transactions": transactions,
+            "next_cursor": next_cursor,
         }
         return render(request, "dashboard/dashboard_home.html", context)
     else:
@@ -46,8 +54,7 @@ def dashboard_home_view(request):
 @update_user_ip
 def dashboard_profile_view(request):
     if request.user.is_authenticated:
-        if not Wallet.objects.filter(user=request.user.profile):
-            Wallet.objects.create(user=request.user.profile)
+        get_wallet(request)
         context = {
             "title": "Profile",
             "crumbs": ["Profile"],
@@ -86,26 +93,15 @@ def dashboard_profile_auth_view(request):
         gender = form["gender"]
         country = form["country"]
 
-        user = request.user
-        user_ = User.objects.filter(username=user.username).first()
-        user_profile = Profile.objects.filter(user=user).first()
+        user_ = request.user
+        user_profile = get_profile(request)
 
-        try:
-            if len(full_name) > 1:
-                user_.first_name = full_name[0]
-                user_profile.first_name = full_name[0]
-                user_.last_name = full_name[1]
-                user_profile.last_name = full_name[1]
-            elif len(full_name) == 1:
-                user_.first_name = full_name[0]
-                user_profile.first_name = full_name[0]
-
-        except:
-            user_.first_name = ""
-            user_profile.first_name = ""
-
-            user_.last_name = ""
-            user_profile.last_name = ""
+        # first_name/last_name live on User; Profile only exposes them read-only
+        if len(full_name) > 1:
+            user_.first_name = full_name[0]
+            user_.last_name = full_name[1]
+        elif len(full_name) == 1:
+            user_.first_name = full_name[0]
 
         user_.email = email
 
@@ -146,23 +142,14 @@ def dashboard_profile_auth_view(request):
 @deposit_before
 def dashboard_payments_view(request):
     if request.user.is_authenticated:
-        if not Wallet.objects.filter(user=request.user.profile):
-            Wallet.objects.create(user=request.user.profile)
-        qs = Wallet.objects.filter(user=request.user.profile).first()
+        qs = get_wallet(request)
         bal = str(qs.balance).split(".")
         first_bal = bal[0]
         second_bal = bal[1] if len(bal) > 1 else "00"
-        transactions = Transaction.objects.filter(wallet=request.user.profile.wallet)
-        amount_invested = float(qs.amount_invested)
+        transactions, next_cursor = transaction_page(request, qs)
+        amount_invested = float(to_decimal(qs.amount_invested))
         if amount_invested == 0:
-            for transaction in (
-                transactions.exclude(status="pending")
-                .exclude(status="processing")
-                .exclude(status="confirming")
-                .exclude(status="error")
-                .exclude(status="failed")
-            ):
-                amount_invested += float(transaction.amount)
+            amount_invested = float(WalletTotals.for_wallet(qs).invested)
         context = {
             "title": "Payments",
             "crumbs": ["Payment"],
@@ -171,21 +158,42 @@ def dashboard_payments_view(request):
             "amount_invested": amount_invested,
             "second_bal": second_bal,
             "crumbs_count": 2,
-            "transactions": transactions.exclude(status="hidden"),
+            "transactions": transactions,
+            "next_cursor": next_cursor,
+            "idempotency_key": PaymentSession.new_token(),
         }
         return render(request, "dashboard/dashboard_payments.html", context)
     else:
         return redirect("/auth/account/login?next=/dashboard/payments/")
 
 
+@require_GET
+def dashboard_transactions_view(request):
+    """The next page of activity for the "Load more" button, as JSON."""
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "authentication required"}, status=401)
+    transactions, next_cursor = transaction_page(request, get_wallet(request))
+    return JsonResponse({
+        "transactions": [
+            {
+                "status": transaction.status,
+                "msg": transaction.msg,
+                "timestamp": transaction.timestamp.isoformat(),
+                "display": dateformat.format(timezone.localtime(transaction.timestamp), "F d - g:iA"),
+            }
+            for transaction in transactions
+        ],
+        "next_cursor": next_cursor,
+    })
+
+
 @update_user_ip
 @deposit_before
 def dashboard_referral_view(request):
     if request.user.is_authenticated:
-        user = request.user
-        if not Wallet.objects.filter(user=request.user.profile):
-            Wallet.objects.create(user=request.user.profile)
-        refers = {"clicks": f"{user.profile.refer_clicks}"}
+        profile = get_profile(request)
+        get_wallet(request)
+        refers = {"clicks": f"{profile.refer_clicks}"}
         context = {
             "title": "Referral",
             "crumbs": ["Referral"],
@@ -0,0 +1,157 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, TextField, Value, When
+from django.utils import timezone
+
+from users.models import (
+    AdminTransaction as AT, PaymentSession, Transaction, Profile, WalletTotals, DEPOSIT_REQUESTS, WITHDRAW_REQUESTS,
+)
+from users import ledger
+from core.mailer import enqueue_many
+from creyp.utils import build_alert_mail, to_decimal
+
+BUTTON_STYLE = "border: 1px solid #673ab7;padding: 5px 10px;border-radius: 24px;color: #fff;background: #673ab7;"
+
+# What each staff action does to a queued AdminTransaction. "posting" is the
+# ledger kind credited back to the wallet (None = no money moves); "session" is
+# the state a confirming deposit PaymentSession ends in.
+SETTLEMENTS = {
+    "accept-deposit": {
+        "session": "credit",
+        "withdraw": False,
+        "posting": "deposit",
+        "status": "credit",
+        "msg": "Your Account has been credited ${amount}",
+        "deposit_before": True,
+        "subject": "Deposit Request Accepted",
+        "message": "Your Account Has Been Credited ${amount}",
+        "image": "transaction-accept.png",
+        "link": ("/dashboard/", "Dashboard"),
+    },
+    "decline-deposit": {
+        "session": "failed",
+        "withdraw": False,
+        "posting": None,
+        "status": "failed",
+        "msg": "Your ${amount} Deposit Request Was Rejected",
+        "deposit_before": False,
+        "subject": "Deposit Request Rejected",
+        "message": "Your Deposit Request For ${amount} Has Been Declined",
+        "image": "transaction-declined.png",
+        "link": ("/dashboard/", "Dashboard"),
+    },
+    "accept-withdraw": {
+        "session": None,
+        "withdraw": True,
+        "posting": None,
+        "status": "failed",
+        "msg": "-${amount} Debit",
+        "deposit_before": False,
+        "subject": "About Your Withdrawal Payment Of ${amount}",
+        "message": "We Have Confirmed Your Debit Transfer",
+        "image": "transaction-accept.png",
+        "link": ("/dashboard/payments/", "Dashboard"),
+    },
+    "decline-withdraw": {
+        "session": None,
+        "withdraw": True,
+        "posting": "reversal",
+        "status": "error",
+        "msg": "+${amount} Was Reversed",
+        "deposit_before": True,
+        "subject": "Money Reversed",
+        "message": "Your Previous Debit Of ${amount} Has Been Reversed Back To Your Account",
+        "image": "transaction-accept.png",
+        "link": ("/dashboard/payments/", "Payments"),
+    },
+}
+
+
+class SettlementConflict(Exception):
+    """Another staff member settled some of the same requests first."""
+
+
+def settle(request, ids, action, chunk_size=250):
+    """
+    Apply `action` (a SETTLEMENTS key) to the queued AdminTransactions in `ids`
+    inside one database transaction using set-based statements:
+    wallets are credited via users.ledger.post_many, the matching Transaction
+    rows are updated in one UPDATE per chunk, and the notification emails are
+    queued in the outbox. Returns the number of requests settled.
+    """
+    spec = SETTLEMENTS[action]
+    queue = AT.objects.filter(WITHDRAW_REQUESTS if spec["withdraw"] else DEPOSIT_REQUESTS)
+    path, label = spec["link"]
+    url = request.build_absolute_uri(path)
+    html_msg = f'<a style="{BUTTON_STYLE}" href="{url}" class="rounded-pill border">{label}</a>'
+
+    with transaction.atomic():
+        rows = list(
+            queue.filter(pk__in=ids)
+            .select_related("wallet__user__user")
+            .select_for_update(of=("self",))
+        )
+        transactions = list(
+            Transaction.objects.filter(transactionId__in={at.transactionId for at in rows})
+            .values_list("transactionId", "wallet_id", "status", "amount")
+        )
+        # like the single-item views, only settle requests that have a Transaction
+        known = {tid for tid, _, _, _ in transactions}
+        rows = [at for at in rows if at.transactionId in known]
+        if not rows:
+            return 0
+
+        settled = [at.pk for at in rows]
+        if AT.objects.filter(pk__in=settled).delete()[0] != len(settled):
+            raise SettlementConflict("some requests were already settled")
+
+        if spec["posting"]:
+            ledger.post_many(
+                (at.wallet_id, at.amount, spec["posting"], at.transactionId,
+                 f"{action} by {request.user.username}")
+                for at in rows
+            )
+
+        amounts = {at.transactionId: at.amount for at in rows}
+        tids = list(amounts)
+        for start in range(0, len(tids), chunk_size):
+            chunk = tids[start:start + chunk_size]
+            Transaction.objects.filter(transactionId__in=chunk).update(
+                status=spec["status"],
+                msg=Case(
+                    *[When(transactionId=tid, then=Value(spec["msg"].format(amount=amounts[tid]))) for tid in chunk],
+                    output_field=TextField(),
+                ),
+            )
+
+        if spec["session"]:
+            PaymentSession.objects.filter(
+                transaction__transactionId__in=tids,
+                state__in=PaymentSession.TRANSITIONS[spec["session"]],
+            ).update(state=spec["session"], updated_at=timezone.now())
+
+        # the bulk UPDATE bypasses the Transaction signals, so move the totals here
+        changes = defaultdict(lambda: defaultdict(Decimal))
+        for _, wallet_id, status, amount in transactions:
+            changes[wallet_id][status] -= to_decimal(amount)
+            changes[wallet_id][spec["status"]] += to_decimal(amount)
+        WalletTotals.apply_many(changes)
+
+        if spec["deposit_before"]:
+            Profile.objects.filter(pk__in={at.wallet.user_id for at in rows}).update(deposit_before=True)
+
+        enqueue_many([
+            build_alert_mail(
+                request,
+                email_subject=spec["subject"].format(amount=at.amount),
+                user_email=at.wallet.user.user.email,
+                email_message=spec["message"].format(amount=at.amount),
+                email_image=spec["image"],
+                html_message=html_msg,
+            )
+            for at in rows
+            if at.wallet.user.user.email
+        ])
+    return len(rows)
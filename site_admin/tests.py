@@ -1,3 +1,125 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db.models.query import QuerySet
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import OutboundEmail
+from site_admin.settlement import SettlementConflict, settle
+from users import ledger
+from users.models import AdminTransaction, PaymentSession, Transaction, WalletTotals
+
+
+class SettleTests(TestCase):
+    def setUp(self):
+        self.request = RequestFactory().get('/site/', secure=True)
+        self.request.user = User.objects.create_user('staff', 'staff@example.com', is_staff=True)
+        self.wallets = []
+        for n in range(2):
+            wallet = User.objects.create(username=f'member{n}', email=f'member{n}@example.com').profile.wallet
+            ledger.credit(wallet, '1000', kind='opening')
+            self.wallets.append(wallet)
+
+    def queue(self, wallet, amount, kind):
+        state = 'confirming' if kind == 'deposit' else 'credit'
+        session, _ = PaymentSession.start(PaymentSession.new_token(), wallet, kind, amount, state=state)
+        return AdminTransaction.objects.create(
+            wallet=wallet, plan='withdraw' if kind == 'withdraw' else 'starter', amount=amount,
+            btc_address='bc1qsettle', transactionId=session.transaction.transactionId,
+        )
+
+    def balances(self):
+        for wallet in self.wallets:
+            wallet.refresh_from_db()
+            self.assertEqual(wallet.balance, ledger.balance_as_of(wallet))
+        return [wallet.balance for wallet in self.wallets]
+
+    def test_accepting_deposits_credits_each_wallet_once(self):
+        ids = [self.queue(wallet, '250', 'deposit').pk for wallet in self.wallets]
+        self.assertEqual(settle(self.request, ids, 'accept-deposit'), 2)
+        self.assertEqual(self.balances(), [Decimal('1250.00')] * 2)
+        self.assertFalse(AdminTransaction.objects.exists())
+        self.assertEqual(set(Transaction.objects.values_list('status', flat=True)), {'credit'})
+        self.assertEqual(set(PaymentSession.objects.values_list('state', flat=True)), {'credit'})
+        self.assertEqual(WalletTotals.for_wallet(self.wallets[0]).credit, Decimal('250'))
+        self.assertEqual(OutboundEmail.objects.count(), 2)
+
+        # a double click finds nothing left to settle
+        self.assertEqual(settle(self.request, ids, 'accept-deposit'), 0)
+        self.assertEqual(self.balances(), [Decimal('1250.00')] * 2)
+        self.assertEqual(OutboundEmail.objects.count(), 2)
+
+    def test_declining_a_withdrawal_reverses_the_debit(self):
+        request = self.queue(self.wallets[0], '300', 'withdraw')
+        ledger.debit(self.wallets[0], '300', reference=request.transactionId)
+        self.assertEqual(settle(self.request, [request.pk], 'decline-withdraw'), 1)
+        self.assertEqual(self.balances(), [Decimal('1000.00')] * 2)
+        self.assertEqual(Transaction.objects.get().status, 'error')
+
+    def test_conflict_rolls_everything_back(self):
+        ids = [self.queue(wallet, '250', 'deposit').pk for wallet in self.wallets]
+        # another staff member settles one of the requests between our SELECT and DELETE
+        with mock.patch.object(QuerySet, 'delete', return_value=(1, {})):
+            with self.assertRaises(SettlementConflict):
+                settle(self.request, ids, 'accept-deposit')
+        self.assertEqual(self.balances(), [Decimal('1000.00')] * 2)
+        self.assertEqual(AdminTransaction.objects.count(), 2)
+        self.assertFalse(OutboundEmail.objects.exists())
+
+
+class SingleSettlementViewTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user('staff', 'staff@example.com', 'staff-password', is_staff=True)
+        self.client.force_login(self.staff)
+
+    def test_conflict_redirects_back_to_the_queue(self):
+        cases = (
+            ('admin-transaction-accept', 'admin-transaction-deposit'),
+            ('admin-transaction-delete', 'admin-transaction-deposit'),
+            ('admin-transaction-withdraw-accept', 'admin-transaction-withdraw'),
+            ('admin-transaction-withdraw-delete', 'admin-transaction-withdraw'),
+        )
+        for view, queue in cases:
+            with self.subTest(view), mock.patch('site_admin.views.settle', side_effect=SettlementConflict):
+                response = self.client.get(reverse(view, args=[1]), secure=True)
+                self.assertRedirects(response, reverse(queue) + '?e=conflict', fetch_redirect_response=False)
+
+
+@override_settings(ADMIN_QUEUE_PAGE_SIZE=2)
+class QueuePageTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('staff', 'staff@example.com', is_staff=True))
+        wallet = User.objects.create(username='member', email='member@example.com').profile.wallet
+        start = timezone.now()
+        # three requests of each kind share a timestamp, so the id has to break the tie
+        self.queued = {'deposit': [], 'withdraw': []}
+        for n, seconds in enumerate((0, 5, 5, 5, 9)):
+            for kind in self.queued:
+                self.queued[kind].append(AdminTransaction.objects.create(
+                    wallet=wallet, plan='withdraw' if kind == 'withdraw' else 'starter', amount=str(100 + n),
+                    btc_address='bc1qqueue', timestamp=start + timedelta(seconds=seconds),
+                ).pk)
+
+    def walk(self, url_name):
+        seen, cursor, pages = [], None, 0
+        while True:
+            response = self.client.get(reverse(url_name), {'after': cursor} if cursor else {}, secure=True)
+            self.assertEqual(response.status_code, 200)
+            seen += [row.pk for row in response.context['objects']]
+            pages += 1
+            cursor = response.context['next_cursor']
+            if cursor is None:
+                return seen, pages
+
+    def test_each_queue_pages_through_its_own_requests_oldest_first(self):
+        for kind, url_name in (('deposit', 'admin-transaction-deposit'), ('withdraw', 'admin-transaction-withdraw')):
+            with self.subTest(kind):
+                self.assertEqual(self.walk(url_name), (self.queued[kind], 3))
+
+    def test_invalid_cursor_starts_over(self):
+        response = self.client.get(reverse('admin-transaction-deposit'), {'after': 'garbage'}, secure=True)
+        self.assertEqual([row.pk for row in response.context['objects']], self.queued['deposit'][:2])
@@ -7,6 +7,7 @@ from .views import (
     transaction_withdraw_view,
     withdraw_decline_view,
     withdraw_accept_view,
+    transaction_bulk_view,
     send_mail_view,
 )
 
@@ -42,5 +43,10 @@ urlpatterns = [
         withdraw_accept_view,
         name="admin-transaction-withdraw-accept",
     ),
+    path(
+        "transactions/bulk/",
+        transaction_bulk_view,
+        name="admin-transaction-bulk",
+    ),
     path("send-mail/", send_mail_view, name="admin-send-email"),
 ]
@@ -1,7 +1,11 @@
 from django.shortcuts import render, redirect
 from django.core.exceptions import PermissionDenied
-from users.models import AdminTransaction as AT, Wallet, Transaction, Profile
-from creyp.utils import send_alert_mail
+from django.urls import reverse
+from users.models import AdminTransaction as AT, DEPOSIT_REQUESTS, WITHDRAW_REQUESTS
+from users import ledger
+from django.conf import settings
+from creyp.utils import send_alert_mail, keyset_page
+from site_admin.settlement import settle, SETTLEMENTS, SettlementConflict
 from django.contrib.auth.models import User
 
 
@@ -13,188 +17,90 @@ def index_view(request):
         raise PermissionDenied
 
 
+def admin_queue_page(request, queryset):
+    """Keyset-paginated slice of a staff queue, oldest request first."""
+    queryset = queryset.select_related("wallet__user__user")
+    return keyset_page(
+        queryset,
+        ("timestamp", "id"),
+        cursor=request.GET.get("after"),
+        page_size=getattr(settings, "ADMIN_QUEUE_PAGE_SIZE", 50),
+    )
+
+
 def transaction_deposit_view(request):
     user = request.user
     if user.is_authenticated and user.is_staff == True and user.is_active == True:
-        qs = AT.objects.all()
-        qsd = []
-        for qsr in qs:
-            if not qsr.plan == "withdraw":
-                qsd.append(qsr)
-        return render(request, "site/admin/admin-deposit.html", {"objects": qsd})
+        qsd, next_cursor = admin_queue_page(request, AT.objects.filter(DEPOSIT_REQUESTS))
+        return render(
+            request,
+            "site/admin/admin-deposit.html",
+            {"objects": qsd, "next_cursor": next_cursor},
+        )
     else:
         raise PermissionDenied
 
 
+def is_site_staff(user):
+    return user.is_authenticated and user.is_staff == True and user.is_active == True
+
+
+def settle_and_return(request, ids, action):
+    """Settle `ids` and go back to their queue, flagging a double click or a race with another staff member."""
+    queue = "admin-transaction-withdraw" if SETTLEMENTS[action]["withdraw"] else "admin-transaction-deposit"
+    try:
+        settle(request, ids, action)
+    except (SettlementConflict, ledger.InsufficientFunds):
+        return redirect(reverse(queue) + "?e=conflict")
+    return redirect(queue)
+
+
 def transaction_del_view(request, id):
-    qs = AT.objects.filter(id=id).first()
-    tasc = Transaction.objects.filter(transactionId=qs.transactionId).first()
-    user = request.user
-    if (
-        not qs is None
-        and not tasc is None
-        and user.is_authenticated
-        and user.is_staff == True
-        and user.is_active == True
-    ):
-        try:
-            user_email = qs.wallet.user.user.email
-            amount = qs.amount
-            url = request.build_absolute_uri("/dashboard/")
-            html_msg = f'<a style="border: 1px solid #673ab7;padding: 5px 10px;border-radius: 24px;color: #fff;background: #673ab7;" href="{url}" class="rounded-pill border">Dashboard</a>'
-            send_alert_mail(
-                request,
-                email_subject="Deposit Request Rejected",
-                user_email=user_email,
-                email_message=f"Your Deposit Request For ${amount} Has Been Declined",
-                email_image="transaction-declined.png",
-                html_message=html_msg,
-            )
-        except:
-            pass
-        tasc.status = "failed"
-        tasc.msg = f"Your ${qs.amount} Deposit Request Was Rejected"
-        tasc.transactionId = qs.transactionId
-        tasc.save()
-        qs.delete()
-        return redirect("admin-transaction-deposit")
-    else:
+    if not is_site_staff(request.user):
         raise PermissionDenied
+    return settle_and_return(request, [id], "decline-deposit")
 
 
 def transaction_accept_view(request, id):
-    user = request.user
-    qs = AT.objects.filter(id=id).first()
-    qsr = Wallet.objects.filter(user=qs.wallet.user).first()
-    tasc = Transaction.objects.filter(transactionId=qs.transactionId).first()
-    profile = Profile.objects.filter(user=qs.wallet.user.user).first()
-    if (
-        not qs is None
-        and not qsr is None
-        and not tasc is None
-        and user.is_authenticated
-        and user.is_staff == True
-        and user.is_active == True
-    ):
-        try:
-            user_email = qs.wallet.user.user.email
-            amount = qs.amount
-            url = request.build_absolute_uri("/dashboard/")
-            html_msg = f'<a href="{url}" style="border: 1px solid #673ab7;padding: 5px 10px;border-radius: 24px;color: #fff;background: #673ab7;" class="rounded-pill border">Dashboard</a>'
-            send_alert_mail(
-                request,
-                email_subject="Deposit Request Accepted",
-                user_email=user_email,
-                email_message=f"Your Account Has Been Credited ${amount}",
-                email_image="transaction-accept.png",
-                html_message=html_msg,
-            )
-        except:
-            pass
-        tasc.status = "credit"
-        tasc.msg = f"Your Account has been credited ${qs.amount}"
-        tasc.transactionId = qs.transactionId
-        tasc.save()
-        qsr.balance = float(qsr.balance) + float(qs.amount)
-        qsr.save()
-        profile.deposit_before = True
-        profile.save()
-        qs.delete()
-        return redirect("admin-transaction-deposit")
-    else:
+    if not is_site_staff(request.user):
         raise PermissionDenied
+    return settle_and_return(request, [id], "accept-deposit")
 
 
 def transaction_withdraw_view(request):
     user = request.user
     if user.is_authenticated and user.is_staff == True and user.is_active == True:
-        qs = AT.objects.all()
-        qsd = []
-        for qsr in qs:
-            if qsr.plan == "withdraw":
-                qsd.append(qsr)
-        return render(request, "site/admin/admin-withdraw.html", {"objects": qsd})
+        qsd, next_cursor = admin_queue_page(request, AT.objects.filter(WITHDRAW_REQUESTS))
+        return render(
+            request,
+            "site/admin/admin-withdraw.html",
+            {"objects": qsd, "next_cursor": next_cursor},
+        )
     else:
         raise PermissionDenied
 
 
 def withdraw_accept_view(request, id):
-    qs = AT.objects.filter(id=id).first()
-    tasc = Transaction.objects.filter(transactionId=qs.transactionId).first()
-    user = request.user
-    if (
-        not qs is None
-        and not tasc is None
-        and user.is_authenticated
-        and user.is_staff == True
-        and user.is_active == True
-    ):
-        try:
-            user_email = qs.wallet.user.user.email
-            amount = qs.amount
-            url = request.build_absolute_uri("/dashboard/payments/")
-            html_msg = f'<a style="border: 1px solid #673ab7;padding: 5px 10px;border-radius: 24px;color: #fff;background: #673ab7;" href="{url}" class="rounded-pill border">Dashboard</a>'
-            send_alert_mail(
-                request,
-                email_subject=f"About Your Withdrawal Payment Of ${amount}",
-                user_email=user_email,
-                email_message=f"We Have Confirmed Your Debit Transfer",
-                email_image="transaction-accept.png",
-                html_message=html_msg,
-            )
-        except:
-            pass
-        tasc.status = "failed"
-        tasc.msg = f"-${qs.amount} Debit"
-        tasc.transactionId = qs.transactionId
-        tasc.save()
-        qs.delete()
-        return redirect("admin-transaction-withdraw")
-    else:
+    if not is_site_staff(request.user):
         raise PermissionDenied
+    return settle_and_return(request, [id], "accept-withdraw")
 
 
 def withdraw_decline_view(request, id):
-    user = request.user
-    qs = AT.objects.filter(id=id).first()
-    qsr = Wallet.objects.filter(user=qs.wallet.user).first()
-    tasc = Transaction.objects.filter(transactionId=qs.transactionId).first()
-    profile = Profile.objects.filter(user=qs.wallet.user.user).first()
-    if (
-        not qs is None
-        and not qsr is None
-        and not tasc is None
-        and user.is_authenticated
-        and user.is_staff == True
-        and user.is_active == True
-    ):
-        try:
-            user_email = qs.wallet.user.user.email
-            amount = qs.amount
-            url = request.build_absolute_uri("/dashboard/payments/")
-            html_msg = f'<a href="{url}" style="border: 1px solid #673ab7;padding: 5px 10px;border-radius: 24px;color: #fff;background: #673ab7;" class="rounded-pill border">Payments</a>'
-            send_alert_mail(
-                request,
-                email_subject="Money Reversed",
-                user_email=user_email,
-                email_message=f"Your Previous Debit Of ${amount} Has Been Reversed Back To Your Account",
-                email_image="transaction-accept.png",
-                html_message=html_msg,
-            )
-        except:
-            pass
-        tasc.status = "error"
-        tasc.msg = f"+${qs.amount} Was Reversed"
-        tasc.transactionId = qs.transactionId
-        tasc.save()
-        qsr.balance = float(qsr.balance) + float(qs.amount)
-        qsr.save()
-        profile.deposit_before = True
-        profile.save()
-        qs.delete()
-        return redirect("admin-transaction-withdraw")
-    else:
+    if not is_site_staff(request.user):
+        raise PermissionDenied
+    return settle_and_return(request, [id], "decline-withdraw")
+
+
+def transaction_bulk_view(request):
+    """Settle every selected request in a queue with one action."""
+    if not is_site_staff(request.user):
         raise PermissionDenied
+    action = request.POST.get("action")
+    if request.method != "POST" or action not in SETTLEMENTS:
+        return redirect("admin-home")
+    ids = [int(pk) for pk in request.POST.getlist("ids") if pk.isdigit()]
+    return settle_and_return(request, ids, action)
 
 
 # view to send mail to a user
@@ -31,6 +31,35 @@ $(function () {
   };
   $(window).ready(setsidebartype);
   $(window).on("resize", setsidebartype);
+
+  // ==============================================================
+  // Activity feed: append the next keyset page
+  // ==============================================================
+  $(".load-more-transactions").on("click", function () {
+    var button = $(this);
+    var feed = button.siblings(".activity-feed");
+    button.prop("disabled", true);
+    $.getJSON(button.data("url"), { after: button.data("cursor") }, function (data) {
+      $.each(data.transactions, function (_, transaction) {
+        var item = $("<li>")
+          .addClass("feed-item")
+          .attr("data-status", transaction.status)
+          .toggleClass("credit", transaction.status == "credit")
+          .toggleClass("failed", transaction.status == "failed")
+          .toggleClass("d-nonev", transaction.status == "pending");
+        item.append($("<time>").addClass("date").attr("datetime", transaction.timestamp).text(transaction.display));
+        item.append($("<span>").addClass("text").text(transaction.msg));
+        feed.append(item);
+      });
+      if (data.next_cursor) {
+        button.data("cursor", data.next_cursor).prop("disabled", false);
+      } else {
+        button.remove();
+      }
+    }).fail(function () {
+      button.prop("disabled", false);
+    });
+  });
 });
 window.onload = function () {
   if (bitcoin_togglers && bitcoin_togglers.length > 0) {
@@ -43,7 +72,7 @@ window.onload = function () {
     };
     bitcoinPrice.open(
       "GET",
-      "https://min-api.cryptocompare.com/data/pricemultifull?fsyms=BTC&tsyms=USD",
+      "/site/prices/?fsyms=BTC&tsyms=USD",
       true
     );
     bitcoinPrice.send();
@@ -1 +1 @@
-function _0xb07f(){var _0x3defc0=['documentElement','textarea','clipboard','convert-value-btc','setTimeout','querySelector','click','getAttribute','writeText','body','GET','display','20UNHrOU','ceil','btc-hidden-value','offsetTop','<b>copy</b>','BTC','getElementById','data-before-text','541440AbnUfj','copy_btn-copyed','onreadystatechange','active','2450904UEeMqm','classList','responseText','PRICE','total-price-hidden-value','execCommand','parse','2263952zoXSnD','.navbar-brand\x20img','total-price-value','scrollTop','total-btc-hidden-value','readyState','sticky','95452OYjufw','style','603iFwnvq','248230RkmDHh','innerHTML','71211bGAfYx','select','.preloader','pageYOffset','opacity','appendChild','456AsoOvN','https://min-api.cryptocompare.com/data/pricemultifull?fsyms=BTC&tsyms=USD','USD','toggle','getItem','.navbar-area','onscroll','createElement','https://creypinvest.s3.eu-west-2.amazonaws.com/static/images/logo/logo.svg','.mobile-menu-btn','src','getElementsByClassName','<b>copyed</b>','flex','Copyed\x20To\x20Clipboard\x20✅','open','value','none','calculate-btc-fees','remove','add','addEventListener','setItem','raw_price','data-btc-value','status','toFixed','3043920OgIxQy'];_0xb07f=function(){return _0x3defc0;};return _0xb07f();}function _0x1d2d(_0x5c9194,_0x232f2d){var _0xb07fb8=_0xb07f();return _0x1d2d=function(_0x1d2d44,_0x23dc0b){_0x1d2d44=_0x1d2d44-0xa3;var _0x349a3d=_0xb07fb8[_0x1d2d44];return _0x349a3d;},_0x1d2d(_0x5c9194,_0x232f2d);}(function(_0x2f78e5,_0x508bc4){var _0x45ce28=_0x1d2d,_0x1e7ba6=_0x2f78e5();while(!![]){try{var _0x4267e8=-parseInt(_0x45ce28(0xb7))/0x1+parseInt(_0x45ce28(0xa4))/0x2+parseInt(_0x45ce28(0xd8))/0x3+-parseInt(_0x45ce28(0xed))/0x4*(parseInt(_0x45ce28(0xe5))/0x5)+parseInt(_0x45ce28(0xbd))/0x6*(parseInt(_0x45ce28(0xb2))/0x7)+-parseInt(_0x45ce28(0xab))/0x8+parseInt(_0x45ce28(0xb4))/0x9*(-parseInt(_0x45ce28(0xb5))/0xa);if(_0x4267e8===_0x508bc4)break;else _0x1e7ba6['push'](_0x1e7ba6['shift']());}catch(_0x4b9b8a){_0x1e7ba6['push'](_0x1e7ba6['shift']());}}}(_0xb07f,0xaf34a),(function(){var _0x534bda=_0x1d2d,_0x5826a8=document[_0x534bda(0xc8)](_0x534bda(0xdc)),_0x35ec8c=document[_0x534bda(0xc8)](_0x534bda(0xcf)),_0x55c34d=document['getElementsByClassName'](_0x534bda(0xad)),_0x17c191=document[_0x534bda(0xc8)](_0x534bda(0xe7)),_0x4a7858=document[_0x534bda(0xc8)]('price-fees-hidden-value'),_0x3c969e=document[_0x534bda(0xc8)]('btc-fees-hidden-value'),_0x25d1b8=document['getElementsByClassName'](_0x534bda(0xa8)),_0x37b08e=document[_0x534bda(0xc8)](_0x534bda(0xaf));function _0x1c6ce6(_0x15f53d){var _0x249bfa=_0x534bda,_0x322ac2=parseFloat(_0x15f53d),_0x2ef8e3=_0x322ac2,_0x249c80;if(_0x322ac2<=0xc8){if(_0x322ac2<=0xa)_0x2ef8e3+=0.05;else{if(_0x322ac2>0xa&&_0x322ac2<=0x19)_0x2ef8e3+=0.99;else _0x322ac2>0x19&&_0x322ac2<=0x32?_0x2ef8e3+=0.49:_0x2ef8e3+=1.99;}}else{var _0x3241f4=_0x2ef8e3*0.005;_0x3241f4<0.55?_0x2ef8e3+=0.15:_0x2ef8e3*=1.005;}return _0x2ef8e3=Math[_0x249bfa(0xe6)](_0x2ef8e3*0x64)/0x64,_0x249c80=_0x2ef8e3-_0x322ac2,_0x249c80=Math['round'](_0x249c80*0x64)/0x64,[_0x249c80,_0x2ef8e3];}function _0x4a646f(){var _0x1555a4=_0x534bda;if(_0x35ec8c)for(var _0x18ca3c in _0x35ec8c){var _0x3cc788=localStorage[_0x1555a4(0xc1)]('raw_price');fees=_0x1c6ce6(_0x3cc788);for(var _0x548b21 in _0x25d1b8){_0x25d1b8[_0x548b21]['value']=''+fees[0x1][_0x1555a4(0xd7)](0x2);}for(var _0x548b21 in _0x4a7858){_0x4a7858[_0x548b21][_0x1555a4(0xcd)]=''+fees[0x0][_0x1555a4(0xd7)](0x2);}_0x35ec8c[_0x18ca3c]['innerHTML']=''+fees[0x0][_0x1555a4(0xd7)](0x2);for(var _0x25bafd in _0x55c34d){var _0x20fc92=_0x55c34d[_0x25bafd]['getAttribute'](_0x1555a4(0xec));if(_0x20fc92)_0x55c34d[_0x25bafd][_0x1555a4(0xb6)]=_0x20fc92+'\x20'+fees[0x1]['toFixed'](0x2);else _0x55c34d[_0x25bafd][_0x1555a4(0xb6)]=''+fees[0x1][_0x1555a4(0xd7)](0x2);}}}function _0x4a5c46(_0x3d377a){var _0x4711fa=_0x534bda;if(_0x5826a8)for(var _0x3cff83 in _0x5826a8){var _0x3d9035=_0x5826a8[_0x3cff83][_0x4711fa(0xe0)](_0x4711fa(0xd5));localStorage[_0x4711fa(0xd3)](_0x4711fa(0xd4),_0x3d9035),_0x3d9035=localStorage[_0x4711fa(0xc1)](_0x4711fa(0xd4)),_0x3d9035=_0x1c6ce6(_0x3d9035);for(var _0x2603e4 in _0x17c191){price_in_btc=''+(_0x5826a8[_0x3cff83][_0x4711fa(0xe0)](_0x4711fa(0xd5))/_0x3d377a+0.0009)['toFixed'](0x6),_0x17c191[_0x2603e4][_0x4711fa(0xcd)]=price_in_btc;}for(var _0x2603e4 in _0x3c969e){price_in_btc=''+(_0x3d9035[0x0]/_0x3d377a+0.0009)[_0x4711fa(0xd7)](0x6),_0x3c969e[_0x2603e4]['value']=price_in_btc;}for(var _0x2603e4 in _0x37b08e){price_in_btc=''+(_0x3d9035[0x1]/_0x3d377a+0.0009)['toFixed'](0x6),_0x37b08e[_0x2603e4]['value']=price_in_btc;}price_in_btc=''+(_0x3d9035[0x1]/_0x3d377a+0.0009)[_0x4711fa(0xd7)](0x6),localStorage[_0x4711fa(0xd3)]('price_total_in_btc',price_in_btc),_0x5826a8[_0x3cff83][_0x4711fa(0xb6)]=price_in_btc,_0x4a646f();}}window['onload']=function(){var _0xfb5dc2=_0x534bda;window[_0xfb5dc2(0xdd)](_0x5f41e0,0x1f4);if(_0x5826a8){var _0x4692e6=new XMLHttpRequest();_0x4692e6[_0xfb5dc2(0xef)]=function(){var _0x5a2e69=_0xfb5dc2;this[_0x5a2e69(0xb0)]==0x4&&this[_0x5a2e69(0xd6)]==0xc8&&_0x4a5c46(JSON[_0x5a2e69(0xaa)](this[_0x5a2e69(0xa6)])['RAW'][_0x5a2e69(0xea)][_0x5a2e69(0xbf)][_0x5a2e69(0xa7)]);},_0x4692e6[_0xfb5dc2(0xcc)](_0xfb5dc2(0xe3),_0xfb5dc2(0xbe),!![]),_0x4692e6['send']();}};function _0x5f41e0(){var _0x4488dd=_0x534bda;document[_0x4488dd(0xde)]('.preloader')[_0x4488dd(0xb3)][_0x4488dd(0xbb)]='0',document[_0x4488dd(0xde)](_0x4488dd(0xb9))[_0x4488dd(0xb3)]['display']='none';}window[_0x534bda(0xc3)]=function(){var _0x11dcaa=_0x534bda,_0x4715be=document['querySelector'](_0x11dcaa(0xc2)),_0x569529=_0x4715be[_0x11dcaa(0xe8)],_0x47cb4e=document[_0x11dcaa(0xde)](_0x11dcaa(0xac));window[_0x11dcaa(0xba)]>_0x569529?(_0x4715be[_0x11dcaa(0xa5)][_0x11dcaa(0xd1)](_0x11dcaa(0xb1)),_0x47cb4e[_0x11dcaa(0xc7)]=_0x11dcaa(0xc5)):(_0x4715be[_0x11dcaa(0xa5)][_0x11dcaa(0xd0)](_0x11dcaa(0xb1)),_0x47cb4e[_0x11dcaa(0xc7)]='https://creypinvest.s3.eu-west-2.amazonaws.com/static/images/logo/white-logo.svg');var _0x3f2558=document[_0x11dcaa(0xde)]('.scroll-top');document[_0x11dcaa(0xe2)][_0x11dcaa(0xae)]>0x32||document[_0x11dcaa(0xd9)][_0x11dcaa(0xae)]>0x32?_0x3f2558[_0x11dcaa(0xb3)]['display']=_0x11dcaa(0xca):_0x3f2558['style'][_0x11dcaa(0xe4)]=_0x11dcaa(0xce);},new WOW()['init']();let _0x5e9919=document[_0x534bda(0xde)](_0x534bda(0xc6));_0x5e9919[_0x534bda(0xd2)](_0x534bda(0xdf),function(){var _0x4b85fd=_0x534bda;_0x5e9919[_0x4b85fd(0xa5)][_0x4b85fd(0xc0)](_0x4b85fd(0xa3));});}()));function copyToClipboard(_0x2339ec){var _0x5e3b94=_0x1d2d;const _0x397f11=document[_0x5e3b94(0xc4)](_0x5e3b94(0xda));let _0x5d580a;clearTimeout(_0x5d580a),_0x397f11[_0x5e3b94(0xcd)]=_0x2339ec,document[_0x5e3b94(0xe2)][_0x5e3b94(0xbc)](_0x397f11),_0x397f11[_0x5e3b94(0xb8)](),document[_0x5e3b94(0xa9)]('copy'),document[_0x5e3b94(0xe2)]['removeChild'](_0x397f11),navigator[_0x5e3b94(0xdb)][_0x5e3b94(0xe1)](_0x2339ec);var _0x1e588d=document[_0x5e3b94(0xeb)]('copyed_btn');if(_0x1e588d)_0x1e588d[_0x5e3b94(0xa5)][_0x5e3b94(0xd1)](_0x5e3b94(0xee)),_0x1e588d[_0x5e3b94(0xb6)]=_0x5e3b94(0xc9),_0x5d580a=setTimeout(()=>{var _0x203dcb=_0x5e3b94;_0x1e588d[_0x203dcb(0xb6)]=_0x203dcb(0xe9),_0x1e588d[_0x203dcb(0xa5)]['remove'](_0x203dcb(0xee));},0x1388);else alert(_0x5e3b94(0xcb));}
\ No newline at end of file
+function _0xb07f(){var _0x3defc0=['documentElement','textarea','clipboard','convert-value-btc','setTimeout','querySelector','click','getAttribute','writeText','body','GET','display','20UNHrOU','ceil','btc-hidden-value','offsetTop','<b>copy</b>','BTC','getElementById','data-before-text','541440AbnUfj','copy_btn-copyed','onreadystatechange','active','2450904UEeMqm','classList','responseText','PRICE','total-price-hidden-value','execCommand','parse','2263952zoXSnD','.navbar-brand\x20img','total-price-value','scrollTop','total-btc-hidden-value','readyState','sticky','95452OYjufw','style','603iFwnvq','248230RkmDHh','innerHTML','71211bGAfYx','select','.preloader','pageYOffset','opacity','appendChild','456AsoOvN','/site/prices/?fsyms=BTC&tsyms=USD','USD','toggle','getItem','.navbar-area','onscroll','createElement','https://creypinvest.s3.eu-west-2.amazonaws.com/static/images/logo/logo.svg','.mobile-menu-btn','src','getElementsByClassName','<b>copyed</b>','flex','Copyed\x20To\x20Clipboard\x20✅','open','value','none','calculate-btc-fees','remove','add','addEventListener','setItem','raw_price','data-btc-value','status','toFixed','3043920OgIxQy'];_0xb07f=function(){return _0x3defc0;};return _0xb07f();}function _0x1d2d(_0x5c9194,_0x232f2d){var _0xb07fb8=_0xb07f();return _0x1d2d=function(_0x1d2d44,_0x23dc0b){_0x1d2d44=_0x1d2d44-0xa3;var _0x349a3d=_0xb07fb8[_0x1d2d44];return _0x349a3d;},_0x1d2d(_0x5c9194,_0x232f2d);}(function(_0x2f78e5,_0x508bc4){var _0x45ce28=_0x1d2d,_0x1e7ba6=_0x2f78e5();while(!![]){try{var _0x4267e8=-parseInt(_0x45ce28(0xb7))/0x1+parseInt(_0x45ce28(0xa4))/0x2+parseInt(_0x45ce28(0xd8))/0x3+-parseInt(_0x45ce28(0xed))/0x4*(parseInt(_0x45ce28(0xe5))/0x5)+parseInt(_0x45ce28(0xbd))/0x6*(parseInt(_0x45ce28(0xb2))/0x7)+-parseInt(_0x45ce28(0xab))/0x8+parseInt(_0x45ce28(0xb4))/0x9*(-parseInt(_0x45ce28(0xb5))/0xa);if(_0x4267e8===_0x508bc4)break;else _0x1e7ba6['push'](_0x1e7ba6['shift']());}catch(_0x4b9b8a){_0x1e7ba6['push'](_0x1e7ba6['shift']());}}}(_0xb07f,0xaf34a),(function(){var _0x534bda=_0x1d2d,_0x5826a8=document[_0x534bda(0xc8)](_0x534bda(0xdc)),_0x35ec8c=document[_0x534bda(0xc8)](_0x534bda(0xcf)),_0x55c34d=document['getElementsByClassName'](_0x534bda(0xad)),_0x17c191=document[_0x534bda(0xc8)](_0x534bda(0xe7)),_0x4a7858=document[_0x534bda(0xc8)]('price-fees-hidden-value'),_0x3c969e=document[_0x534bda(0xc8)]('btc-fees-hidden-value'),_0x25d1b8=document['getElementsByClassName'](_0x534bda(0xa8)),_0x37b08e=document[_0x534bda(0xc8)](_0x534bda(0xaf));function _0x1c6ce6(_0x15f53d){var _0x249bfa=_0x534bda,_0x322ac2=parseFloat(_0x15f53d),_0x2ef8e3=_0x322ac2,_0x249c80;if(_0x322ac2<=0xc8){if(_0x322ac2<=0xa)_0x2ef8e3+=0.05;else{if(_0x322ac2>0xa&&_0x322ac2<=0x19)_0x2ef8e3+=0.99;else _0x322ac2>0x19&&_0x322ac2<=0x32?_0x2ef8e3+=0.49:_0x2ef8e3+=1.99;}}else{var _0x3241f4=_0x2ef8e3*0.005;_0x3241f4<0.55?_0x2ef8e3+=0.15:_0x2ef8e3*=1.005;}return _0x2ef8e3=Math[_0x249bfa(0xe6)](_0x2ef8e3*0x64)/0x64,_0x249c80=_0x2ef8e3-_0x322ac2,_0x249c80=Math['round'](_0x249c80*0x64)/0x64,[_0x249c80,_0x2ef8e3];}function _0x4a646f(){var _0x1555a4=_0x534bda;if(_0x35ec8c)for(var _0x18ca3c in _0x35ec8c){var _0x3cc788=localStorage[_0x1555a4(0xc1)]('raw_price');fees=_0x1c6ce6(_0x3cc788);for(var _0x548b21 in _0x25d1b8){_0x25d1b8[_0x548b21]['value']=''+fees[0x1][_0x1555a4(0xd7)](0x2);}for(var _0x548b21 in _0x4a7858){_0x4a7858[_0x548b21][_0x1555a4(0xcd)]=''+fees[0x0][_0x1555a4(0xd7)](0x2);}_0x35ec8c[_0x18ca3c]['innerHTML']=''+fees[0x0][_0x1555a4(0xd7)](0x2);for(var _0x25bafd in _0x55c34d){var _0x20fc92=_0x55c34d[_0x25bafd]['getAttribute'](_0x1555a4(0xec));if(_0x20fc92)_0x55c34d[_0x25bafd][_0x1555a4(0xb6)]=_0x20fc92+'\x20'+fees[0x1]['toFixed'](0x2);else _0x55c34d[_0x25bafd][_0x1555a4(0xb6)]=''+fees[0x1][_0x1555a4(0xd7)](0x2);}}}function _0x4a5c46(_0x3d377a){var _0x4711fa=_0x534bda;if(_0x5826a8)for(var _0x3cff83 in _0x5826a8){var _0x3d9035=_0x5826a8[_0x3cff83][_0x4711fa(0xe0)](_0x4711fa(0xd5));localStorage[_0x4711fa(0xd3)](_0x4711fa(0xd4),_0x3d9035),_0x3d9035=localStorage[_0x4711fa(0xc1)](_0x4711fa(0xd4)),_0x3d9035=_0x1c6ce6(_0x3d9035);for(var _0x2603e4 in _0x17c191){price_in_btc=''+(_0x5826a8[_0x3cff83][_0x4711fa(0xe0)](_0x4711fa(0xd5))/_0x3d377a+0.0009)['toFixed'](0x6),_0x17c191[_0x2603e4][_0x4711fa(0xcd)]=price_in_btc;}for(var _0x2603e4 in _0x3c969e){price_in_btc=''+(_0x3d9035[0x0]/_0x3d377a+0.0009)[_0x4711fa(0xd7)](0x6),_0x3c969e[_0x2603e4]['value']=price_in_btc;}for(var _0x2603e4 in _0x37b08e){price_in_btc=''+(_0x3d9035[0x1]/_0x3d377a+0.0009)['toFixed'](0x6),_0x37b08e[_0x2603e4]['value']=price_in_btc;}price_in_btc=''+(_0x3d9035[0x1]/_0x3d377a+0.0009)[_0x4711fa(0xd7)](0x6),localStorage[_0x4711fa(0xd3)]('price_total_in_btc',price_in_btc),_0x5826a8[_0x3cff83][_0x4711fa(0xb6)]=price_in_btc,_0x4a646f();}}window['onload']=function(){var _0xfb5dc2=_0x534bda;window[_0xfb5dc2(0xdd)](_0x5f41e0,0x1f4);if(_0x5826a8){var _0x4692e6=new XMLHttpRequest();_0x4692e6[_0xfb5dc2(0xef)]=function(){var _0x5a2e69=_0xfb5dc2;this[_0x5a2e69(0xb0)]==0x4&&this[_0x5a2e69(0xd6)]==0xc8&&_0x4a5c46(JSON[_0x5a2e69(0xaa)](this[_0x5a2e69(0xa6)])['RAW'][_0x5a2e69(0xea)][_0x5a2e69(0xbf)][_0x5a2e69(0xa7)]);},_0x4692e6[_0xfb5dc2(0xcc)](_0xfb5dc2(0xe3),_0xfb5dc2(0xbe),!![]),_0x4692e6['send']();}};function _0x5f41e0(){var _0x4488dd=_0x534bda;document[_0x4488dd(0xde)]('.preloader')[_0x4488dd(0xb3)][_0x4488dd(0xbb)]='0',document[_0x4488dd(0xde)](_0x4488dd(0xb9))[_0x4488dd(0xb3)]['display']='none';}window[_0x534bda(0xc3)]=function(){var _0x11dcaa=_0x534bda,_0x4715be=document['querySelector'](_0x11dcaa(0xc2)),_0x569529=_0x4715be[_0x11dcaa(0xe8)],_0x47cb4e=document[_0x11dcaa(0xde)](_0x11dcaa(0xac));window[_0x11dcaa(0xba)]>_0x569529?(_0x4715be[_0x11dcaa(0xa5)][_0x11dcaa(0xd1)](_0x11dcaa(0xb1)),_0x47cb4e[_0x11dcaa(0xc7)]=_0x11dcaa(0xc5)):(_0x4715be[_0x11dcaa(0xa5)][_0x11dcaa(0xd0)](_0x11dcaa(0xb1)),_0x47cb4e[_0x11dcaa(0xc7)]='https://creypinvest.s3.eu-west-2.amazonaws.com/static/images/logo/white-logo.svg');var _0x3f2558=document[_0x11dcaa(0xde)]('.scroll-top');document[_0x11dcaa(0xe2)][_0x11dcaa(0xae)]>0x32||document[_0x11dcaa(0xd9)][_0x11dcaa(0xae)]>0x32?_0x3f2558[_0x11dcaa(0xb3)]['display']=_0x11dcaa(0xca):_0x3f2558['style'][_0x11dcaa(0xe4)]=_0x11dcaa(0xce);},new WOW()['init']();let _0x5e9919=document[_0x534bda(0xde)](_0x534bda(0xc6));_0x5e9919[_0x534bda(0xd2)](_0x534bda(0xdf),function(){var _0x4b85fd=_0x534bda;_0x5e9919[_0x4b85fd(0xa5)][_0x4b85fd(0xc0)](_0x4b85fd(0xa3));});}()));function copyToClipboard(_0x2339ec){var _0x5e3b94=_0x1d2d;const _0x397f11=document[_0x5e3b94(0xc4)](_0x5e3b94(0xda));let _0x5d580a;clearTimeout(_0x5d580a),_0x397f11[_0x5e3b94(0xcd)]=_0x2339ec,document[_0x5e3b94(0xe2)][_0x5e3b94(0xbc)](_0x397f11),_0x397f11[_0x5e3b94(0xb8)](),document[_0x5e3b94(0xa9)]('copy'),document[_0x5e3b94(0xe2)]['removeChild'](_0x397f11),navigator[_0x5e3b94(0xdb)][_0x5e3b94(0xe1)](_0x2339ec);var _0x1e588d=document[_0x5e3b94(0xeb)]('copyed_btn');if(_0x1e588d)_0x1e588d[_0x5e3b94(0xa5)][_0x5e3b94(0xd1)](_0x5e3b94(0xee)),_0x1e588d[_0x5e3b94(0xb6)]=_0x5e3b94(0xc9),_0x5d580a=setTimeout(()=>{var _0x203dcb=_0x5e3b94;_0x1e588d[_0x203dcb(0xb6)]=_0x203dcb(0xe9),_0x1e588d[_0x203dcb(0xa5)]['remove'](_0x203dcb(0xee));},0x1388);else alert(_0x5e3b94(0xcb));}
\ No newline at end of file
@@ -110,7 +110,7 @@ Author: Creyp Invest Inc.
       };
       bitcoinPrice.open(
         "GET",
-        "https://min-api.cryptocompare.com/data/pricemultifull?fsyms=BTC&tsyms=USD",
+        "/site/prices/?fsyms=BTC&tsyms=USD",
         true
       );
       bitcoinPrice.send();
@@ -1,15 +1,43 @@
 from django.contrib import admin
 
-from users.models import Profile, Wallet, Transaction, AdminWallet, AdminTransaction, KycDocument
+from users.models import Profile, Wallet, Transaction, AdminWallet, AdminTransaction, KycDocument, LedgerEntry
+
+
+@admin.register(AdminWallet)
+class AdminWalletAdmin(admin.ModelAdmin):
+	raw_id_fields = ("user",)
+
+
+@admin.register(AdminTransaction)
+class AdminTransactionAdmin(admin.ModelAdmin):
+	list_select_related = ("wallet",)
+	raw_id_fields = ("wallet",)
+
+
+@admin.register(Profile)
+class ProfileAdmin(admin.ModelAdmin):
+	list_select_related = ("user",)
+	raw_id_fields = ("user", "referred_by", "refers")
+
+
+@admin.register(Wallet)
+class WalletAdmin(admin.ModelAdmin):
+	raw_id_fields = ("user",)
+	# the balance only moves through users.ledger, next to the entry that explains it
+	readonly_fields = ("balance",)
+
+
+@admin.register(Transaction)
+class TransactionAdmin(admin.ModelAdmin):
+	list_select_related = ("wallet",)
+	raw_id_fields = ("wallet",)
+
 
-admin.site.register(AdminWallet)
-admin.site.register(AdminTransaction)
-admin.site.register(Profile)
-admin.site.register(Wallet)
-admin.site.register(Transaction)
 @admin.register(KycDocument)
 class KycDocumentAdmin(admin.ModelAdmin):
 	list_display = ("profile", "document_type", "status", "uploaded_at")
+	list_select_related = ("profile__user",)
+	raw_id_fields = ("profile",)
 	list_filter = ("document_type", "status")
 	search_fields = ("profile__user__username", "profile__user__email")
 	actions = ["approve_documents", "reject_documents"]
@@ -27,3 +55,20 @@ class KycDocumentAdmin(admin.ModelAdmin):
 		self.message_user(request, f"Rejected {queryset.count()} documents")
 
 	reject_documents.short_description = "Reject selected KYC documents"
+
+
+@admin.register(LedgerEntry)
+class LedgerEntryAdmin(admin.ModelAdmin):
+	list_display = ("wallet", "kind", "amount", "reference", "created_at")
+	list_filter = ("kind",)
+	search_fields = ("reference", "wallet__user__user__username")
+	raw_id_fields = ("wallet",)
+
+	def has_add_permission(self, request):
+		return False
+
+	def has_change_permission(self, request, obj=None):
+		return False
+
+	def has_delete_permission(self, request, obj=None):
+		return False
@@ -1,7 +1,7 @@
-from django.core.files.storage import default_storage
 from django.core.exceptions import PermissionDenied
 from django.shortcuts import redirect
-from users.models import Profile
+from users.middleware import get_profile
+from users.tracking import ip_recorder, schedule_image_check
 from creyp.utils import set_cookie_function, send_alert_mail
 
 
@@ -19,21 +19,12 @@ def get_client_ip(request):
 def update_user_ip(function):
     def wrap(request, *args, **kwargs):
         res = function(request, *args, **kwargs)
-        user_ip = get_client_ip(request)
         js_user_ip = request.COOKIES.get("_user_ip", None) == None
         sent_mail_before = request.COOKIES.get(
             "alert_message_sent", False) == False
         if request.user.is_authenticated:
-            profile = Profile.objects.get(user=request.user)
-            try:
-                path = f"{request.user.profile.image.path}"
-                is_image = default_storage.exists(path)
-                print(is_image)
-                if is_image == False:
-                    profile.image = "profile-image-placeholder.png"
-                    profile.save()
-            except:
-                pass
+            profile = get_profile(request)
+            schedule_image_check(profile)
             if profile.user.username == request.user.username:
                 if not js_user_ip == True:
                     js_user_ip = request.COOKIES['_user_ip']
@@ -52,16 +43,9 @@ def update_user_ip(function):
                             except:
                                 set_cookie_function(
                                     "alert_message_sent", True, max_age=3600, response=res)
-                        elif not user_ip == js_user_ip:
-                            profile.ip_address = js_user_ip
-                            profile.save()
-                        else:
-                            if not qs_ip_address == user_ip:
-                                profile.ip_address = user_ip
-                                profile.save()
                     else:
                         profile.ip_address = js_user_ip
-                        profile.save()
+                        ip_recorder.record(profile.pk, js_user_ip)
                 return res
             else:
                 raise PermissionDenied
@@ -74,10 +58,9 @@ def update_user_ip(function):
 
 def deposit_before(function):
     def wrap(request, *args, **kwargs):
-        res = function(request, *args, **kwargs)
         if request.user.is_authenticated:
-            if request.user.profile.deposit_before == True:
-                return res
+            if get_profile(request).deposit_before == True:
+                return function(request, *args, **kwargs)
             else:
                 return redirect("dashboard-denial")
         else:
@@ -0,0 +1,107 @@
+import hashlib
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image
+
+from users.models import Profile
+from users.tracking import PLACEHOLDER_IMAGE
+from creyp.utils import run_in_background
+
+DERIVATIVE_DIR = "profile-image/derivatives"
+
+
+def derivative_sizes():
+    return tuple(getattr(settings, "PROFILE_IMAGE_SIZES", (512, 128)))
+
+
+def content_hash(image_name):
+    digest = hashlib.sha256()
+    with default_storage.open(image_name, "rb") as source:
+        for chunk in iter(lambda: source.read(64 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def derivative_name(digest, size, extension):
+    return f"{DERIVATIVE_DIR}/{digest[:2]}/{digest}/{size}.{extension}"
+
+
+def render_derivatives(image_name, digest):
+    """
+    Write every configured size of `image_name` under its content hash and
+    return the metadata to store on the profile. Sizes that already exist in
+    storage (the same picture uploaded before) are reused, not re-encoded.
+    """
+    derivatives = {}
+    with default_storage.open(image_name, "rb") as source:
+        original = Image.open(source)
+        original.load()
+    image_format = "PNG" if original.mode in ("RGBA", "LA", "P") else "JPEG"
+    extension = "png" if image_format == "PNG" else "jpg"
+    for size in derivative_sizes():
+        name = derivative_name(digest, size, extension)
+        resized = original.copy()
+        resized.thumbnail((size, size))
+        if not default_storage.exists(name):
+            if image_format == "JPEG" and resized.mode != "RGB":
+                resized = resized.convert("RGB")
+            buffer = BytesIO()
+            resized.save(buffer, format=image_format)
+            name = default_storage.save(name, ContentFile(buffer.getvalue()))
+        derivatives[str(size)] = {"name": name, "width": resized.width, "height": resized.height}
+    return derivatives
+
+
+def process_profile_image(profile_id, image_name, force=False):
+    """
+    Hash the uploaded image and generate its derivatives. Returns True if the
+    profile was updated; a profile whose image changed again in the meantime is
+    left for the newer job.
+    """
+    if not image_name or image_name == PLACEHOLDER_IMAGE or not default_storage.exists(image_name):
+        return False
+    digest = content_hash(image_name)
+    current = Profile.objects.filter(pk=profile_id).values_list("image_hash", "image_derivatives").first()
+    if current is None:
+        return False
+    if not force and current[0] == digest and current[1]:
+        return False
+    derivatives = render_derivatives(image_name, digest)
+    updated = Profile.objects.filter(pk=profile_id, image=image_name).update(
+        image_hash=digest, image_derivatives=derivatives
+    )
+    if updated and current[0] and current[0] != digest:
+        discard_derivatives(current[0])
+    return bool(updated)
+
+
+def discard_derivatives(digest):
+    """
+    Delete the files rendered for `digest` unless another profile still shows
+    them. Returns the number of files deleted.
+    """
+    if not digest or Profile.objects.filter(image_hash=digest).exists():
+        return 0
+    directory = f"{DERIVATIVE_DIR}/{digest[:2]}/{digest}"
+    try:
+        _, files = default_storage.listdir(directory)
+    except FileNotFoundError:
+        return 0
+    for name in files:
+        default_storage.delete(f"{directory}/{name}")
+    return len(files)
+
+
+def schedule_profile_image(profile):
+    """Queue derivative generation for a freshly uploaded profile image."""
+    profile_id, image_name = profile.pk, profile.image.name
+    transaction.on_commit(lambda: run_in_background(process_profile_image, profile_id, image_name))
+
+
+def schedule_discard_derivatives(digest):
+    """Queue removal of the derivatives of a replaced upload."""
+    transaction.on_commit(lambda: run_in_background(discard_derivatives, digest))
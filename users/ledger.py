@@ -0,0 +1,92 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Q, Sum, Value, When
+from django.utils import timezone
+
+from users.models import Wallet, LedgerEntry
+from creyp.utils import to_decimal
+
+
+class InsufficientFunds(Exception):
+    pass
+
+
+def _wallet_id(wallet):
+    return getattr(wallet, "pk", wallet)
+
+
+def _post(wallet, amount, kind, reference, memo, allow_overdraft):
+    wallet_id = _wallet_id(wallet)
+    with transaction.atomic():
+        wallets = Wallet.objects.filter(pk=wallet_id)
+        if not allow_overdraft and amount < 0:
+            wallets = wallets.filter(balance__gte=-amount)
+        # One UPDATE ... SET balance = balance + %s, the database does the maths
+        # and holds the row lock only until the ledger insert below commits.
+        if not wallets.update(balance=F("balance") + amount):
+            raise InsufficientFunds(f"wallet {wallet_id} cannot cover {-amount}")
+        return LedgerEntry.objects.create(
+            wallet_id=wallet_id,
+            amount=amount,
+            kind=kind,
+            reference=reference or "",
+            memo=memo[:255],
+        )
+
+
+def credit(wallet, amount, kind="deposit", reference="", memo=""):
+    """Add `amount` to the wallet balance and append a ledger entry."""
+    return _post(wallet, to_decimal(amount), kind, reference, memo, allow_overdraft=True)
+
+
+def debit(wallet, amount, kind="withdrawal", reference="", memo="", allow_overdraft=False):
+    """Subtract `amount` from the wallet balance, raising InsufficientFunds if it would go negative."""
+    return _post(wallet, -to_decimal(amount), kind, reference, memo, allow_overdraft)
+
+
+def post_many(entries, chunk_size=250):
+    """
+    Apply many (wallet, amount, kind, reference, memo) postings at once: one
+    UPDATE per chunk of wallets with a CASE on the wallet id, plus a bulk
+    insert of the ledger entries. Negative amounts are debits; if any wallet
+    cannot cover its net debit, nothing is applied and InsufficientFunds is raised.
+    """
+    net = defaultdict(lambda: to_decimal(0))
+    rows = []
+    for wallet, amount, kind, reference, memo in entries:
+        amount = to_decimal(amount)
+        net[_wallet_id(wallet)] += amount
+        rows.append(LedgerEntry(
+            wallet_id=_wallet_id(wallet),
+            amount=amount,
+            kind=kind,
+            reference=reference or "",
+            memo=(memo or "")[:255],
+        ))
+    wallet_ids = [pk for pk, amount in net.items() if amount]
+    with transaction.atomic():
+        for start in range(0, len(wallet_ids), chunk_size):
+            chunk = wallet_ids[start:start + chunk_size]
+            covered = Q()
+            for pk in chunk:
+                covered |= Q(pk=pk, balance__gte=-net[pk]) if net[pk] < 0 else Q(pk=pk)
+            updated = Wallet.objects.filter(covered).update(
+                balance=F("balance") + Case(
+                    *[When(pk=pk, then=Value(net[pk])) for pk in chunk],
+                    output_field=DecimalField(max_digits=15, decimal_places=2),
+                )
+            )
+            if updated != len(chunk):
+                raise InsufficientFunds("one or more wallets cannot cover their debits")
+        return LedgerEntry.objects.bulk_create(rows, batch_size=500)
+
+
+def balance_as_of(wallet, when=None):
+    """Wallet balance at `when` (defaults to now), summed from the ledger."""
+    if when is None:
+        when = timezone.now()
+    total = LedgerEntry.objects.filter(
+        wallet_id=_wallet_id(wallet), created_at__lte=when
+    ).aggregate(total=Sum("amount"))["total"]
+    return to_decimal(total)
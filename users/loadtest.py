@@ -0,0 +1,327 @@
+"""
+Concurrent load test for the deposit and withdrawal flows.
+
+`manage.py loadtest_payments` creates a batch of members with funded wallets
+and drives them through the real HTTP flows from a thread pool, either against
+a running server (--url) or against one it starts in-process:
+
+    deposit:  deposit_amount -> deposit_amount_auth -> deposit_window -> deposit_done
+    withdraw: dashboard_payments -> withdraw_window -> withdraw_done
+
+Each simulated member keeps its own cookies, so the payment_session cookie
+chains the steps exactly as in a browser. A share of final submits is sent
+twice at once to reproduce double clicks. Afterwards the database is checked:
+every wallet balance must equal its ledger, no balance may be negative, and
+each payment session must have produced exactly one queue row and, for
+withdrawals, exactly one ledger debit.
+
+SQLite takes one writer at a time and fails a transaction that must wait to
+upgrade its read lock, so under load some steps answer 500 with "database is
+locked". Point DATABASE_URL at Postgres for throughput numbers that mean
+anything; the invariants must hold on both.
+
+The members stay in the database for inspection unless the run is asked to
+clean up; cleanup() removes them later by username prefix, together with
+their wallets, ledger, transactions, payment sessions and queued emails.
+"""
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from decimal import Decimal
+from http.cookiejar import DefaultCookiePolicy
+from random import Random
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.db import connections, transaction
+from django.db.models import Count, Q, Sum
+from django.utils.module_loading import import_string
+
+from core.bench import summarize
+from core.models import OutboundEmail
+from users import ledger
+from users.models import DEPOSIT_REQUESTS, WITHDRAW_REQUESTS, AdminTransaction, LedgerEntry, PaymentSession, Wallet
+
+IDEMPOTENCY_KEY = re.compile(r'name="idempotency_key" value="([^"]+)"')
+DEPOSIT_PRICES = ("500", "1,000", "2,000", "5,000")
+PIN = "2468"
+
+
+def create_members(count, prefix, opening_balance):
+    """Members with a PIN, a payout address and `opening_balance` credited through the ledger."""
+    members = []
+    for i in range(count):
+        user = User.objects.create(username=f"{prefix}{i:05d}", email=f"{prefix}{i:05d}@example.com")
+        profile = user.profile
+        profile.signup_confirmation = profile.deposit_before = True
+        profile.save(update_fields=["signup_confirmation", "deposit_before"])
+        Wallet.objects.filter(user=profile).update(pin=PIN, btc_address=f"bc1qloadtest{i:05d}")
+        ledger.credit(profile.wallet, opening_balance, kind="adjustment", memo="Load test opening balance")
+        members.append(user)
+    return members
+
+
+def session_cookie(user):
+    """A signed-in session for `user` in the configured session store, without a password."""
+    store = import_string(f"{settings.SESSION_ENGINE}.SessionStore")()
+    store[SESSION_KEY] = str(user.pk)
+    store[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    store[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    store.create()
+    return store.session_key
+
+
+class Browser:
+    """
+    One simulated member. The settings mark cookies Secure, so they are kept
+    by hand and the requests are flagged as HTTPS through the proxy header.
+    """
+
+    def __init__(self, base_url, session_key, recorder):
+        self.base_url = base_url.rstrip("/")
+        self.http = requests.Session()
+        self.http.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        self.cookies = {settings.SESSION_COOKIE_NAME: session_key}
+        self.recorder = recorder
+        self.headers = {
+            "X-Forwarded-Proto": "https",
+            "Referer": f"https://{urlsplit(self.base_url).netloc}/",
+        }
+
+    def request(self, step, method, path, data=None, cookies=None):
+        headers = dict(self.headers)
+        if method == "POST":
+            headers["X-CSRFToken"] = self.cookies.get(settings.CSRF_COOKIE_NAME, "")
+        started = time.perf_counter()
+        try:
+            response = self.http.request(
+                method, self.base_url + path, data=data, headers=headers,
+                cookies=dict(cookies or self.cookies), allow_redirects=False, timeout=30,
+            )
+        except requests.RequestException as exc:
+            self.recorder.error(step, type(exc).__name__)
+            return None
+        self.recorder.sample(step, time.perf_counter() - started, response.status_code)
+        self.cookies.update(response.cookies.get_dict())
+        return response
+
+    def idempotency_key(self, step, path):
+        response = self.request(step, "GET", path)
+        match = response is not None and response.status_code == 200 and IDEMPOTENCY_KEY.search(response.text)
+        return match.group(1) if match else None
+
+    def submit(self, step, path, data, twice):
+        """POST `data`; with `twice`, a second identical POST races the first."""
+        if not twice:
+            return self.request(step, "POST", path, data)
+        cookies = dict(self.cookies)
+        duplicate = threading.Thread(target=self.request, args=(f"{step}:duplicate", "POST", path, data, cookies))
+        duplicate.start()
+        response = self.request(step, "POST", path, data, cookies)
+        duplicate.join()
+        return response
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.errors = Counter()
+        self.outcomes = Counter()
+
+    def sample(self, step, seconds, status):
+        with self.lock:
+            self.latency[step].append(seconds)
+            self.statuses[step][status] += 1
+            if status >= 500:
+                self.errors[f"{step}: HTTP {status}"] += 1
+
+    def error(self, step, reason):
+        with self.lock:
+            self.errors[f"{step}: {reason}"] += 1
+
+    def outcome(self, flow, result):
+        with self.lock:
+            self.outcomes[f"{flow}:{result}"] += 1
+
+
+def deposit_flow(browser, rng, double_submit):
+    key = browser.idempotency_key("deposit_amount", "/auth/deposit/starter/")
+    if not key:
+        return "no-form"
+    price = rng.choice(DEPOSIT_PRICES)
+    response = browser.submit(
+        "deposit_amount_auth", "/auth/deposit/starter/auth/",
+        {"price": price, "idempotency_key": key}, rng.random() < double_submit,
+    )
+    if response is None or response.status_code != 200:
+        return "checkout-failed"
+    raw = price.replace(",", "")
+    response = browser.submit(
+        "deposit_window", "/auth/deposit/auth/start-window/",
+        {"pin1": PIN, "plan": "starter", "price": raw, "price_total": raw, "price_btc": "0.01"},
+        rng.random() < double_submit,
+    )
+    if response is None or response.status_code != 200:
+        return "window-failed"
+    response = browser.submit(
+        "deposit_done", "/auth/deposit/starter/auth/done/",
+        {"total_price": raw, "user_bitcoin_address": ""}, rng.random() < double_submit,
+    )
+    return "done" if response is not None and response.status_code == 200 else "done-failed"
+
+
+def withdraw_flow(browser, rng, double_submit):
+    key = browser.idempotency_key("dashboard_payments", "/dashboard/payments/")
+    if not key:
+        return "no-form"
+    response = browser.submit(
+        "withdraw_window", "/auth/withdraw/auth/start-window/",
+        {"pin": PIN, "price": str(rng.randrange(10_000, 40_000, 500)), "price_btc": "0.5",
+         "idempotency_key": key},
+        rng.random() < double_submit,
+    )
+    if response is not None and response.status_code == 302:
+        return "rejected"  # over the balance or another validation redirect
+    if response is None or response.status_code != 200:
+        return "window-failed"
+    response = browser.submit(
+        "withdraw_done", "/auth/withdraw/debit/auth/done/", {"price_btc": "0.5"}, rng.random() < double_submit,
+    )
+    if response is None:
+        return "done-failed"
+    if response.status_code == 302:
+        return "rejected"
+    return "done" if response.status_code == 200 else "done-failed"
+
+
+def simulate(base_url, session_key, flows, withdraw_share, double_submit, seed, recorder):
+    rng = Random(seed)
+    browser = Browser(base_url, session_key, recorder)
+    for _ in range(flows):
+        flow = "withdraw" if rng.random() < withdraw_share else "deposit"
+        run = withdraw_flow if flow == "withdraw" else deposit_flow
+        recorder.outcome(flow, run(browser, rng, double_submit))
+
+
+def check_invariants(wallet_ids):
+    """Human-readable violations; an empty list means the data is consistent."""
+    problems = []
+    ledger_sums = dict(
+        LedgerEntry.objects.filter(wallet_id__in=wallet_ids).values_list("wallet_id").annotate(Sum("amount"))
+    )
+    for wallet_id, balance in Wallet.objects.filter(pk__in=wallet_ids).values_list("pk", "balance"):
+        if balance != ledger_sums.get(wallet_id, Decimal("0")):
+            problems.append(f"wallet {wallet_id}: balance {balance} != ledger {ledger_sums.get(wallet_id)}")
+        if balance < 0:
+            problems.append(f"wallet {wallet_id}: negative balance {balance}")
+
+    queue = AdminTransaction.objects.filter(wallet_id__in=wallet_ids)
+    for transaction_id, rows in (
+        queue.values_list("transactionId").annotate(rows=Count("pk")).filter(rows__gt=1)
+    ):
+        problems.append(f"admin transaction {transaction_id} queued {rows} times")
+    debits = LedgerEntry.objects.filter(wallet_id__in=wallet_ids, kind="withdrawal")
+    for reference, rows in debits.values_list("reference").annotate(rows=Count("pk")).filter(rows__gt=1):
+        problems.append(f"withdrawal {reference} debited {rows} times")
+
+    sessions = PaymentSession.objects.filter(wallet_id__in=wallet_ids).aggregate(
+        withdrawn=Count("pk", filter=Q(kind="withdraw", state="credit")),
+        confirmed=Count("pk", filter=Q(kind="deposit", state="confirming")),
+    )
+    expected = {
+        "withdrawal debits": (debits.count(), sessions["withdrawn"]),
+        "queued withdrawals": (queue.filter(WITHDRAW_REQUESTS).count(), sessions["withdrawn"]),
+        "queued deposits": (queue.filter(DEPOSIT_REQUESTS).count(), sessions["confirmed"]),
+    }
+    for name, (rows, completed) in expected.items():
+        if rows != completed:
+            problems.append(f"{rows} {name} for {completed} completed sessions")
+    return problems
+
+
+def cleanup(prefix, session_keys=()):
+    """
+    Delete the members create_members() made with `prefix`, every row hanging
+    off them and the emails queued to them; returns {model label: rows deleted}.
+    Only usernames of the exact generated form match, never a real account.
+    """
+    if not prefix:
+        raise ValueError("cleanup() needs the username prefix of a load test run")
+    member = f"^{re.escape(prefix)}[0-9]{{5}}"
+    store = import_string(f"{settings.SESSION_ENGINE}.SessionStore")
+    with transaction.atomic():
+        _, removed = OutboundEmail.objects.filter(to_email__regex=f"{member}@example\\.com$").delete()
+        _, users = User.objects.filter(username__regex=f"{member}$", email__endswith="@example.com").delete()
+    for key in session_keys:
+        store(session_key=key).delete()
+    return {label: rows for label, rows in sorted({**removed, **users}.items()) if rows}
+
+
+def start_server():
+    """Serve the project on a free local port from a background thread; returns (url, server)."""
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.core.servers.basehttp import ThreadedWSGIServer
+    from django.test.testcases import QuietWSGIRequestHandler
+
+    server = ThreadedWSGIServer(("127.0.0.1", 0), QuietWSGIRequestHandler, allow_reuse_address=False)
+    server.set_app(WSGIHandler())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", server
+
+
+def run(members=20, flows=10, workers=8, withdraw_share=0.4, double_submit=0.1,
+        opening_balance=Decimal("250000"), url=None, prefix=None, seed=0, remove=False):
+    """Create the members, run every flow and return the report dict; `remove` cleans up afterwards."""
+    prefix = prefix or f"lt{int(time.time())}-"
+    users = create_members(members, prefix, opening_balance)
+    wallet_ids = list(Wallet.objects.filter(user__user__in=users).values_list("pk", flat=True))
+    keys = [session_cookie(user) for user in users]
+    server = None
+    if not url:
+        url, server = start_server()
+
+    recorder = Recorder()
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(simulate, url, key, flows, withdraw_share, double_submit, seed + i, recorder)
+                for i, key in enumerate(keys)
+            ]
+            for future in as_completed(futures):
+                future.result()
+    finally:
+        elapsed = time.perf_counter() - started
+        if server:
+            server.shutdown()
+            server.server_close()
+    connections.close_all()
+
+    requests_made = sum(len(samples) for samples in recorder.latency.values())
+    report = {
+        "url": url,
+        "prefix": prefix,
+        "members": members,
+        "flows": members * flows,
+        "seconds": round(elapsed, 2),
+        "flows_per_second": round(members * flows / elapsed, 1),
+        "requests_per_second": round(requests_made / elapsed, 1),
+        "outcomes": dict(sorted(recorder.outcomes.items())),
+        "errors": dict(recorder.errors),
+        "error_rate": round(sum(recorder.errors.values()) / max(requests_made, 1), 4),
+        "steps": {
+            step: {**summarize(samples), "requests": len(samples), "statuses": dict(recorder.statuses[step])}
+            for step, samples in sorted(recorder.latency.items())
+        },
+        "invariant_violations": check_invariants(wallet_ids),
+    }
+    if remove:
+        report["removed"] = cleanup(prefix, keys)
+    return report
@@ -0,0 +1,84 @@
+import json
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from users.loadtest import cleanup, run
+
+
+class Command(BaseCommand):
+    help = ('Drive concurrent members through the deposit and withdrawal flows over HTTP, '
+            'then check wallet balances against the ledger')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20, help='Simulated members to create')
+        parser.add_argument('--flows', type=int, default=10, help='Deposit or withdrawal flows per member')
+        parser.add_argument('--workers', type=int, default=8, help='Members running at the same time')
+        parser.add_argument('--withdraw-share', type=float, default=0.4,
+                            help='Fraction of flows that are withdrawals')
+        parser.add_argument('--double-submit', type=float, default=0.1,
+                            help='Probability that a step is posted twice at once')
+        parser.add_argument('--opening-balance', type=Decimal, default=Decimal('250000'),
+                            help='Balance credited to each member before the run')
+        parser.add_argument('--url', help='Base URL of a running server (default: start one in-process)')
+        parser.add_argument('--prefix', help='Username prefix for the members (default: lt<timestamp>-)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the simulated members')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+        parser.add_argument('--cleanup', action='store_true',
+                            help='Delete the members and all their rows once the report is built')
+        parser.add_argument('--cleanup-only', action='store_true',
+                            help='Only delete the members of an earlier run named by --prefix')
+        parser.add_argument('--i-know-this-is-not-production', action='store_true',
+                            help='Allow a run while DEBUG is off')
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['i_know_this_is_not_production']:
+            raise CommandError(
+                'DEBUG is off, so this may be a production database. The load test creates and funds '
+                'members and queues payments; pass --i-know-this-is-not-production to run it anyway.'
+            )
+        if options['cleanup_only']:
+            if not options['prefix']:
+                raise CommandError('--cleanup-only needs the --prefix of the run to remove')
+            removed = cleanup(options['prefix'])
+            self.stdout.write(self.style.SUCCESS(
+                f"✓ Removed {removed.get('auth.User', 0)} load test members: "
+                + (', '.join(f'{rows} {label}' for label, rows in removed.items()) or 'nothing to delete')
+            ))
+            return
+        if options['users'] < 1 or options['flows'] < 1 or options['workers'] < 1:
+            raise CommandError('--users, --flows and --workers must be at least 1')
+        report = run(
+            members=options['users'],
+            flows=options['flows'],
+            workers=options['workers'],
+            withdraw_share=options['withdraw_share'],
+            double_submit=options['double_submit'],
+            opening_balance=options['opening_balance'],
+            url=options['url'],
+            prefix=options['prefix'],
+            seed=options['seed'],
+            remove=options['cleanup'],
+        )
+
+        document = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(document + '\n')
+        else:
+            self.stdout.write(document)
+        if report['invariant_violations']:
+            raise CommandError(
+                f"{len(report['invariant_violations'])} invariant violations:\n  "
+                + '\n  '.join(report['invariant_violations'])
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ {report['flows']} flows in {report['seconds']}s "
+            f"({report['flows_per_second']} flows/s, {report['requests_per_second']} req/s), "
+            f"error rate {report['error_rate']:.2%}, balances match the ledger"
+        ))
+        if 'removed' in report:
+            self.stdout.write(self.style.SUCCESS(
+                f"✓ Removed the {report['removed'].get('auth.User', 0)} members of {report['prefix']}"
+            ))
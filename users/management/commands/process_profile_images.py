@@ -0,0 +1,37 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from users.images import PLACEHOLDER_IMAGE, process_profile_image
+from users.models import Profile
+
+
+def _process(profile_id, image_name, force):
+    try:
+        return process_profile_image(profile_id, image_name, force=force)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = 'Generate the resized profile image derivatives for uploads that have none yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Regenerate derivatives for every uploaded image, not just missing ones')
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Number of images processed in parallel')
+
+    def handle(self, *args, **options):
+        profiles = Profile.objects.exclude(image='').exclude(image=PLACEHOLDER_IMAGE)
+        if not options['all']:
+            profiles = profiles.filter(image_hash='')
+        jobs = list(profiles.order_by('pk').values_list('pk', 'image'))
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            results = list(pool.map(lambda job: _process(*job, options['all']), jobs))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Processed {sum(results)} of {len(jobs)} profile images'
+        ))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from users.models import Wallet, WalletTotals
+
+
+class Command(BaseCommand):
+    help = 'Backfill or rebuild the per-wallet transaction totals used by the dashboard'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wallet', type=int, action='append', dest='wallets',
+                            help='Only rebuild these wallet ids (repeatable)')
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Number of wallets rebuilt per transaction')
+
+    def handle(self, *args, **options):
+        wallet_ids = options['wallets']
+        if wallet_ids is None:
+            wallet_ids = list(Wallet.objects.order_by('pk').values_list('pk', flat=True))
+
+        chunk_size = options['chunk_size']
+        rebuilt = 0
+        for start in range(0, len(wallet_ids), chunk_size):
+            rebuilt += WalletTotals.rebuild(wallet_ids[start:start + chunk_size])
+            self.stdout.write(f'  {rebuilt}/{len(wallet_ids)} wallets')
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Rebuilt totals for {rebuilt} wallets'))
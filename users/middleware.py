@@ -0,0 +1,64 @@
+from django.utils.functional import SimpleLazyObject
+
+from users.models import Profile, Wallet
+from users.tracking import ip_recorder
+
+
+def get_profile(request):
+    """
+    The signed-in user's Profile, loaded once per request together with its
+    wallet and wallet totals. Returns None for anonymous users.
+    """
+    if not hasattr(request, "_cached_profile"):
+        request._cached_profile = None
+        if request.user.is_authenticated:
+            profile = (
+                Profile.objects.select_related("wallet", "wallet__totals")
+                .filter(user_id=request.user.pk)
+                .first()
+            )
+            if profile is not None:
+                # share instances so request.user.profile.wallet is served from cache
+                profile.user = request.user
+            request._cached_profile = profile
+    return request._cached_profile
+
+
+def get_wallet(request):
+    """The signed-in user's Wallet, created on first use like the dashboard used to."""
+    profile = get_profile(request)
+    if profile is None:
+        return None
+    try:
+        return profile.wallet
+    except Wallet.DoesNotExist:
+        return Wallet.objects.create(user=profile)
+
+
+class ProfileWalletMiddleware:
+    """Expose lazily loaded `request.profile` and `request.wallet`."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.profile = SimpleLazyObject(lambda: get_profile(request))
+        request.wallet = SimpleLazyObject(lambda: get_wallet(request))
+        return self.get_response(request)
+
+
+class IpObservationMiddleware:
+    """
+    Write the IP observations buffered by users.tracking once they are due,
+    before the response leaves: a serverless instance may be frozen as soon as
+    it has answered, so the write cannot wait for a background thread or a
+    later request.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        ip_recorder.flush_if_due()
+        return response
@@ -0,0 +1,23 @@
+from django.db import migrations
+
+from creyp.utils import to_decimal
+
+
+def normalize_balances(apps, schema_editor):
+    """Rewrite legacy balance strings so they cast cleanly to a decimal column."""
+    Wallet = apps.get_model("users", "Wallet")
+    for wallet in Wallet.objects.only("id", "balance").iterator():
+        normalized = str(to_decimal(wallet.balance))
+        if wallet.balance != normalized:
+            Wallet.objects.filter(pk=wallet.pk).update(balance=normalized)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_profile_verification_level_kycdocument'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.0.4 on 2026-10-18 10:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def open_ledgers(apps, schema_editor):
+    """Seed each wallet's ledger with its current balance so entries sum to it."""
+    Wallet = apps.get_model("users", "Wallet")
+    LedgerEntry = apps.get_model("users", "LedgerEntry")
+    entries = [
+        LedgerEntry(wallet_id=wallet_id, amount=balance, kind="opening", memo="Opening balance")
+        for wallet_id, balance in Wallet.objects.exclude(balance=0).values_list("id", "balance").iterator()
+    ]
+    LedgerEntry.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_normalize_wallet_balance'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='wallet',
+            name='balance',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=15),
+        ),
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('kind', models.CharField(choices=[('opening', 'opening'), ('deposit', 'deposit'), ('withdrawal', 'withdrawal'), ('reversal', 'reversal'), ('adjustment', 'adjustment')], max_length=15)),
+                ('reference', models.CharField(blank=True, max_length=17)),
+                ('memo', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to='users.wallet')),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='ledgerentry',
+            index=models.Index(fields=['wallet', 'created_at'], name='users_ledge_wallet__1673f9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ledgerentry',
+            index=models.Index(fields=['reference'], name='users_ledge_referen_b583a6_idx'),
+        ),
+        migrations.RunPython(open_ledgers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.0.4 on 2026-10-18 10:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0009_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WalletTotals',
+            fields=[
+                ('wallet', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='totals', serialize=False, to='users.wallet')),
+                ('pending', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('hidden', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('credit', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('processing', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('confirming', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('error', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('failed', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
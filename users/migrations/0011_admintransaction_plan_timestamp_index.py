@@ -0,0 +1,17 @@
+# Generated by Django 4.0.4 on 2026-10-18 10:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0010_wallettotals'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='admintransaction',
+            index=models.Index(fields=['plan', 'timestamp'], name='users_admin_plan_b1303f_idx'),
+        ),
+    ]
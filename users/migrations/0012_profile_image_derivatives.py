@@ -0,0 +1,23 @@
+# Generated by Django 4.0.4 on 2026-10-18 10:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0011_admintransaction_plan_timestamp_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='image_derivatives',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='image_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
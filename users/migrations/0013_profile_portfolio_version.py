@@ -0,0 +1,18 @@
+# Generated by Django 4.0.4 on 2026-10-18 10:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0012_profile_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='portfolio_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.0.4 on 2026-10-18 10:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0013_profile_portfolio_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['wallet', '-timestamp', '-id'], name='users_trans_wallet__9bb717_idx'),
+        ),
+    ]
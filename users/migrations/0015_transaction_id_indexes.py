@@ -0,0 +1,23 @@
+# Generated by Django 4.0.4 on 2026-10-18 10:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0014_transaction_wallet_timestamp_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='admintransaction',
+            name='transactionId',
+            field=models.CharField(blank=True, db_index=True, max_length=17),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='transactionId',
+            field=models.CharField(blank=True, db_index=True, max_length=17),
+        ),
+    ]
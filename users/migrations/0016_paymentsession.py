@@ -0,0 +1,29 @@
+# Generated by Django 4.0.4 on 2026-10-18 10:51
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0015_transaction_id_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentSession',
+            fields=[
+                ('token', models.CharField(max_length=43, primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('deposit', 'Deposit'), ('withdraw', 'Withdrawal')], max_length=10)),
+                ('state', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('confirming', 'Confirming'), ('credit', 'Credit'), ('failed', 'Failed')], default='pending', max_length=15)),
+                ('plan', models.CharField(blank=True, max_length=100)),
+                ('amount', models.CharField(blank=True, max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('transaction', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payment_session', to='users.transaction')),
+                ('wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payment_sessions', to='users.wallet')),
+            ],
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.0.4 on 2026-10-18 11:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0016_paymentsession'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='admintransaction',
+            name='users_admin_plan_b1303f_idx',
+        ),
+        migrations.AddIndex(
+            model_name='admintransaction',
+            index=models.Index(condition=models.Q(('plan', 'withdraw'), _negated=True), fields=['timestamp', 'id'], name='users_at_deposit_queue'),
+        ),
+        migrations.AddIndex(
+            model_name='admintransaction',
+            index=models.Index(condition=models.Q(('plan', 'withdraw')), fields=['timestamp', 'id'], name='users_at_withdraw_queue'),
+        ),
+    ]
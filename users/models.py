@@ -1,12 +1,17 @@
-from django.db import models
+import secrets
+from collections import defaultdict
+from decimal import Decimal
+
+from django.core.exceptions import PermissionDenied
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Q
 from django.utils import timezone
 from django.contrib.auth.models import User
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 
-from creyp.utils import random_string_generator, file_cleanup, image_resize
+from creyp.utils import allocate_ids, to_decimal
 
-from PIL import Image
 from django_countries.fields import CountryField
 
 
@@ -41,6 +46,11 @@ class Profile(models.Model):
     ip_address = models.CharField(max_length=100, blank=True, null=True)
     # verification level: 0 = none, 1 = basic KYC, 2 = financials, 3 = full (loan agreements + documents)
     verification_level = models.IntegerField(default=0)
+    # sha256 of the uploaded image and the resized copies made from it (see users.images)
+    image_hash = models.CharField(max_length=64, blank=True)
+    image_derivatives = models.JSONField(default=dict, blank=True)
+    # bumped on every investment write; keys the cached dashboard (core.portfolio)
+    portfolio_version = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return self.user.username
@@ -53,13 +63,39 @@ class Profile(models.Model):
     def last_name(self):
         return self.user.last_name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_image = dict(zip(field_names, values)).get("image")
+        return instance
+
+    @property
+    def image_changed(self):
+        return self.image.name != getattr(self, "_loaded_image", None)
+
+    def image_url(self, size=512):
+        """URL of the closest derivative no smaller than `size`, or the original upload."""
+        sizes = sorted(int(s) for s in self.image_derivatives or {})
+        fitting = [s for s in sizes if s >= size] or sizes[-1:]
+        if fitting:
+            return self.image.storage.url(self.image_derivatives[str(fitting[0])]["name"])
+        return self.image.url
+
+    @property
+    def thumbnail_url(self):
+        return self.image_url(128)
+
     def save(self, *args, **kwargs):
-        if self.image:
-            super().save(*args, **kwargs)
-            if self.image.storage.exists(self.image.name):
-                image_resize(self.image, 512, 512)
-        else:
-            super().save(*args, **kwargs)
+        # the derivatives belong to the old upload; users.images fills them in again
+        previous_hash = ""
+        if self.image_changed and self.image_hash:
+            previous_hash, self.image_hash = self.image_hash, ""
+            self.image_derivatives = {}
+        super().save(*args, **kwargs)
+        if previous_hash:
+            from users.images import schedule_discard_derivatives
+
+            schedule_discard_derivatives(previous_hash)
 
     def update_verification_level(self):
         """Compute verification level based on approved KYC documents."""
@@ -83,7 +119,7 @@ class Profile(models.Model):
 class Wallet(models.Model):
     user = models.OneToOneField(Profile, on_delete=models.CASCADE)
     btc_address = models.TextField(blank=True, null=True)
-    balance = models.CharField(max_length=100, default="00.00", blank=True)
+    balance = models.DecimalField(max_digits=15, decimal_places=2, default=0)
     pin = models.CharField(max_length=6, blank=True)
     amount_invested = models.CharField(max_length=100, default="00.00", blank=True)
     timestamp = models.DateTimeField(default=timezone.now)
@@ -97,21 +133,195 @@ class Transaction(models.Model):
     amount = models.CharField(max_length=100, blank=True)
     status = models.CharField(max_length=15, choices=STATUS)
     msg = models.TextField(blank=True)
-    transactionId = models.CharField(max_length=17, blank=True)
+    transactionId = models.CharField(max_length=17, blank=True, db_index=True)
     hash_id = models.CharField(max_length=17, blank=True, null=True, unique=True)
     timestamp = models.DateTimeField(auto_now_add=True, blank=True)
 
     class Meta:
         ordering = ['-timestamp', '-id']
+        indexes = [
+            # serves the dashboard's keyset pages (creyp.utils.keyset_page)
+            models.Index(fields=["wallet", "-timestamp", "-id"]),
+        ]
 
     def __str__(self):
         return f"user has {self.wallet.balance} | TID: {self.transactionId}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remember what the row looked like so WalletTotals can apply a delta on save
+        loaded = dict(zip(field_names, values))
+        instance._loaded_totals = (loaded.get("status"), loaded.get("amount"))
+        return instance
+
+    @classmethod
+    def assign_ids(cls, transactions):
+        """Give transactions without IDs theirs from one allocation, e.g. before bulk_create()."""
+        missing = [t for t in transactions if not t.transactionId or not t.hash_id]
+        ids = iter(allocate_ids(2 * len(missing)))
+        for row in missing:
+            row.transactionId = row.transactionId or next(ids)
+            row.hash_id = row.hash_id or next(ids)
+        return transactions
+
     def save(self, *args, **kwargs):
-        self.hash_id = random_string_generator(size=17)
+        # IDs are issued once; later saves keep them so cookies and references stay valid
+        self.assign_ids([self])
         super().save(*args, **kwargs)
 
 
+class WalletTotals(models.Model):
+    """
+    Transaction amounts per wallet summed by status.
+    Maintained by the Transaction signals so the dashboard reads a single row;
+    `manage.py rebuild_wallet_totals` recomputes it from scratch.
+    """
+    wallet = models.OneToOneField(Wallet, on_delete=models.CASCADE, primary_key=True, related_name="totals")
+    pending = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    hidden = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    credit = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    processing = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    confirming = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    error = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    failed = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    STATUS_FIELDS = tuple(status for status, _ in STATUS)
+
+    def __str__(self):
+        return f"wallet {self.wallet_id} invested {self.invested}"
+
+    @property
+    def invested(self):
+        """Amount that has cleared, i.e. everything not pending or rejected."""
+        return self.credit + self.hidden
+
+    @classmethod
+    def for_wallet(cls, wallet):
+        try:
+            return wallet.totals
+        except cls.DoesNotExist:
+            try:
+                cls.rebuild([wallet.pk])
+            except IntegrityError:
+                # another request created the row first
+                pass
+            return cls.objects.get(wallet_id=wallet.pk)
+
+    @classmethod
+    def apply(cls, wallet_id, changes):
+        """
+        Add each {status: amount} in `changes` to the wallet's row with one UPDATE.
+        A wallet without a row is left alone; for_wallet() rebuilds it on first read.
+        """
+        updates = {
+            status: F(status) + amount
+            for status, amount in changes.items()
+            if status in cls.STATUS_FIELDS and amount
+        }
+        if updates:
+            cls.objects.filter(wallet_id=wallet_id).update(**updates)
+
+    @classmethod
+    def apply_many(cls, changes_by_wallet, chunk_size=250):
+        """apply() for many wallets at once: {wallet_id: {status: amount}}, one UPDATE per chunk."""
+        wallet_ids = list(changes_by_wallet)
+        for start in range(0, len(wallet_ids), chunk_size):
+            chunk = wallet_ids[start:start + chunk_size]
+            updates = {}
+            for status in cls.STATUS_FIELDS:
+                whens = [
+                    models.When(wallet_id=pk, then=models.Value(changes_by_wallet[pk][status]))
+                    for pk in chunk
+                    if changes_by_wallet[pk].get(status)
+                ]
+                if whens:
+                    updates[status] = F(status) + models.Case(
+                        *whens,
+                        default=models.Value(Decimal("0")),
+                        output_field=models.DecimalField(max_digits=15, decimal_places=2),
+                    )
+            if updates:
+                cls.objects.filter(wallet_id__in=chunk).update(**updates)
+
+    @classmethod
+    def rebuild(cls, wallet_ids=None):
+        """
+        Recompute totals for `wallet_ids` (or every wallet) from the transactions table.
+        The wallets and their rows are locked before the sums are read and the rows are
+        updated in place: a status change committed meanwhile is in the sums, and one
+        still in flight waits on its row, then applies its delta on top of the rebuilt value.
+        """
+        wallets = Wallet.objects.select_for_update().order_by("pk")
+        existing = cls.objects.select_for_update()
+        transactions = Transaction.objects.all()
+        if wallet_ids is not None:
+            wallets = wallets.filter(pk__in=wallet_ids)
+            existing = existing.filter(wallet_id__in=wallet_ids)
+            transactions = transactions.filter(wallet_id__in=wallet_ids)
+
+        with transaction.atomic():
+            ids = list(wallets.values_list("pk", flat=True))
+            rows = {row.wallet_id: row for row in existing}
+            sums = defaultdict(lambda: defaultdict(Decimal))
+            for wallet_id, status, amount in transactions.values_list("wallet_id", "status", "amount").iterator(chunk_size=2000):
+                sums[wallet_id][status] += to_decimal(amount)
+
+            now = timezone.now()
+            for pk, row in rows.items():
+                for status in cls.STATUS_FIELDS:
+                    setattr(row, status, sums[pk][status])
+                row.updated_at = now
+            cls.objects.bulk_update(list(rows.values()), [*cls.STATUS_FIELDS, "updated_at"], batch_size=1000)
+            cls.objects.bulk_create(
+                [cls(wallet_id=pk, **{status: sums[pk][status] for status in cls.STATUS_FIELDS})
+                 for pk in ids if pk not in rows],
+                batch_size=1000,
+            )
+        return len(ids)
+
+
+LEDGER_KINDS = (
+    ("opening", "opening"),
+    ("deposit", "deposit"),
+    ("withdrawal", "withdrawal"),
+    ("reversal", "reversal"),
+    ("adjustment", "adjustment"),
+)
+
+
+class LedgerEntry(models.Model):
+    """
+    Append-only record of every change to a wallet balance.
+    Entries are never updated or deleted; corrections are new entries.
+    """
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name="ledger_entries")
+    amount = models.DecimalField(max_digits=15, decimal_places=2)
+    kind = models.CharField(max_length=15, choices=LEDGER_KINDS)
+    reference = models.CharField(max_length=17, blank=True)
+    memo = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["-created_at", "-id"]
+        indexes = [
+            models.Index(fields=["wallet", "created_at"]),
+            models.Index(fields=["reference"]),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.amount} | wallet {self.wallet_id}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Ledger entries are append-only")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Ledger entries are append-only")
+
+
 class AdminWallet(models.Model):
     user = models.ForeignKey(Profile, on_delete=models.CASCADE)
     btc_address = models.TextField(unique=True)
@@ -121,15 +331,31 @@ class AdminWallet(models.Model):
     def __str__(self):
         return f"{self.btc_address}"
 
+# The two staff queues. Each is the condition of the partial index its keyset pages are read from.
+WITHDRAW_REQUESTS = Q(plan="withdraw")
+DEPOSIT_REQUESTS = ~WITHDRAW_REQUESTS
+
+
 class AdminTransaction(models.Model):
     wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE)
     plan = models.CharField(max_length=100, blank=True)
     amount = models.CharField(max_length=100, blank=True)
     btc_address = models.TextField()
     msg = models.TextField(blank=True)
-    transactionId = models.CharField(max_length=17, blank=True)
+    transactionId = models.CharField(max_length=17, blank=True, db_index=True)
     timestamp = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["timestamp", "id"], condition=DEPOSIT_REQUESTS, name="users_at_deposit_queue"),
+            models.Index(fields=["timestamp", "id"], condition=WITHDRAW_REQUESTS, name="users_at_withdraw_queue"),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self.transactionId:
+            self.transactionId = allocate_ids(1)[0]
+        super().save(*args, **kwargs)
+
     def __str__(self):
         if self.plan == "withdraw":
             return f"{self.wallet.btc_address} debited ${self.amount}"
@@ -137,6 +363,102 @@ class AdminTransaction(models.Model):
             return f"{self.wallet.btc_address} transfered ${self.amount}"
 
 
+class PaymentSession(models.Model):
+    """
+    Server-side state of one deposit or withdrawal, keyed by the idempotency
+    token its first form was rendered with and carried in the payment_session
+    cookie. Each step moves it forward with a conditional UPDATE (advance()),
+    so a retried or double-submitted step finds it already moved and repeats
+    nothing: no second Transaction, AdminTransaction, debit or email.
+    """
+
+    KINDS = (
+        ("deposit", "Deposit"),
+        ("withdraw", "Withdrawal"),
+    )
+    STATES = (
+        ("pending", "Pending"),
+        ("processing", "Processing"),
+        ("confirming", "Confirming"),
+        ("credit", "Credit"),
+        ("failed", "Failed"),
+    )
+    # state -> the states it may be entered from
+    TRANSITIONS = {
+        "processing": ("pending",),
+        "confirming": ("processing",),
+        # withdrawals are debited straight from processing
+        "credit": ("processing", "confirming"),
+        "failed": ("pending", "processing", "confirming"),
+    }
+
+    token = models.CharField(max_length=43, primary_key=True)
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name="payment_sessions")
+    kind = models.CharField(max_length=10, choices=KINDS)
+    state = models.CharField(max_length=15, choices=STATES, default="pending")
+    plan = models.CharField(max_length=100, blank=True)
+    amount = models.CharField(max_length=100, blank=True)
+    transaction = models.OneToOneField(
+        Transaction, on_delete=models.SET_NULL, null=True, blank=True, related_name="payment_session"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.kind} {self.token} ({self.state})"
+
+    @staticmethod
+    def new_token():
+        return secrets.token_urlsafe(24)
+
+    @classmethod
+    def start(cls, token, wallet, kind, amount, plan="", state="pending", msg=""):
+        """
+        The session for `token` together with its Transaction, both created on
+        first use. Returns (session, created); a repeated submit of the same
+        form gets the existing session back. A missing token starts a new one.
+        """
+        with transaction.atomic():
+            session, created = cls.objects.select_related("transaction").get_or_create(
+                pk=token or cls.new_token(),
+                defaults={"wallet": wallet, "kind": kind, "amount": amount, "plan": plan, "state": state},
+            )
+            if created:
+                session.transaction = Transaction.objects.create(
+                    wallet=wallet, amount=amount, status=state, msg=msg
+                )
+                session.save(update_fields=["transaction"])
+        if session.wallet_id != wallet.pk or session.kind != kind:
+            raise PermissionDenied("payment session belongs to another wallet or flow")
+        return session, created
+
+    @classmethod
+    def for_wallet(cls, token, wallet):
+        if not token or wallet is None:
+            return None
+        return cls.objects.select_related("transaction").filter(pk=token, wallet=wallet).first()
+
+    def advance(self, state, **transaction_fields):
+        """
+        Move to `state` if the session is still in a state that may precede it,
+        and update its Transaction (status and `transaction_fields`) to match.
+        Returns False when another request already moved it; callers then skip
+        their side effects.
+        """
+        moved = PaymentSession.objects.filter(pk=self.pk, state__in=self.TRANSITIONS[state]).update(
+            state=state, updated_at=timezone.now()
+        )
+        if not moved:
+            return False
+        self.state = state
+        if self.transaction is not None:
+            self.transaction.status = state
+            for field, value in transaction_fields.items():
+                setattr(self.transaction, field, value)
+            self.transaction.save()
+        return True
+
+
 DOCUMENT_TYPES = (
     ("id", "Identity Document"),
     ("financial", "Financial Records"),
@@ -195,6 +517,33 @@ def update_wallet_signal(sender, instance, created, **kwargs):
         Wallet.objects.create(user=instance)
 
 
-post_delete.connect(
-    file_cleanup, sender=Image, dispatch_uid="profile.image.file_cleanup"
-)
+@receiver(post_save, sender=Profile)
+def process_profile_image_signal(sender, instance, created, **kwargs):
+    if instance.image_changed:
+        from users.images import PLACEHOLDER_IMAGE, schedule_profile_image
+
+        if instance.image.name and instance.image.name != PLACEHOLDER_IMAGE:
+            schedule_profile_image(instance)
+        instance._loaded_image = instance.image.name
+
+
+@receiver(post_save, sender=Wallet)
+def create_wallet_totals_signal(sender, instance, created, **kwargs):
+    if created:
+        WalletTotals.objects.get_or_create(wallet_id=instance.pk)
+
+
+@receiver(post_save, sender=Transaction)
+def update_wallet_totals_signal(sender, instance, created, **kwargs):
+    changes = defaultdict(Decimal)
+    previous = getattr(instance, "_loaded_totals", None)
+    if previous and not created:
+        changes[previous[0]] -= to_decimal(previous[1])
+    changes[instance.status] += to_decimal(instance.amount)
+    WalletTotals.apply(instance.wallet_id, changes)
+    instance._loaded_totals = (instance.status, instance.amount)
+
+
+@receiver(post_delete, sender=Transaction)
+def delete_wallet_totals_signal(sender, instance, **kwargs):
+    WalletTotals.apply(instance.wallet_id, {instance.status: -to_decimal(instance.amount)})
@@ -1,3 +1,380 @@
-from django.test import TestCase
+import shutil
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.exceptions import PermissionDenied
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from core.models import OutboundEmail
+from creyp.utils import IdAllocator
+from users import images, ledger, loadtest
+from users.decorators import deposit_before
+from users.middleware import get_profile
+from users.models import AdminTransaction, LedgerEntry, PaymentSession, Profile, Transaction, Wallet, WalletTotals
+from users.tracking import IpObservationRecorder, ip_recorder
+
+
+def member(username, balance=None):
+    """A member's wallet, optionally funded through the ledger."""
+    wallet = User.objects.create(username=username, email=f'{username}@example.com').profile.wallet
+    if balance is not None:
+        ledger.credit(wallet, balance, kind='opening')
+    return wallet
+
+
+class DepositBeforeTests(TestCase):
+    def setUp(self):
+        self.wallet = member('depositor')
+        self.calls = []
+
+    def get(self, user):
+        def view(request):
+            self.calls.append(request)
+            return HttpResponse('dashboard')
+
+        request = RequestFactory().get('/dashboard/')
+        request.user = user
+        return deposit_before(view)(request)
+
+    def test_member_without_a_deposit_is_sent_to_the_denial_page(self):
+        response = self.get(self.wallet.user.user)
+        self.assertRedirects(response, reverse('dashboard-denial'), fetch_redirect_response=False)
+        self.assertEqual(self.calls, [])
+
+    def test_signed_out_visitor_is_sent_to_login(self):
+        response = self.get(AnonymousUser())
+        self.assertRedirects(response, reverse('account_login'), fetch_redirect_response=False)
+        self.assertEqual(self.calls, [])
+
+    def test_member_who_deposited_reaches_the_view_with_one_profile_query(self):
+        Profile.objects.filter(pk=self.wallet.user_id).update(deposit_before=True)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get(self.wallet.user.user).content, b'dashboard')
+        # the profile the decorator loaded is the one the view reads
+        [request] = self.calls
+        with self.assertNumQueries(0):
+            self.assertEqual(get_profile(request).wallet.pk, self.wallet.pk)
+
+
+class LedgerTests(TestCase):
+    def setUp(self):
+        self.wallet = member('ledger', Decimal('100.00'))
+
+    def assertBalance(self, wallet, expected):
+        wallet.refresh_from_db()
+        self.assertEqual(wallet.balance, Decimal(expected))
+        self.assertEqual(ledger.balance_as_of(wallet), wallet.balance)
+
+    def test_balance_is_the_sum_of_the_ledger(self):
+        ledger.credit(self.wallet, '25.50', reference='DEP1')
+        ledger.debit(self.wallet, Decimal('60'), reference='WDR1')
+        self.assertBalance(self.wallet, '65.50')
+        self.assertEqual(
+            list(self.wallet.ledger_entries.order_by('id').values_list('kind', 'amount')),
+            [('opening', Decimal('100.00')), ('deposit', Decimal('25.50')), ('withdrawal', Decimal('-60.00'))],
+        )
+
+    def test_debit_beyond_the_balance_changes_nothing(self):
+        with self.assertRaises(ledger.InsufficientFunds):
+            ledger.debit(self.wallet, '100.01')
+        self.assertBalance(self.wallet, '100.00')
+        self.assertEqual(self.wallet.ledger_entries.count(), 1)
+        ledger.debit(self.wallet, '150', kind='adjustment', allow_overdraft=True)
+        self.assertBalance(self.wallet, '-50.00')
+
+    def test_post_many_applies_all_or_nothing(self):
+        other = member('other', Decimal('10.00'))
+        with self.assertRaises(ledger.InsufficientFunds):
+            ledger.post_many([
+                (self.wallet, '-40', 'withdrawal', 'A', ''),
+                (other, '-5', 'withdrawal', 'B', ''),
+                (other, '-6', 'withdrawal', 'C', ''),
+            ])
+        self.assertBalance(self.wallet, '100.00')
+        self.assertBalance(other, '10.00')
+
+        ledger.post_many([(self.wallet, '-40', 'withdrawal', 'A', ''), (other, '5', 'deposit', 'B', '')])
+        self.assertBalance(self.wallet, '60.00')
+        self.assertBalance(other, '15.00')
+
+    def test_entries_are_append_only(self):
+        entry = self.wallet.ledger_entries.get()
+        entry.memo = 'edited'
+        with self.assertRaises(ValueError):
+            entry.save()
+        with self.assertRaises(ValueError):
+            entry.delete()
+
+
+class LedgerAdminTests(TestCase):
+    def setUp(self):
+        self.wallet = member('audited', Decimal('100.00'))
+        self.client.force_login(User.objects.create(username='staff', is_staff=True, is_superuser=True))
+
+    def test_wallet_balance_cannot_be_edited(self):
+        url = reverse('admin:users_wallet_change', args=[self.wallet.pk])
+        response = self.client.post(url, {
+            'user': self.wallet.user_id, 'btc_address': 'bc1qedited', 'balance': '999999.00', 'pin': '',
+            'amount_invested': '00.00', 'timestamp_0': '2025-01-01', 'timestamp_1': '00:00:00',
+        }, secure=True)
+        self.assertEqual(response.status_code, 302)
+        self.wallet.refresh_from_db()
+        self.assertEqual((self.wallet.btc_address, self.wallet.balance), ('bc1qedited', Decimal('100.00')))
+        self.assertEqual(ledger.balance_as_of(self.wallet), self.wallet.balance)
+
+    def test_ledger_entries_cannot_be_added(self):
+        url = reverse('admin:users_ledgerentry_add')
+        response = self.client.post(url, {
+            'wallet': self.wallet.pk, 'amount': '500.00', 'kind': 'adjustment', 'reference': '', 'memo': '',
+        }, secure=True)
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.wallet.ledger_entries.count(), 1)
+
+
+class WalletTotalsTests(TestCase):
+    def setUp(self):
+        self.wallet = member('totals')
+
+    def totals(self):
+        row = WalletTotals.objects.get(wallet=self.wallet)
+        return {status: getattr(row, status) for status in WalletTotals.STATUS_FIELDS if getattr(row, status)}
+
+    def test_signals_move_amounts_between_statuses(self):
+        first = Transaction.objects.create(wallet=self.wallet, amount='500', status='pending')
+        Transaction.objects.create(wallet=self.wallet, amount='1,000', status='pending')
+        self.assertEqual(self.totals(), {'pending': Decimal('1500')})
+
+        # a row loaded from the database moves its old amount out of its old status
+        first = Transaction.objects.get(pk=first.pk)
+        first.status, first.amount = 'credit', '450'
+        first.save()
+        # saving twice must not apply the delta twice
+        first.save()
+        self.assertEqual(self.totals(), {'pending': Decimal('1000'), 'credit': Decimal('450')})
+
+        first.delete()
+        self.assertEqual(self.totals(), {'pending': Decimal('1000')})
+
+    def test_rebuild_matches_the_signal_totals(self):
+        for amount, status in (('100', 'pending'), ('250.50', 'credit'), ('75', 'failed'), ('20', 'hidden')):
+            Transaction.objects.create(wallet=self.wallet, amount=amount, status=status)
+        maintained = self.totals()
+        WalletTotals.objects.filter(wallet=self.wallet).update(credit=0, pending=0)
+        WalletTotals.rebuild([self.wallet.pk])
+        self.assertEqual(self.totals(), maintained)
+        self.assertEqual(WalletTotals.for_wallet(self.wallet).invested, Decimal('270.50'))
+
+    def test_rebuild_creates_missing_rows_and_keeps_the_rest(self):
+        other = member('untotalled')
+        WalletTotals.objects.filter(wallet=other).delete()
+        Transaction.objects.create(wallet=other, amount='40', status='credit')
+        WalletTotals.objects.filter(wallet=self.wallet).update(pending=Decimal('99'))
+        self.assertEqual(WalletTotals.rebuild(), 2)
+        self.assertEqual(self.totals(), {})
+        self.assertEqual(WalletTotals.objects.get(wallet=other).credit, Decimal('40'))
+
+    def test_for_wallet_reads_the_row_another_request_created(self):
+        WalletTotals.objects.filter(wallet=self.wallet).delete()
+        wallet = Wallet.objects.get(pk=self.wallet.pk)
+
+        def lose_the_race(wallet_ids):
+            WalletTotals.objects.create(wallet_id=wallet_ids[0], credit=Decimal('5'))
+            raise IntegrityError('duplicate key value violates unique constraint')
+
+        with mock.patch.object(WalletTotals, 'rebuild', side_effect=lose_the_race):
+            self.assertEqual(WalletTotals.for_wallet(wallet).credit, Decimal('5'))
+
+
+class IdAllocatorTests(TestCase):
+    def test_ids_are_unique_and_ordered_across_threads(self):
+        allocator = IdAllocator()
+        issued = []
+
+        def worker():
+            mine = []
+            for n in range(300):
+                mine += allocator.allocate(n % 4 + 1)
+            self.assertEqual(mine, sorted(mine))
+            issued.append(mine)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        every = [tid for mine in issued for tid in mine]
+        self.assertEqual(len(every), 8 * 750)
+        self.assertEqual(len(set(every)), len(every))
+        self.assertEqual({len(tid) for tid in every}, {17})
+
+    def test_order_survives_a_clock_step_back_and_a_full_millisecond(self):
+        allocator = IdAllocator()
+        with mock.patch('creyp.utils.time.time_ns', return_value=2_000_000_000_000_000):
+            first = allocator.allocate(3)
+            allocator._counter = (1 << IdAllocator.COUNTER_BITS) - 2
+            borrowed = allocator.allocate(5)
+        with mock.patch('creyp.utils.time.time_ns', return_value=1_999_999_000_000_000):
+            after_step_back = allocator.allocate()
+        ids = first + borrowed + after_step_back
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual(len(set(ids)), len(ids))
+
+    def test_transaction_keeps_its_ids_on_later_saves(self):
+        wallet = member('ids')
+        transaction = Transaction.objects.create(wallet=wallet, amount='10', status='pending')
+        issued = (transaction.transactionId, transaction.hash_id)
+        self.assertNotEqual(issued[0], issued[1])
+        transaction.status = 'credit'
+        transaction.save()
+        transaction.refresh_from_db()
+        self.assertEqual((transaction.transactionId, transaction.hash_id), issued)
+
+
+class PaymentSessionTests(TestCase):
+    def setUp(self):
+        self.wallet = member('payer', Decimal('50000'))
+
+    def test_repeated_start_returns_the_same_session(self):
+        token = PaymentSession.new_token()
+        session, created = PaymentSession.start(token, self.wallet, 'withdraw', '200', state='processing')
+        again, created_again = PaymentSession.start(token, self.wallet, 'withdraw', '200', state='processing')
+        self.assertEqual((created, created_again), (True, False))
+        self.assertEqual(again.transaction_id, session.transaction_id)
+        self.assertEqual(Transaction.objects.count(), 1)
+        with self.assertRaises(PermissionDenied):
+            PaymentSession.start(token, member('intruder'), 'withdraw', '200')
+
+    def test_advance_moves_a_session_only_once(self):
+        session, _ = PaymentSession.start(None, self.wallet, 'deposit', '500', state='processing')
+        stale = PaymentSession.for_wallet(session.pk, self.wallet)
+        self.assertTrue(session.advance('confirming'))
+        # a second request still holding the old state finds the session already moved
+        self.assertFalse(stale.advance('confirming'))
+        self.assertTrue(session.advance('credit', msg='Credited'))
+        self.assertFalse(session.advance('failed'))
+        self.assertEqual(Transaction.objects.values_list('status', 'msg').get(), ('credit', 'Credited'))
+
+    def test_double_submitted_withdrawal_debits_once(self):
+        user = self.wallet.user.user
+        Wallet.objects.filter(pk=self.wallet.pk).update(pin='2468', btc_address='bc1qpayer')
+        Profile.objects.filter(pk=self.wallet.user_id).update(
+            signup_confirmation=True, deposit_before=True
+        )
+        self.client.force_login(user)
+        response = self.client.post('/auth/withdraw/auth/start-window/', {
+            'pin': '2468', 'price': '20000', 'price_btc': '0.5', 'idempotency_key': PaymentSession.new_token(),
+        }, secure=True)
+        self.assertEqual(response.status_code, 200)
+        for _ in range(2):
+            response = self.client.post('/auth/withdraw/debit/auth/done/', {'price_btc': '0.5'}, secure=True)
+            self.assertEqual(response.status_code, 200)
+
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, Decimal('30000.00'))
+        self.assertEqual(LedgerEntry.objects.filter(kind='withdrawal').count(), 1)
+        self.assertEqual(AdminTransaction.objects.filter(plan='withdraw').count(), 1)
+        self.assertEqual(PaymentSession.objects.get().state, 'credit')
+
+
+class IpObservationTests(TestCase):
+    def setUp(self):
+        self.profiles = [member(f'seen{n}').user for n in range(3)]
+
+    def addresses(self):
+        return list(Profile.objects.filter(pk__in=[p.pk for p in self.profiles]).order_by('pk')
+                    .values_list('ip_address', flat=True))
+
+    def test_buffer_is_written_when_the_batch_fills(self):
+        recorder = IpObservationRecorder(batch_size=2, flush_interval=3600)
+        recorder.record(self.profiles[0].pk, '198.51.100.1')
+        recorder.record(self.profiles[0].pk, '198.51.100.2')
+        with self.assertNumQueries(0):
+            self.assertEqual(recorder.flush_if_due(), 0)
+        recorder.record(self.profiles[1].pk, '198.51.100.3')
+        self.assertEqual(recorder.flush_if_due(), 2)
+        self.assertEqual(self.addresses(), ['198.51.100.2', '198.51.100.3', None])
+        with self.assertNumQueries(0):
+            self.assertEqual(recorder.flush_if_due(), 0)
+
+    def test_buffer_is_written_once_the_interval_passes(self):
+        recorder = IpObservationRecorder(batch_size=100, flush_interval=5)
+        recorder.record(self.profiles[2].pk, '198.51.100.4')
+        self.assertEqual(recorder.flush_if_due(), 0)
+        with mock.patch('users.tracking.time.monotonic', return_value=time.monotonic() + 6):
+            self.assertEqual(recorder.flush_if_due(), 1)
+        self.assertEqual(self.addresses(), [None, None, '198.51.100.4'])
+
+    def test_middleware_writes_before_the_response_leaves(self):
+        self.client.force_login(self.profiles[0].user)
+        self.client.cookies['_user_ip'] = '203.0.113.9'
+        with mock.patch.multiple(ip_recorder, _pending={}, flush_interval=0):
+            self.assertEqual(self.client.get('/auth/deposit/', secure=True).status_code, 200)
+            self.assertEqual(ip_recorder._pending, {})
+        self.assertEqual(self.addresses()[0], '203.0.113.9')
+
+
+class LoadTestCleanupTests(TestCase):
+    def test_refuses_to_run_without_debug(self):
+        with self.assertRaisesMessage(CommandError, '--i-know-this-is-not-production'):
+            call_command('loadtest_payments', users=1, stdout=StringIO())
+        self.assertFalse(User.objects.exists())
+
+    def test_cleanup_removes_only_the_generated_members(self):
+        members = loadtest.create_members(2, 'ltx-', Decimal('100'))
+        OutboundEmail.objects.create(subject='Deposit', to_email=members[0].email, template='x.html')
+        kept = User.objects.create(username='ltx-admin', email='ltx-admin@example.com')
+
+        removed = loadtest.cleanup('ltx-')
+
+        self.assertEqual(removed['auth.User'], 2)
+        self.assertEqual(removed['core.OutboundEmail'], 1)
+        self.assertEqual(list(User.objects.values_list('pk', flat=True)), [kept.pk])
+        self.assertFalse(LedgerEntry.objects.exists())
+        self.assertEqual(Wallet.objects.count(), 1)
+
+
+@override_settings(BACKGROUND_TASKS_SYNC=True, PROFILE_IMAGE_SIZES=(64,))
+class ProfileImageDerivativeTests(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        override = override_settings(MEDIA_ROOT=media)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def upload(self, profile, color):
+        buffer = BytesIO()
+        Image.new('RGB', (200, 200), color).save(buffer, format='JPEG')
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.image.save(f'{color}.jpg', ContentFile(buffer.getvalue()))
+        profile.refresh_from_db()
+        return profile.image_derivatives['64']['name']
+
+    def test_new_upload_deletes_the_replaced_derivatives(self):
+        profile = User.objects.create(username='pictured').profile
+        red = self.upload(profile, 'red')
+        blue = self.upload(profile, 'blue')
+        self.assertFalse(default_storage.exists(red))
+        self.assertTrue(default_storage.exists(blue))
+
+    def test_derivatives_shown_by_another_profile_are_kept(self):
+        first = User.objects.create(username='first').profile
+        second = User.objects.create(username='second').profile
+        red = self.upload(first, 'red')
+        self.assertEqual(self.upload(second, 'red'), red)
+        self.upload(first, 'blue')
+        self.assertTrue(default_storage.exists(red))
+        self.assertEqual(images.discard_derivatives(second.image_hash), 0)
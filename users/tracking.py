@@ -0,0 +1,97 @@
+import atexit
+import threading
+import time
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+from users.models import Profile
+from creyp.utils import run_in_background
+
+PLACEHOLDER_IMAGE = "profile-image-placeholder.png"
+
+
+class IpObservationRecorder:
+    """
+    Write-behind buffer for the IP addresses seen on authenticated requests.
+    Observations are kept in memory (latest per profile wins) and written with
+    one bulk UPDATE once the batch fills up or the flush interval has passed,
+    checked by IpObservationMiddleware as each response leaves.
+
+    Whatever is still buffered when the process goes away is lost: at most
+    IP_OBSERVATION_FLUSH_SECONDS of observations, or one batch, per process.
+    atexit covers a clean shutdown, not a serverless instance that is frozen
+    after its last response and reclaimed; set IP_OBSERVATION_FLUSH_SECONDS=0
+    there to write at the end of every request that recorded something.
+    """
+
+    def __init__(self, batch_size=None, flush_interval=None):
+        self.batch_size = batch_size or getattr(settings, "IP_OBSERVATION_BATCH_SIZE", 200)
+        if flush_interval is None:
+            flush_interval = getattr(settings, "IP_OBSERVATION_FLUSH_SECONDS", 5)
+        self.flush_interval = flush_interval
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def record(self, profile_id, ip_address):
+        with self._lock:
+            self._pending[profile_id] = ip_address
+
+    def flush_if_due(self):
+        """flush() if the batch is full or the interval has passed; returns the number of profiles updated."""
+        with self._lock:
+            due = bool(self._pending) and (
+                len(self._pending) >= self.batch_size
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+        return self.flush() if due else 0
+
+    def flush(self):
+        """Write every buffered observation; returns the number of profiles updated."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        if not pending:
+            return 0
+        Profile.objects.bulk_update(
+            [Profile(pk=pk, ip_address=ip) for pk, ip in pending.items()],
+            ["ip_address"],
+            batch_size=500,
+        )
+        return len(pending)
+
+
+ip_recorder = IpObservationRecorder()
+atexit.register(ip_recorder.flush)
+
+
+_image_checks = {}
+_image_checks_lock = threading.Lock()
+
+
+def _check_profile_image(profile_id, image_name):
+    if default_storage.exists(image_name):
+        return
+    # only reset if the user hasn't uploaded something else in the meantime
+    Profile.objects.filter(pk=profile_id, image=image_name).update(image=PLACEHOLDER_IMAGE)
+
+
+def schedule_image_check(profile):
+    """
+    Verify in the background that the profile image still exists in storage,
+    falling back to the placeholder if it doesn't. Each image is checked at most
+    once per PROFILE_IMAGE_CHECK_SECONDS per process.
+    """
+    image_name = profile.image.name
+    if not image_name or image_name == PLACEHOLDER_IMAGE:
+        return
+    now = time.monotonic()
+    key = (profile.pk, image_name)
+    with _image_checks_lock:
+        if now - _image_checks.get(key, float("-inf")) < getattr(settings, "PROFILE_IMAGE_CHECK_SECONDS", 3600):
+            return
+        if len(_image_checks) >= 10000:
+            _image_checks.clear()
+        _image_checks[key] = now
+    run_in_background(_check_profile_image, profile.pk, image_name)
@@ -1,9 +1,14 @@
 from django.shortcuts import render, redirect
-from django.contrib.auth.models import User
+from django.db import transaction
 
-from users.models import AdminWallet, Profile, Wallet, Transaction, AdminTransaction
+from users.models import AdminWallet, AdminTransaction, PaymentSession
 from users.decorators import update_user_ip
-from creyp.utils import send_alert_mail, set_cookie_function, random_string_generator
+from users.middleware import get_wallet
+from users import ledger
+from creyp.utils import send_alert_mail, set_cookie_function
+
+PAYMENT_SESSION_COOKIE = "payment_session"
+PAYMENT_SESSION_MAX_AGE = 24 * 60 * 60
 
 starter = ["5,000", "4,000", "3,000", "2,000", "1,000", "500"]
 etfs = ["15,000", "14,000", "13,000", "12,000", "11,000", "10,000"]
@@ -32,7 +37,12 @@ def deposit_amount(request, pack):
         else:
             if price_list == None:
                 large = True
-        context = {"pack": pack, "price_list": price_list, "large": large}
+        context = {
+            "pack": pack,
+            "price_list": price_list,
+            "large": large,
+            "idempotency_key": PaymentSession.new_token(),
+        }
         return render(request, "auth/deposit/deposit_amount.html", context)
     else:
         return redirect("/auth/account/login/?next=/auth/deposit/" + str(pack) + "/")
@@ -71,25 +81,17 @@ def deposit_amount_auth(request, pack):
             "crumbs": ["Deposit Now", "Select Amount", "Checkout"],
             "type": "Checkout",
         }
-        qs = Transaction.objects.create(
-            wallet=request.user.profile.wallet,
-            transactionId=random_string_generator(size=17).upper(),
+        session, _ = PaymentSession.start(
+            request.POST.get("idempotency_key"),
+            get_wallet(request),
+            "deposit",
             amount=price,
-            status="pending",
+            plan=pack,
             msg=f"Initial price at ${price} is pending",
         )
-        qs.save()
-        _hash = qs.hash_id
-        transactionId = qs.transactionId
         res = render(request, "auth/deposit/deposit_checkout.html", context)
         set_cookie_function(
-            "pending_hash", str(_hash), max_age=500 * 1900, response=res
-        )
-        set_cookie_function(
-            "pending_hash_id",
-            str(transactionId),
-            max_age=1 * 24 * 60 * 60 * 1000,
-            response=res,
+            PAYMENT_SESSION_COOKIE, session.pk, max_age=PAYMENT_SESSION_MAX_AGE, response=res
         )
         return res
     else:
@@ -115,9 +117,7 @@ def deposit_window(request):
         price_total = request.POST.get("price_total")
         price_total_btc = request.POST.get("price_total_btc")
 
-        profile = Profile.objects.filter(user=user).first()
-        wallet = Wallet.objects.filter(user=profile).first()
-        user_ = User.objects.filter(username=user.username).first()
+        wallet = get_wallet(request)
         admin_btc_address = AdminWallet.objects.all()
         admin_btc_address = admin_btc_address.first()
 
@@ -137,7 +137,7 @@ def deposit_window(request):
 
         else:
             wallet.pin = pin1
-            wallet.save()
+            wallet.save(update_fields=["pin"])
 
         if not error == None:
             context = {
@@ -152,59 +152,45 @@ def deposit_window(request):
                 "error": error,
             }
 
-        if first_name:
-            user_.first_name = first_name
-            profile.first_name = first_name
-            user_.save()
-            profile.save()
-
-        if last_name:
-            user_.last_name = last_name
-            profile.last_name = last_name
-            user_.save()
-            profile.save()
+        if first_name or last_name:
+            if first_name:
+                user.first_name = first_name
+            if last_name:
+                user.last_name = last_name
+            user.save(update_fields=["first_name", "last_name"])
 
-        pending_hash = request.COOKIES.get("pending_hash", None) == None
         res = render(request, "auth/deposit/deposit_window.html", context)
-        if not pending_hash == True and not price_total:
-            _hash = request.COOKIES["pending_hash_id"]
-            qs = Transaction.objects.filter(transactionId=_hash).first()
-            qs.amount = price_total
-            qs.status = "processing"
-            _hash = qs.hash_id
-            qs.msg = f"Total Price at ${price_total} is been processed"
-            transactionId = qs.transactionId
-            qs.save()
-        else:
-            qs = Transaction.objects.create(
-                wallet=wallet,
+        session = PaymentSession.for_wallet(request.COOKIES.get(PAYMENT_SESSION_COOKIE), wallet)
+        if session is None:
+            session, opened = PaymentSession.start(
+                None,
+                wallet,
+                "deposit",
                 amount=price,
-                status="processing",
-                transactionId=random_string_generator(size=17).upper(),
+                plan=plan or "",
+                state="processing",
                 msg=f"${price_total} is been processed",
             )
-            qs.save()
-            _hash = qs.hash_id
-            transactionId = qs.transactionId
-        set_cookie_function(
-            "pending_hash", str(_hash), max_age=1 * 24 * 60 * 1000, response=res
-        )
+        else:
+            opened = session.advance(
+                "processing",
+                amount=price_total or session.amount,
+                msg=f"Total Price at ${price_total or session.amount} is been processed",
+            )
         set_cookie_function(
-            "pending_hash_id",
-            str(transactionId),
-            max_age=1 * 24 * 60 * 60 * 1000,
-            response=res,
+            PAYMENT_SESSION_COOKIE, session.pk, max_age=PAYMENT_SESSION_MAX_AGE, response=res
         )
-        try:
-            send_alert_mail(
-                request=request,
-                email_subject="Payment Window Has Been Opened",
-                user_email=request.user.email,
-                email_message=f"A Payment Window Has Been Initiated, Please Complete Your Deposit Process",
-                email_image="payment-window.png",
-            )
-        except:
-            pass
+        if opened:
+            try:
+                send_alert_mail(
+                    request=request,
+                    email_subject="Payment Window Has Been Opened",
+                    user_email=request.user.email,
+                    email_message=f"A Payment Window Has Been Initiated, Please Complete Your Deposit Process",
+                    email_image="payment-window.png",
+                )
+            except:
+                pass
         return res
     else:
         return redirect("deposit")
@@ -212,8 +198,7 @@ def deposit_window(request):
 
 def deposit_done(request, plan):
     user = request.user
-    profile = user.profile
-    wallet = profile.wallet
+    wallet = get_wallet(request)
 
     if request.method == "POST":
         form = request.POST
@@ -224,58 +209,48 @@ def deposit_done(request, plan):
         if btc_address == None or btc_address == "":
             btc_address = wallet.btc_address
         if make_default:
-            qs = Wallet.objects.filter(user=profile).first()
-            qs.btc_address = btc_address
-            qs.save()
-        pending_hash = request.COOKIES.get("pending_hash", None) == None
-        transactionId = request.COOKIES.get("pending_hash_id", None) == None
-        if not transactionId == True and not pending_hash == None:
-            pending_hash = request.COOKIES["pending_hash"]
-            transactionId = request.COOKIES["pending_hash_id"]
-            qs = Transaction.objects.filter(
-                wallet=wallet, hash_id=pending_hash, transactionId=transactionId
-            ).first()
-            if not qs is None and not price == None:
-                qs.status = "confirming"
-                qs.msg = f"You deposit request of ${price} is been confirmed"
-                qs.save()
-                # btc_address = wallet.btc_address
-                qsr = AdminTransaction.objects.filter(
-                    wallet=wallet, transactionId=transactionId
-                ).first()
-                if qsr is None:
-                    qsr = AdminTransaction.objects.create(
+            wallet.btc_address = btc_address
+            wallet.save(update_fields=["btc_address"])
+        session = PaymentSession.for_wallet(request.COOKIES.get(PAYMENT_SESSION_COOKIE), wallet)
+        if session is not None and session.kind == "deposit":
+            with transaction.atomic():
+                # a retried submit finds the session already confirming and queues nothing
+                confirmed = not price == None and session.advance(
+                    "confirming", msg=f"You deposit request of ${price} is been confirmed"
+                )
+                if confirmed:
+                    AdminTransaction.objects.create(
                         wallet=wallet,
                         plan=plan,
                         amount=price,
-                        transactionId=transactionId,
+                        transactionId=session.transaction.transactionId,
                         btc_address=btc_address,
                         msg=f"Username: {user.username}, Bitcoin Address: {btc_address}, Money Transfered: {price}",
                     )
-                    qsr.save()
-                    try:
-                        url = request.build_absolute_uri(
-                            "/@admin/transactions/deposit/"
-                        )
-                        html_msg = f'<a style="border: 1px solid #673ab7;padding: 5px 10px;border-radius: 24px;color: #fff;background: #673ab7;" href="{url}" class="btn btn-primary border">Check Transactions List</a>'
-                        send_alert_mail(
-                            request=request,
-                            email_subject=f"${price} Deposit Requested",
-                            user_email="divuzki@gmail.com",
-                            email_message=f"User `{user.username}` deposited ${price} and its undergoing confirmation by the team. It will take 1-3 days before he/she get credited [{user.username} wallet address is `{wallet.btc_address}`]",
-                            email_image="user-payed.png",
-                            html_message=html_msg,
-                        )
-                        send_alert_mail(
-                            request=request,
-                            email_subject=f"${price} Deposit Requested",
-                            user_email="creypinvest@gmail.com",
-                            email_message=f"User `{user.username}` deposited ${price} and he/she is waiting for payment confirmation. {user.username} wallet address is `{wallet.btc_address}` ",
-                            email_image="user-payed.png",
-                            html_message=html_msg,
-                        )
-                    except:
-                        pass
+            if confirmed:
+                try:
+                    url = request.build_absolute_uri(
+                        "/@admin/transactions/deposit/"
+                    )
+                    html_msg = f'<a style="border: 1px solid #673ab7;padding: 5px 10px;border-radius: 24px;color: #fff;background: #673ab7;" href="{url}" class="btn btn-primary border">Check Transactions List</a>'
+                    send_alert_mail(
+                        request=request,
+                        email_subject=f"${price} Deposit Requested",
+                        user_email="divuzki@gmail.com",
+                        email_message=f"User `{user.username}` deposited ${price} and its undergoing confirmation by the team. It will take 1-3 days before he/she get credited [{user.username} wallet address is `{wallet.btc_address}`]",
+                        email_image="user-payed.png",
+                        html_message=html_msg,
+                    )
+                    send_alert_mail(
+                        request=request,
+                        email_subject=f"${price} Deposit Requested",
+                        user_email="creypinvest@gmail.com",
+                        email_message=f"User `{user.username}` deposited ${price} and he/she is waiting for payment confirmation. {user.username} wallet address is `{wallet.btc_address}` ",
+                        email_image="user-payed.png",
+                        html_message=html_msg,
+                    )
+                except:
+                    pass
                 try:
                     send_alert_mail(
                         request=request,
@@ -307,8 +282,7 @@ def withdraw_window(request):
         pin = request.POST.get("pin")
         price = request.POST.get("price")
         price_btc = request.POST.get("price_btc")
-        profile = Profile.objects.filter(user=user).first()
-        wallet = Wallet.objects.filter(user=profile).first()
+        wallet = get_wallet(request)
 
         if not price or not pin:
             return redirect("/dashboard/payments/?e=null")
@@ -327,47 +301,29 @@ def withdraw_window(request):
                 return redirect("/dashboard/payments/?e=pin")
         context = {"price": price, "price_btc": price_btc, "wallet": wallet}
 
-        pending_hash = request.COOKIES.get("pending_hash", None) == None
         res = render(request, "auth/withdraw/withdraw_window.html", context)
-        if not pending_hash == True and not price:
-            _hash = request.COOKIES["pending_hash_id"]
-            qs = Transaction.objects.filter(transactionId=_hash).first()
-            qs.amount = price
-            qs.status = "processing"
-            _hash = qs.hash_id
-            qs.msg = f"Withdrawal of ${price} is been processed"
-            transactionId = qs.transactionId
-            qs.save()
-        else:
-            qs = Transaction.objects.create(
-                wallet=wallet,
-                amount=price,
-                status="processing",
-                transactionId=random_string_generator(size=17).upper(),
-                msg=f"${price} withdrawal is been processed",
-            )
-            qs.save()
-            _hash = qs.hash_id
-            transactionId = qs.transactionId
-        set_cookie_function(
-            "pending_hash", str(_hash), max_age=1 * 24 * 60 * 1000, response=res
+        session, opened = PaymentSession.start(
+            request.POST.get("idempotency_key"),
+            wallet,
+            "withdraw",
+            amount=price,
+            state="processing",
+            msg=f"${price} withdrawal is been processed",
         )
         set_cookie_function(
-            "pending_hash_id",
-            str(transactionId),
-            max_age=1 * 24 * 60 * 60 * 1000,
-            response=res,
+            PAYMENT_SESSION_COOKIE, session.pk, max_age=PAYMENT_SESSION_MAX_AGE, response=res
         )
-        try:
-            send_alert_mail(
-                request=request,
-                email_subject="Payment Window Has Been Opened",
-                user_email=request.user.email,
-                email_message=f"A Payment Window Has Been Initiated, Please Complete Your Withdrawal Process",
-                email_image="payment-window.png",
-            )
-        except:
-            pass
+        if opened:
+            try:
+                send_alert_mail(
+                    request=request,
+                    email_subject="Payment Window Has Been Opened",
+                    user_email=request.user.email,
+                    email_message=f"A Payment Window Has Been Initiated, Please Complete Your Withdrawal Process",
+                    email_image="payment-window.png",
+                )
+            except:
+                pass
         return res
     else:
         return redirect("/dashboard/payments/?e=yes")
@@ -375,79 +331,81 @@ def withdraw_window(request):
 
 def withdraw_done(request):
     user = request.user
-    profile = user.profile
-    wallet = profile.wallet
+    wallet = get_wallet(request)
 
     if request.method == "POST":
         form = request.POST
-        price = form.get("price")
+        price = None
         price_btc = form.get("price_btc")
-        pending_hash = request.COOKIES.get("pending_hash", None) == None
-        transactionId = request.COOKIES.get("pending_hash_id", None) == None
-        if not transactionId == True and not pending_hash == None:
-            pending_hash = request.COOKIES["pending_hash"]
-            transactionId = request.COOKIES["pending_hash_id"]
-            qs = Transaction.objects.filter(
-                wallet=wallet, hash_id=pending_hash, transactionId=transactionId
-            ).first()
-            if not qs is None and not price == None and not price_btc == None:
-                qsr = Wallet.objects.filter(user=profile).first()
-                if not qsr is None:
-                    qsr.balance = float(qsr.balance) - float(price)
-                    qsd = AdminTransaction.objects.create(
-                        wallet=wallet,
-                        plan="withdraw",
-                        amount=price,
-                        transactionId=transactionId,
-                        btc_address={user.profile.wallet.btc_address},
-                        msg=f"Username: {user.username}, Bitcoin Address: {user.profile.wallet.btc_address}, Money Withdrawn - USD: <b>{price}<b> - BTC: <b>{price_btc}<b>",
-                    )
-                    qsd.save()
-                    qsr.save()
-                qs.status = "credit"
-                qs.msg = f"You Withdraw ${price}"
-                qs.save()
+        session = PaymentSession.for_wallet(request.COOKIES.get(PAYMENT_SESSION_COOKIE), wallet)
+        if session is not None and session.kind == "withdraw":
+            # debit what was validated when the window opened, not what is posted now
+            price = session.amount
+            if not price_btc == None:
                 try:
-                    url = request.build_absolute_uri(
-                        "/@admin/transactions/withdrawals/"
-                    )
-                    html_msg = f'<a style="border: 1px solid #673ab7;padding: 5px 10px;border-radius: 24px;color: #fff;background: #673ab7;" href="{url}" class="btn btn-primary border">Check Transactions List</a>'
-                    send_alert_mail(
-                        request=request,
-                        email_subject=f"${price} Debit Requested",
-                        user_email="divuzki@gmail.com",
-                        email_message=f"User `{user.username}` debited ${price} from his/her account . User Info -> [{user.username} wallet address is `{wallet.btc_address}`]",
-                        email_image="user-payed.png",
-                        html_message=html_msg,
-                    )
+                    with transaction.atomic():
+                        # the conditional UPDATE serialises retries: only one request debits
+                        debited = session.advance("credit", msg=f"You Withdraw ${price}")
+                        if debited:
+                            ledger.debit(
+                                wallet,
+                                price,
+                                kind="withdrawal",
+                                reference=session.transaction.transactionId,
+                                memo=f"Withdrawal requested by {user.username}",
+                            )
+                            AdminTransaction.objects.create(
+                                wallet=wallet,
+                                plan="withdraw",
+                                amount=price,
+                                transactionId=session.transaction.transactionId,
+                                btc_address=wallet.btc_address or "",
+                                msg=f"Username: {user.username}, Bitcoin Address: {wallet.btc_address}, Money Withdrawn - USD: <b>{price}<b> - BTC: <b>{price_btc}<b>",
+                            )
+                except ledger.InsufficientFunds:
+                    return redirect("/dashboard/payments/?e=bal")
+                if debited:
+                    try:
+                        url = request.build_absolute_uri(
+                            "/@admin/transactions/withdrawals/"
+                        )
+                        html_msg = f'<a style="border: 1px solid #673ab7;padding: 5px 10px;border-radius: 24px;color: #fff;background: #673ab7;" href="{url}" class="btn btn-primary border">Check Transactions List</a>'
+                        send_alert_mail(
+                            request=request,
+                            email_subject=f"${price} Debit Requested",
+                            user_email="divuzki@gmail.com",
+                            email_message=f"User `{user.username}` debited ${price} from his/her account . User Info -> [{user.username} wallet address is `{wallet.btc_address}`]",
+                            email_image="user-payed.png",
+                            html_message=html_msg,
+                        )
 
-                    # send_alert_mail(request=request, email_subject=f"${price} Debit Requested", user_email="saint.exchange@icloud.com", email_message=f"User `{user.username}` debited ${price} from his/her account . User Info -> [{user.username} wallet address is `{wallet.btc_address}`]", email_image="user-payed.png", html_message=html_msg)
-                    # saint.exchange@icloud.com
-                    send_alert_mail(
-                        request=request,
-                        email_subject=f"${price} Debit",
-                        user_email="creypinvest@gmail.com",
-                        email_message=f"User `{user.username}` debited ${price} and he/she is waiting for credit. {user.username} wallet address is `{wallet.btc_address}` ",
-                        email_image="user-payed.png",
-                        html_message=html_msg,
-                    )
+                        # send_alert_mail(request=request, email_subject=f"${price} Debit Requested", user_email="saint.exchange@icloud.com", email_message=f"User `{user.username}` debited ${price} from his/her account . User Info -> [{user.username} wallet address is `{wallet.btc_address}`]", email_image="user-payed.png", html_message=html_msg)
+                        # saint.exchange@icloud.com
+                        send_alert_mail(
+                            request=request,
+                            email_subject=f"${price} Debit",
+                            user_email="creypinvest@gmail.com",
+                            email_message=f"User `{user.username}` debited ${price} and he/she is waiting for credit. {user.username} wallet address is `{wallet.btc_address}` ",
+                            email_image="user-payed.png",
+                            html_message=html_msg,
+                        )
 
-                    send_alert_mail(
-                        request=request,
-                        email_subject="Payment Window Has Been Closed",
-                        user_email=request.user.email,
-                        email_message=f"A Payment Window Has Been Closed, You will recevive your ${price} worth of bitcoin in your bitcoin address you added in your profile",
-                        email_image="payment-window-closed.png",
-                    )
-                    send_alert_mail(
-                        request=request,
-                        email_subject=f"${price} Has Been Debited",
-                        user_email=request.user.email,
-                        email_message=f"You just withdraw ${price} and its will take upto 48 hours before you receive it. If you have any problem contact creypinvest@gmail.com or please click on our support button on the site",
-                        email_image="user-payed.png",
-                    )
-                except:
-                    pass
+                        send_alert_mail(
+                            request=request,
+                            email_subject="Payment Window Has Been Closed",
+                            user_email=request.user.email,
+                            email_message=f"A Payment Window Has Been Closed, You will recevive your ${price} worth of bitcoin in your bitcoin address you added in your profile",
+                            email_image="payment-window-closed.png",
+                        )
+                        send_alert_mail(
+                            request=request,
+                            email_subject=f"${price} Has Been Debited",
+                            user_email=request.user.email,
+                            email_message=f"You just withdraw ${price} and its will take upto 48 hours before you receive it. If you have any problem contact creypinvest@gmail.com or please click on our support button on the site",
+                            email_image="user-payed.png",
+                        )
+                    except:
+                        pass
         else:
             return redirect("/dashboard/payments/?e=yes")
         return render(request, "auth/withdraw/withdraw_done.html", {"price": price})